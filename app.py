@@ -1,7 +1,42 @@
+import os
+import time
+
 import streamlit as st
-from datetime import datetime, date
+from datetime import date, time as dtime
+
+from modules import metrics
+from modules.ai_integration import SECTIONS, AIIntegration
+from modules.bazi_calculator import bazi
+from modules.llm_scheduler import shared_scheduler
+from modules.yijing_calculator import YijingCalculator
+from modules.ziwei_calculator import ZiweiCalculator
+
+# 命理AI系統 - 主程序
+#
+# Streamlit 每次操作元件都會重新執行整個腳本，因此：
+#   - 計算器與 AI 客戶端以 st.cache_resource 在程序內共用，AI 請求經 shared_scheduler()
+#     在已設定金鑰的供應商間故障轉移
+#   - 命盤結果以 st.cache_data 依輸入快取，重新執行不會重算
+#   - 排盤輸入存在 session_state，修改其他欄位時面板以原輸入重新顯示
+_rerun_start = time.perf_counter()
+
+
+def admin_enabled() -> bool:
+    """管理員模式只由部署方開啟：環境變數 DIVINATION_ADMIN=1 或 secrets 中 divination_admin = true
+
+    指標為整個程序共用、面板可下載與重置，因此不提供訪客可用的網址開關。
+    """
+    if os.environ.get('DIVINATION_ADMIN', '') not in ('', '0'):
+        return True
+    # 沒有 secrets.toml 時 st.secrets 會在頁面上顯示錯誤，先安靜地檢查
+    return st.secrets.load_if_toml_exists() and bool(st.secrets.get('divination_admin', False))
+
+
+# 管理員模式：開啟效能指標並顯示側邊欄面板
+ADMIN = admin_enabled()
+if ADMIN:
+    metrics.enable()
 
-# 命理AI系統 - 主程序（簡化測試版）
 st.set_page_config(page_title="命理AI系統", page_icon="🔮", layout="wide")
 
 # 自定義CSS樣式
@@ -22,6 +57,129 @@ st.markdown("""<style>
     }
 </style>""", unsafe_allow_html=True)
 
+
+@st.cache_resource
+def get_ziwei_calculator():
+    return ZiweiCalculator()
+
+
+@st.cache_resource
+def get_yijing_calculator():
+    return YijingCalculator()
+
+
+@st.cache_resource
+def get_ai():
+    return AIIntegration(scheduler=shared_scheduler())
+
+
+@st.cache_data(max_entries=1024)
+def compute_bazi(year, month, day, hour, minute, gender):
+    return bazi.calculate(year, month, day, hour, gender, minute)
+
+
+@st.cache_data(max_entries=1024)
+def compute_ziwei(year, month, day, hour, gender, calendar_type, is_leap_month):
+    return get_ziwei_calculator().calculate(year, month, day, hour, gender,
+                                            calendar_type, is_leap_month)
+
+
+def ai_panel(kind, chart, question):
+    """AI 分析：逐塊顯示三個段落，完成後保留在 session_state 供重新執行時顯示"""
+    state_key = f'ai_{kind}'
+    request = (repr(chart), question)
+    if st.button("🤖 AI 分析", key=f'ai_button_{kind}', use_container_width=True):
+        latency = st.empty()
+        placeholders = {section: st.empty() for section in SECTIONS}
+        texts = dict.fromkeys(SECTIONS, '')
+        start = time.perf_counter()
+        first_token = None
+        try:
+            for section, text in get_ai().analyze_stream({'type': kind, 'data': chart}, question):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                    latency.caption(f"首字 {first_token * 1000:.0f} ms")
+                section = section or SECTIONS[0]
+                texts[section] += text
+                placeholders[section].markdown(f"**{section}**\n\n{texts[section]}▌")
+        except Exception as e:
+            st.error(f"AI 分析失敗：{e}")
+            return
+        for section, text in texts.items():
+            placeholders[section].markdown(f"**{section}**\n\n{text}" if text else "")
+        latency.caption(f"首字 {first_token * 1000:.0f} ms，"
+                        f"完成 {(time.perf_counter() - start) * 1000:.0f} ms")
+        st.session_state[state_key] = (request, texts)
+    elif st.session_state.get(state_key, (None,))[0] == request:
+        for section, text in st.session_state[state_key][1].items():
+            if text:
+                st.markdown(f"**{section}**\n\n{text}")
+
+
+def bazi_panel(birth, name):
+    chart = compute_bazi(*birth)
+    if 'error' in chart:
+        st.error(f"排盤失敗：{chart['error']}")
+        return
+    st.subheader("四柱")
+    for column, (label, key) in zip(st.columns(4), (("年柱", "year_pillar"),
+                                                     ("月柱", "month_pillar"),
+                                                     ("日柱", "day_pillar"),
+                                                     ("時柱", "hour_pillar"))):
+        column.metric(label, chart[key]['stem'] + chart[key]['branch'])
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**日主**：{chart['day_master']}（{chart['strength']}）")
+        st.write(f"**喜用**：{'、'.join(chart['favorable_elements'])}")
+    with col2:
+        st.write("**五行**：" + " ".join(f"{k}{v}" for k, v in chart['five_elements'].items()))
+    # 大運概覽已在排盤結果中；時間軸只在此建立，流年只生成所選的一步
+    fortune = chart['major_fortune']
+    if fortune:
+        year, month, day, hour, minute, gender = birth
+        timeline = bazi.timeline(year, month, day, hour, gender, minute)
+        with st.expander(f"大運（{'順' if timeline.forward else '逆'}排，"
+                         f"{fortune[0]['start_age']} 歲起運）"):
+            labels = [f"{step['ganzhi']} {step['start_year']}–{step['start_year'] + 9}"
+                      for step in fortune]
+            n = labels.index(st.selectbox("大運", labels, key='bazi_decade'))
+            luck, years = timeline.decade(n)
+            st.write("、".join(luck.interactions()) or "與原局無合沖刑害")
+            st.write(" ".join(f"{pillar.start.year}{pillar.ganzhi}" for pillar in years))
+    ai_panel('bazi', chart, f"{name}的整體運勢" if name else None)
+
+
+def ziwei_panel(birth):
+    chart = compute_ziwei(*birth)
+    if 'error' in chart:
+        st.error(f"排盤失敗：{chart['error']}")
+        return
+    info = chart['birth_info']
+    st.write(f"**命宮**：{chart['life_palace']}　**身宮**：{chart['body_palace']}　"
+             f"**五行局**：{chart['five_elements']}　"
+             f"**農曆**：{info['lunar_year']}年{'閏' if info['is_leap_month'] else ''}"
+             f"{info['lunar_month']}月{info['lunar_day']}日")
+    st.write("**四化**：" + "　".join(f"{k}{v}" for k, v in chart['four_transformations'].items()))
+    st.dataframe([{'宮位': p['name'], '干支': p['heavenly_stem'] + p['earthly_branch'],
+                   '主星': '、'.join(p['major_stars']), '輔星': '、'.join(p['minor_stars'])}
+                  for p in chart['palaces']], hide_index=True, use_container_width=True)
+    ai_panel('ziwei', chart, None)
+
+
+def yijing_panel(reading):
+    st.subheader(f"第{reading['hexagram_number']}卦 {reading['hexagram_name']} "
+                 f"{reading['interpretation']['symbol']}")
+    lines = ["⚊" if line['value'] in (7, 9) else "⚋" for line in reading['lines']]
+    st.text("\n".join(f"{symbol} {'○' if line['changing'] else ''}"
+                      for symbol, line in reversed(list(zip(lines, reading['lines'])))))
+    related = [(label, reading[key]) for label, key in
+               (("之卦", 'changed_hexagram'), ("互卦", 'nuclear_hexagram'),
+                ("綜卦", 'inverse_hexagram'), ("錯卦", 'opposite_hexagram'))]
+    for column, (label, hexagram) in zip(st.columns(4), related):
+        column.metric(label, f"{hexagram['name']}" if hexagram else "—")
+    ai_panel('yijing', reading, reading['question'])
+
+
 st.title("🔮 命理AI系統")
 st.write("結合古籍智慧與現代AI，為您提供全面命理分析")
 
@@ -31,44 +189,88 @@ menu = st.sidebar.selectbox(
     ["八字排盤", "紫微斗數", "易經占卜"]
 )
 
-# 臨時測試訊息
-st.info("🔧 系統正在部署測試中...")
-st.success("✅ Streamlit 基本功能正常！")
-st.write(f"您選擇了：**{menu}**")
-
 if menu == "八字排盤":
     st.header("📅 八字排盤")
-    st.warning("⚠️ 計算模塊正在調試中，暫時無法使用完整功能")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.subheader("基本資料")
         name = st.text_input("姓名", placeholder="請輸入姓名")
         gender = st.selectbox("性別", ["男", "女"])
         birth_date = st.date_input("出生日期", value=date(1990, 1, 1))
-    
+
     with col2:
         st.subheader("出生時間")
-        birth_time = st.time_input("出生時辰")
+        birth_time = st.time_input("出生時辰", value=dtime(12, 0))
         location = st.text_input("出生地點", placeholder="例如：香港")
-    
+
     if st.button("🔍 開始排盤", use_container_width=True):
         if name:
-            st.info("💡 八字計算功能開發中，敬請期待！")
+            st.session_state['bazi_birth'] = (birth_date.year, birth_date.month, birth_date.day,
+                                              birth_time.hour, birth_time.minute, gender)
         else:
             st.warning("⚠️ 請輸入姓名")
+    if 'bazi_birth' in st.session_state:
+        bazi_panel(st.session_state['bazi_birth'], name)
 
 elif menu == "紫微斗數":
     st.header("⭐ 紫微斗數")
-    st.warning("⚠️ 計算模塊正在調試中，暫時無法使用完整功能")
-    st.info("💡 紫微斗數功能開發中，敬請期待！")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        gender = st.selectbox("性別", ["男", "女"], key='ziwei_gender')
+        calendar_type = {'陽曆': 'solar', '農曆': 'lunar'}[st.radio("曆法", ["陽曆", "農曆"],
+                                                                   horizontal=True)]
+        is_leap_month = st.checkbox("閏月", disabled=calendar_type != 'lunar')
+    with col2:
+        birth_date = st.date_input("出生日期", value=date(1990, 1, 1), key='ziwei_date')
+        birth_time = st.time_input("出生時辰", value=dtime(12, 0), key='ziwei_time')
+
+    if st.button("🔍 開始排盤", use_container_width=True, key='ziwei_submit'):
+        st.session_state['ziwei_birth'] = (birth_date.year, birth_date.month, birth_date.day,
+                                           birth_time.hour, gender, calendar_type,
+                                           is_leap_month and calendar_type == 'lunar')
+    if 'ziwei_birth' in st.session_state:
+        ziwei_panel(st.session_state['ziwei_birth'])
 
 else:  # 易經占卜
     st.header("📿 易經占卜")
-    st.warning("⚠️ 計算模塊正在調試中，暫時無法使用完整功能")
-    st.info("💡 易經占卜功能開發中，敬請期待！")
+
+    question = st.text_input("所問之事", placeholder="例如：今年事業發展如何？")
+    method = {'硬幣法': 'coins', '時間法': 'time', '隨機': 'random'}[
+        st.radio("起卦方式", ["硬幣法", "時間法", "隨機"], horizontal=True)]
+    if st.button("🎲 起卦", use_container_width=True):
+        reading = get_yijing_calculator().cast_hexagram(method, question or None)
+        st.session_state['yijing_reading'] = reading.to_dict()
+    if 'yijing_reading' in st.session_state:
+        yijing_panel(st.session_state['yijing_reading'])
+
+
+def render_admin_panel():
+    """側邊欄效能指標：各階段次數與延遲分位數，可下載 Prometheus 文字格式"""
+    with st.sidebar.expander("📊 效能指標", expanded=True):
+        rows = metrics.snapshot()
+        if rows:
+            st.dataframe([{'系統': r['system'], '階段': r['stage'], '次數': r['count'],
+                           '平均 ms': round(r['mean'] * 1000, 3),
+                           'p50 ms': round(r['p50'] * 1000, 3),
+                           'p95 ms': round(r['p95'] * 1000, 3), '錯誤': r['errors']}
+                          for r in rows], hide_index=True, use_container_width=True)
+        else:
+            st.caption("尚無資料")
+        st.download_button("下載 Prometheus 指標", metrics.render_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
+        if st.button("重設指標"):
+            metrics.registry.reset()
+
+
+if ADMIN:
+    rerun = time.perf_counter() - _rerun_start
+    metrics.registry.observe('app', 'rerun', rerun)
+    st.sidebar.caption(f"本次重新執行 {rerun * 1000:.1f} ms")
+    render_admin_panel()
 
 # 頁腳
 st.markdown("---")
-st.caption("💫 命理AI系統 v1.0 (測試版) | 結合古籍智慧與現代AI技術")
+st.caption("💫 命理AI系統 v1.0 | 結合古籍智慧與現代AI技術")
@@ -0,0 +1,87 @@
+"""Streamlit 重新执行延迟基准
+
+以 streamlit.testing.v1.AppTest 驱动 app.py：先排盘，再反复修改姓名栏位，
+记录每次交互的重新执行耗时。分别测量：
+    - 缓存：计算器为 cache_resource，命盘为 cache_data（现行做法）
+    - 无缓存：每次重新执行前清空两种缓存，相当于每次都重建计算器、重算命盘
+「脚本」为 app.py 自身记录的执行时间（管理员模式下的 app/rerun 指标），
+「总计」另含 AppTest 的元件树往返。
+用法: python benchmarks/app_rerun.py [--rounds 30]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from modules import metrics  # noqa: E402
+
+APP = os.path.join(os.path.dirname(__file__), '..', 'app.py')
+
+
+def start(page):
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    at.sidebar.selectbox[0].select(page).run()
+    if page == '八字排盤':
+        at.text_input[0].input('測試').run()
+    at.button[0].click().run()
+    assert not at.exception, at.exception
+    return at
+
+
+def edit(at, page, i):
+    """一次与命盘无关的输入修改"""
+    if page == '八字排盤':
+        at.text_input[1].input(f'地點{i}')
+    elif page == '紫微斗數':
+        at.radio[0].set_value('陽曆')
+    else:
+        at.text_input[0].input(f'問題{i}')
+
+
+def rerun_latency(page, rounds, cached):
+    at = start(page)
+    metrics.registry.reset()
+    samples = []
+    for i in range(rounds):
+        if not cached:
+            st.cache_data.clear()
+            st.cache_resource.clear()
+        edit(at, page, i)
+        begin = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - begin)
+        assert not at.exception, at.exception
+    script = next(row for row in metrics.snapshot() if row['system'] == 'app')
+    return samples, script
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=30, help='每种情形的交互次数')
+    args = parser.parse_args()
+    os.environ['DIVINATION_ADMIN'] = '1'
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('streamlit'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    print(f"{'页面':<10}{'情形':<8}{'脚本 p50':>10}{'脚本 mean':>11}{'总计 p50':>10}{'总计 p95':>10}"
+          "  (ms)")
+    for page in ('八字排盤', '紫微斗數', '易經占卜'):
+        for label, cached in (('无缓存', False), ('缓存', True)):
+            samples, script = rerun_latency(page, args.rounds, cached)
+            samples.sort()
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{page:<10}{label:<8}{script['p50'] * 1000:10.2f}{script['mean'] * 1000:11.2f}"
+                  f"{statistics.median(samples) * 1000:10.2f}{p95 * 1000:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
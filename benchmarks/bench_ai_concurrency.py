@@ -0,0 +1,75 @@
+"""AI 分析並行化基準
+
+以本機模擬 LLM 伺服器（tools/fake_llm_server.py）比較三個命理系統逐一分析與
+compare_systems() 並行分析的耗時，並檢查連線重用、逾時與取消。
+用法: python benchmarks/bench_ai_concurrency.py [--latency 0.3] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from modules.ai_integration import AIIntegration  # noqa: E402
+from modules.bazi_calculator import bazi  # noqa: E402
+from modules.response_cache import ResponseCache  # noqa: E402
+from modules.yijing_calculator import YijingCalculator  # noqa: E402
+from modules.ziwei_calculator import ZiweiCalculator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='模擬伺服器每請求延遲秒數')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    charts = (bazi.calculate_chart(1990, 5, 15, 14),
+              ZiweiCalculator().calculate_chart(1990, 5, 15, 14),
+              YijingCalculator(seed=1).cast_reading('事業'))
+
+    with FakeLLMServer(latency=args.latency) as server:
+        # 每輪使用不同問題，避免回應快取命中
+        ai = AIIntegration(base_url=server.url, cache=ResponseCache())
+
+        start = time.perf_counter()
+        for i in range(args.rounds):
+            for name, chart in zip(('bazi', 'ziwei', 'yijing'), charts):
+                ai.analyze({'type': name, 'data': chart}, f'事業{i}')
+        sequential = (time.perf_counter() - start) / args.rounds
+
+        start = time.perf_counter()
+        for i in range(args.rounds):
+            result = ai.compare_systems(*charts, f'感情{i}')
+        concurrent = (time.perf_counter() - start) / args.rounds
+        assert all(not text.startswith('[分析失敗]') for text in result.values())
+
+        print(f"模擬延遲 {args.latency * 1000:.0f} ms，{args.rounds} 輪")
+        print(f"逐一分析        {sequential * 1000:8.1f} ms/輪")
+        print(f"compare_systems {concurrent * 1000:8.1f} ms/輪  ({sequential / concurrent:.1f}x)")
+        print(f"請求 {server.stats['requests']} 次，新建連線 {server.stats['connections']} 條，"
+              f"最大同時處理 {server.stats['max_in_flight']}")
+
+        timed_out = ai.compare_systems(*charts, '健康', timeout=args.latency / 3)
+        print(f"逾時: {timed_out['bazi_analysis']}")
+
+        async def cancelled():
+            task = asyncio.ensure_future(ai.compare_systems_async(*charts, '財運'))
+            await asyncio.sleep(args.latency / 3)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return '外層取消後三個請求一併取消'
+            finally:
+                await ai.aclose()
+        print(f"取消: {asyncio.run(cancelled())}")
+        ai.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""AI 分析串流基準
+
+以本機模擬 LLM 伺服器比較 analyze() 等待完整回答與 analyze_stream() 逐塊接收的
+首字延遲(time-to-first-token)，並檢查串流結果與完整回答一致、提前結束時連線不被重用。
+用法: python benchmarks/bench_ai_streaming.py [--latency 0.3] [--chunk-delay 0.02]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from fake_llm_server import ANSWER, FakeLLMServer  # noqa: E402
+from modules.ai_integration import SECTIONS, AIIntegration  # noqa: E402
+from modules.bazi_calculator import bazi  # noqa: E402
+from modules.response_cache import ResponseCache  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='模擬伺服器首塊前的延遲秒數')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='串流每塊的間隔秒數')
+    args = parser.parse_args()
+
+    chart = {'type': 'bazi', 'data': bazi.calculate_chart(1990, 5, 15, 14)}
+    with FakeLLMServer(latency=args.latency, chunk_delay=args.chunk_delay) as server:
+        ai = AIIntegration(base_url=server.url, cache=ResponseCache())
+
+        start = time.perf_counter()
+        ai.analyze(chart, '事業')
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first = None
+        sections = dict.fromkeys(SECTIONS, '')
+        for section, text in ai.analyze_stream(chart, '感情'):
+            if first is None:
+                first = time.perf_counter() - start
+            sections[section] += text
+        total = time.perf_counter() - start
+        assert ''.join(f'[{name}] {text}' for name, text in sections.items()).strip() == ANSWER
+
+        start = time.perf_counter()
+        replay = list(ai.analyze_stream(chart, '感情'))
+        cached = time.perf_counter() - start
+
+        for _ in ai.analyze_stream(chart, '健康'):
+            break
+        ai.analyze(chart, '財運')
+
+        print(f"模擬延遲 {args.latency * 1000:.0f} ms，每塊間隔 {args.chunk_delay * 1000:.0f} ms")
+        print(f"analyze() 完整回答     {blocking * 1000:8.1f} ms")
+        print(f"analyze_stream() 首字  {first * 1000:8.1f} ms")
+        print(f"analyze_stream() 完成  {total * 1000:8.1f} ms")
+        print(f"快取重放 {len(replay)} 個事件 {cached * 1000:8.2f} ms")
+        print(f"請求 {server.stats['requests']} 次，新建連線 {server.stats['connections']} 條"
+              "（提前結束的串流連線不放回連線池）")
+        ai.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""命盤 API 負載測試
+
+以 AsyncHTTPClient 的 keep-alive 連線池對 modules.api_server 發送請求，
+報告每請求延遲 p50 / p99 與吞吐量：
+    1. 單筆：每個請求排一張命盤，concurrency 個並行連線
+    2. 批次：同樣數量的命盤以 JSON 陣列分批送出
+未指定 --url 時在本行程背景啟動一個伺服器。
+用法: python benchmarks/bench_api_server.py [--requests 2000] [--concurrency 32]
+                                            [--batch 100] [--workers N] [--url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.api_server import APIServer  # noqa: E402
+from modules.http_client import AsyncHTTPClient  # noqa: E402
+
+
+def births(n, seed=0):
+    rng = random.Random(seed)
+    return [{'year': rng.randrange(1901, 2100), 'month': rng.randrange(1, 13),
+             'day': rng.randrange(1, 29), 'hour': rng.randrange(24),
+             'gender': rng.choice('男女')} for _ in range(n)]
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def load(url, bodies, concurrency):
+    """以 concurrency 個工作者依序取出本文發送，返回 (各請求延遲, 總耗時, 開啟連線數)"""
+    latencies = []
+    queue = iter(bodies)
+    async with AsyncHTTPClient(max_connections=concurrency) as client:
+        async def worker():
+            for body in queue:
+                start = time.perf_counter()
+                response = await client.post_json(url, body)
+                latencies.append(time.perf_counter() - start)
+                assert response.status == 200, response.text()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start, client.connections_opened
+
+
+def report(label, latencies, elapsed, connections, charts):
+    print(f"{label}: {len(latencies)} 個請求 {elapsed:.2f} s，{len(latencies) / elapsed:,.0f} req/s，"
+          f"{charts / elapsed:,.0f} 命盤/s；p50 {percentile(latencies, 0.5) * 1000:.2f} ms，"
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms；連線 {connections} 條")
+
+
+def run(base, args):
+    samples = births(args.requests)
+    asyncio.run(load(f'{base}/bazi', samples[:args.concurrency], args.concurrency))   # 預熱
+    report("1. 單筆 /bazi", *asyncio.run(load(f'{base}/bazi', samples, args.concurrency)),
+           len(samples))
+    batches = [samples[i:i + args.batch] for i in range(0, len(samples), args.batch)]
+    report(f"2. 批次 /bazi（每批 {args.batch}）",
+           *asyncio.run(load(f'{base}/bazi', batches, min(args.concurrency, len(batches)))),
+           len(samples))
+    report("3. 單筆 /yijing",
+           *asyncio.run(load(f'{base}/yijing', [{'question': f'問題{i}'}
+                                                for i in range(args.requests)],
+                             args.concurrency)), args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='每個情境的命盤數')
+    parser.add_argument('--concurrency', type=int, default=32, help='並行連線數')
+    parser.add_argument('--batch', type=int, default=100, help='批次情境每個請求的命盤數')
+    parser.add_argument('--workers', type=int, help='本機伺服器的排盤工作者數')
+    parser.add_argument('--url', help='已運行的伺服器位址，例如 http://127.0.0.1:8080')
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url.rstrip('/'), args)
+        return
+    with APIServer(port=0, workers=args.workers) as server:
+        print(f"本機伺服器 {server.url}，{server.workers} 個工作者")
+        run(server.url, args)
+        print(f"伺服器統計: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
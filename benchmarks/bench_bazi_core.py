@@ -0,0 +1,87 @@
+"""八字四柱核心微基准
+
+对比旧版字符串/datetime实现与整数干支核心的单盘耗时。
+用法: python benchmarks/bench_bazi_core.py
+"""
+
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules import solar_terms  # noqa: E402
+from modules.bazi_calculator import BaziCalculator  # noqa: E402
+from modules.cache import ChartCache  # noqa: E402
+
+TIANGAN = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
+DIZHI = ['子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥']
+WUXING_TIANGAN = dict(zip(TIANGAN, '木木火火土土金金水水'))
+WUXING_DIZHI = dict(zip(DIZHI, '水土木木土火火土金金土水'))
+
+
+def legacy_pillars(year, month, day, hour, solar_year, solar_month):
+    """旧版实现：datetime求日差、list.index查干、每次重建起算字典"""
+    offset = (solar_year - 1984) % 60
+    year_stem, year_branch = TIANGAN[offset % 10], DIZHI[offset % 12]
+
+    month_stem_start = {0: 2, 1: 4, 2: 6, 3: 8, 4: 0, 5: 2, 6: 4, 7: 6, 8: 8, 9: 0}
+    stem_start = month_stem_start[TIANGAN.index(year_stem)]
+    month_offset = (solar_month - 1) % 12
+    month_stem = TIANGAN[(stem_start + month_offset) % 10]
+    month_branch = DIZHI[(2 + month_offset) % 12]
+
+    days_diff = (datetime(year, month, day) - datetime(1949, 10, 1)).days
+    day_stem, day_branch = TIANGAN[days_diff % 10], DIZHI[days_diff % 12]
+
+    hour_branch_idx = ((hour + 1) // 2) % 12
+    hour_stem_start = {0: 0, 1: 2, 2: 4, 3: 6, 4: 8, 5: 0, 6: 2, 7: 4, 8: 6, 9: 8}
+    hour_stem = TIANGAN[(hour_stem_start[TIANGAN.index(day_stem)] + hour_branch_idx) % 10]
+    hour_branch = DIZHI[hour_branch_idx]
+
+    stems = [year_stem, month_stem, day_stem, hour_stem]
+    branches = [year_branch, month_branch, day_branch, hour_branch]
+    wuxing_count = {'金': 0, '木': 0, '水': 0, '火': 0, '土': 0}
+    for stem in stems:
+        wuxing_count[WUXING_TIANGAN[stem]] += 1
+    for branch in branches:
+        wuxing_count[WUXING_DIZHI[branch]] += 1
+    return stems, branches, wuxing_count
+
+
+def main(n=50000):
+    rng = random.Random(0)
+    calc = BaziCalculator(cache=ChartCache(maxsize=1))
+    samples = []
+    for _ in range(n):
+        year, month, day = rng.randrange(1901, 2100), rng.randrange(1, 13), rng.randrange(1, 29)
+        hour = rng.randrange(24)
+        samples.append((year, month, day, hour) + calc.get_solar_month(year, month, day, hour))
+
+    def run_legacy():
+        for year, month, day, hour, sy, sm in samples:
+            legacy_pillars(year, month, day, hour, sy, sm)
+
+    def run_core():
+        for year, month, day, hour, sy, sm in samples:
+            calc._analyze_indices(calc._pillar_indices(sy, sm, year, month, day, hour))
+
+    def run_lookup():
+        for year, month, day, hour, _, _ in samples:
+            solar_terms.solar_month(year, month, day, hour)
+
+    def run_calculate():
+        for year, month, day, hour, _, _ in samples:
+            calc.calculate(year, month, day, hour)
+
+    print(f"每盘耗时（{n}盘取最优3次）")
+    for label, fn in (('旧版四柱+五行', run_legacy), ('整数核心四柱+五行', run_core),
+                      ('节气查找', run_lookup), ('calculate()未命中缓存', run_calculate)):
+        best = min(timeit.repeat(fn, number=1, repeat=3))
+        print(f"  {label:<20} {best / n * 1e6:8.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
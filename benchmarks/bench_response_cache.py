@@ -0,0 +1,58 @@
+"""LLM 回應快取基準
+
+以本機模擬 LLM 伺服器量測：首次分析、Streamlit 式重新執行（記憶體層命中）、
+新程序啟動後的磁碟層命中，以及並行相同請求的單飛去重。
+用法: python benchmarks/bench_response_cache.py [--latency 0.3] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from modules.ai_integration import AIIntegration  # noqa: E402
+from modules.bazi_calculator import bazi  # noqa: E402
+from modules.response_cache import ResponseCache  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='模擬伺服器每請求延遲秒數')
+    parser.add_argument('--concurrency', type=int, default=20, help='並行的相同請求數')
+    args = parser.parse_args()
+
+    chart = {'type': 'bazi', 'data': bazi.calculate_chart(1990, 5, 15, 14)}
+    with FakeLLMServer(latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as disk_dir:
+        ai = AIIntegration(base_url=server.url, cache=ResponseCache(disk_dir=disk_dir))
+        print(f"首次分析        {timed(lambda: ai.analyze(chart, '事業')):8.2f} ms")
+        print(f"重新執行        {timed(lambda: ai.analyze(chart, '事業')):8.3f} ms")
+
+        restarted = AIIntegration(base_url=server.url, cache=ResponseCache(disk_dir=disk_dir))
+        print(f"新程序(磁碟層)  {timed(lambda: restarted.analyze(chart, '事業')):8.3f} ms  "
+              f"(磁碟命中 {restarted.cache.disk_hits})")
+
+        async def burst():
+            return await asyncio.gather(
+                *(ai.analyze_async(chart, '感情') for _ in range(args.concurrency)))
+        before = server.stats['requests']
+        elapsed = timed(lambda: asyncio.run(burst()))
+        print(f"{args.concurrency} 個並行相同請求 {elapsed:8.2f} ms，"
+              f"上游請求 {server.stats['requests'] - before} 次")
+        print(ai.cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""命盘对象内存占用对比
+
+比较 calculate() 返回的嵌套字典与紧凑命盘对象（BaziChart、ZiweiChart、
+HexagramReading）的单个对象深度大小，以及缓存十万个对象时的实际内存增量。
+用法: python benchmarks/chart_memory.py
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.bazi_calculator import BaziCalculator  # noqa: E402
+from modules.cache import ChartCache  # noqa: E402
+from modules.yijing_calculator import YijingCalculator  # noqa: E402
+from modules.ziwei_calculator import ZiweiCalculator  # noqa: E402
+
+
+def deep_sizeof(obj, seen=None):
+    """递归统计对象及其引用对象的字节数（共享对象只计一次）"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def retained_bytes(factory, n):
+    """创建并保留n个对象后的内存增量（字节/个）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [factory(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / n
+
+
+def main(n=100000):
+    rng = random.Random(0)
+    samples = [(rng.randrange(1901, 2100), rng.randrange(1, 13), rng.randrange(1, 29),
+                rng.randrange(24)) for _ in range(n)]
+    bazi = BaziCalculator(cache=ChartCache(maxsize=1))
+    ziwei = ZiweiCalculator(cache=ChartCache(maxsize=1))
+    yijing = YijingCalculator()
+
+    cases = (
+        ('八字', lambda i: bazi.calculate_chart(*samples[i])),
+        ('紫微', lambda i: ziwei.calculate_chart(*samples[i])),
+        ('易经', lambda i: yijing.cast_reading('事业')),
+    )
+    print(f"{'系统':<6}{'字典深度大小':>12}{'对象深度大小':>12}{'字典保留/个':>12}{'对象保留/个':>12}")
+    for label, make in cases:
+        chart = make(0)
+        dict_size = deep_sizeof(chart.to_dict())
+        obj_size = deep_sizeof(chart)
+        dict_kept = retained_bytes(lambda i: make(i).to_dict(), n)
+        obj_kept = retained_bytes(make, n)
+        print(f"{label:<6}{dict_size:>14}{obj_size:>14}{dict_kept:>14.0f}{obj_kept:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""导入耗时预算检查
+
+在全新的解释器中测量 `import modules` 以及首次访问各计算器的耗时，
+取多次运行的最小值。`import modules` 超出预算时退出码为1，可直接用于CI。
+
+用法: python benchmarks/import_time.py [--budget-ms 20] [--repeat 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# (说明, 在 `import modules` 之后计时执行的语句)
+PROBES = (
+    ('import modules', ''),
+    ('modules.bazi_calculator', 'modules.bazi_calculator'),
+    ('modules.ziwei_calculator', 'modules.ziwei_calculator'),
+    ('modules.yijing_calculator', 'modules.yijing_calculator'),
+)
+
+_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import modules
+t1 = time.perf_counter()
+{statement}
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+
+def measure(statement: str, repeat: int) -> tuple:
+    """返回 (import modules 耗时, 语句耗时) 的最小值，单位毫秒"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _SCRIPT.format(statement=statement)],
+                             cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+        samples.append(tuple(float(x) for x in out.stdout.split()))
+    return min(s[0] for s in samples), min(s[1] for s in samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=20.0,
+                        help='import modules 的耗时上限（毫秒）')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    package_ms = None
+    for label, statement in PROBES:
+        base, extra = measure(statement, args.repeat)
+        if not statement:
+            package_ms = base
+            print(f"{label:<28} {base:8.2f} ms  (预算 {args.budget_ms:.0f} ms)")
+        else:
+            print(f"{label:<28} {extra:8.2f} ms  (首次访问)")
+
+    if package_ms > args.budget_ms:
+        print(f"超出预算: import modules 耗时 {package_ms:.2f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""提示詞 token 量
+
+比較舊版「整份命盤 JSON」提示與 prompt_builder 精簡提示的估算 token 數，
+並列出不同預算下保留的命盤行數。
+用法: python benchmarks/prompt_tokens.py [--budget 1024]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.bazi_calculator import bazi  # noqa: E402
+from modules.prompt_builder import build_messages, encode_chart, estimate_tokens  # noqa: E402
+from modules.yijing_calculator import YijingCalculator  # noqa: E402
+from modules.ziwei_calculator import ZiweiCalculator  # noqa: E402
+
+
+def json_prompt(data, question):
+    """PROMPT_TEMPLATE_VERSION 1 的提示格式"""
+    return f"""
+你是命理大師，結合古籍與現代心理分析。
+命盤：{json.dumps(data, ensure_ascii=False, default=lambda obj: obj.to_dict())}
+問題：{question or '全面分析'}
+請給出：[古籍分析] [現代解讀] [行動建議]
+        """
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=int, default=1024)
+    args = parser.parse_args()
+
+    charts = {'bazi': bazi.calculate_chart(1990, 5, 15, 14),
+              'ziwei': ZiweiCalculator().calculate_chart(1990, 5, 15, 14),
+              'yijing': YijingCalculator(seed=1).cast_reading('事業')}
+    print(f"{'系統':<8}{'JSON':>8}{'精簡':>8}{'節省':>8}")
+    for name, chart in charts.items():
+        data = {'type': name, 'data': chart}
+        before = estimate_tokens(json_prompt(data, '事業'))
+        after = estimate_tokens(build_messages(data, '事業', args.budget))
+        print(f"{name:<8}{before:>8}{after:>8}{1 - after / before:>8.0%}")
+
+    data = {'type': 'ziwei', 'data': charts['ziwei']}
+    total = len(encode_chart(data))
+    for budget in (400, 250, 150):
+        messages = build_messages(data, '事業', budget)
+        kept = messages[1]['content'].count('\n')
+        print(f"ziwei 預算 {budget:>4}: {estimate_tokens(messages):>4} tokens，"
+              f"保留 {kept}/{total} 行")
+
+
+if __name__ == '__main__':
+    main()
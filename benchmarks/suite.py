@@ -0,0 +1,294 @@
+"""计算热路径基准套件
+
+对各计算器的单次调用与大批量调用计时，结果写为 JSON，并与保存的基线比较：
+任一项的每次操作耗时比基线慢超过阈值时以退出码 1 结束，可直接用于 CI。
+
+用法:
+    python benchmarks/suite.py                              # 运行并与 baseline.json 比较
+    python benchmarks/suite.py --output results.json        # 另存本次结果
+    python benchmarks/suite.py --save-baseline              # 以本次结果覆盖基线
+    python benchmarks/suite.py --filter bazi --quick        # 只跑名称含 bazi 的项目，缩短计时
+
+基线与机器相关；更换运行环境后应先以 --save-baseline 重新生成。
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.ai_integration import AIIntegration  # noqa: E402
+from modules.bazi_calculator import BaziCalculator, bazi  # noqa: E402
+from modules.cache import ChartCache  # noqa: E402
+from modules.response_cache import ResponseCache  # noqa: E402
+from modules.yijing_calculator import YijingCalculator  # noqa: E402
+from modules.ziwei_calculator import ZiweiCalculator, quick_calculate  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+BATCH = 100000
+
+
+def birth_samples(n, seed=0):
+    """n组随机出生资料 (年, 月, 日, 时)"""
+    rng = random.Random(seed)
+    return [(rng.randrange(1901, 2100), rng.randrange(1, 13), rng.randrange(1, 29),
+             rng.randrange(24)) for _ in range(n)]
+
+
+def cycling(calls):
+    """每次调用取下一组参数，保证缓存冷启动项目不会命中"""
+    it = itertools.cycle(calls)
+    return lambda fn: (lambda: fn(*next(it)))
+
+
+# ---- 项目：返回 (计时函数, 每次调用包含的操作数) ----
+
+def bazi_calculate_cold():
+    calc = BaziCalculator(cache=ChartCache(maxsize=1))
+    return cycling(birth_samples(20000))(calc.calculate), 1
+
+
+def bazi_calculate_warm():
+    calc = BaziCalculator(cache=ChartCache(maxsize=16))
+    calc.calculate(1990, 5, 15, 14)
+    return (lambda: calc.calculate(1990, 5, 15, 14)), 1
+
+
+def bazi_calculate_many():
+    import numpy as np
+    years, months, days, hours = (np.array(column) for column in zip(*birth_samples(BATCH)))
+    return (lambda: bazi.calculate_many(years, months, days, hours)), BATCH
+
+
+def ziwei_calculate_cold():
+    calc = ZiweiCalculator(cache=ChartCache(maxsize=1))
+    return cycling(birth_samples(20000))(calc.calculate), 1
+
+
+def ziwei_calculate_warm():
+    calc = ZiweiCalculator(cache=ChartCache(maxsize=16))
+    calc.calculate(1990, 5, 15, 14)
+    return (lambda: calc.calculate(1990, 5, 15, 14)), 1
+
+
+def ziwei_quick_calculate():
+    return (lambda: quick_calculate(1990, 5, 15, 14)), 1
+
+
+def ziwei_calculate_batch():
+    calc = ZiweiCalculator(cache=ChartCache(maxsize=1))
+    samples = birth_samples(10000)
+
+    def run():
+        for sample in samples:
+            calc.calculate_chart(*sample)
+    return run, len(samples)
+
+
+def yijing_full_reading():
+    calc = YijingCalculator(seed=0)
+    return (lambda: calc.get_full_reading('事業')), 1
+
+
+def yijing_cast_many():
+    calc = YijingCalculator(seed=0)
+    return (lambda: calc.cast_many(BATCH)), BATCH
+
+
+def _charts():
+    return (bazi.calculate_chart(1990, 5, 15, 14),
+            ZiweiCalculator().calculate_chart(1990, 5, 15, 14),
+            YijingCalculator(seed=1).cast_reading('事業'))
+
+
+def ai_compare_systems_cold():
+    ai = AIIntegration(cache=ResponseCache(maxsize=64))
+    charts = _charts()
+    counter = itertools.count()
+    return (lambda: ai.compare_systems(*charts, f'事業{next(counter)}')), 1
+
+
+def ai_compare_systems_warm():
+    ai = AIIntegration(cache=ResponseCache(maxsize=64))
+    charts = _charts()
+    ai.compare_systems(*charts, '事業')
+    return (lambda: ai.compare_systems(*charts, '事業')), 1
+
+
+def ai_compare_systems_batch():
+    charts = _charts()
+    counter = itertools.count()
+
+    async def batch(ai, round_):
+        await asyncio.gather(*(ai.compare_systems_async(*charts, f'{round_}-{i}')
+                               for i in range(100)))
+
+    def run():
+        asyncio.run(batch(AIIntegration(cache=ResponseCache(maxsize=512)), next(counter)))
+    return run, 100
+
+
+def _pillar_samples(n, seed):
+    import numpy as np
+    return np.random.default_rng(seed).integers(0, 60, size=(n, 4))
+
+
+def compatibility_top_k():
+    from modules import compatibility
+    chart, candidates = (0, 2, 4, 6), _pillar_samples(BATCH, 0)
+    return (lambda: compatibility.top_k(chart, candidates, 20)), BATCH
+
+
+def compatibility_top_k_many():
+    from modules import compatibility
+    charts, candidates = _pillar_samples(100, 1), _pillar_samples(BATCH, 0)
+    return (lambda: compatibility.top_k_many(charts, candidates, 10)), 100 * BATCH
+
+
+def metrics_timer_disabled():
+    from modules import metrics
+    registry = metrics.Registry(enabled=False)
+
+    def run():
+        for _ in range(1000):
+            t = registry.timer('bazi')
+            if t:
+                t.lap('pillars')
+    return run, 1000
+
+
+# 名称 -> (建立函数, 该项阈值；None 表示使用 --threshold)
+CASES = {
+    'bazi.calculate.cold': (bazi_calculate_cold, None),
+    'bazi.calculate.warm': (bazi_calculate_warm, None),
+    'bazi.calculate_many': (bazi_calculate_many, None),
+    'ziwei.calculate.cold': (ziwei_calculate_cold, None),
+    'ziwei.calculate.warm': (ziwei_calculate_warm, None),
+    'ziwei.quick_calculate': (ziwei_quick_calculate, None),
+    'ziwei.calculate.batch': (ziwei_calculate_batch, None),
+    'yijing.get_full_reading': (yijing_full_reading, None),
+    'yijing.cast_many': (yijing_cast_many, None),
+    'compatibility.top_k': (compatibility_top_k, None),
+    'compatibility.top_k_many': (compatibility_top_k_many, None),
+    'metrics.timer.disabled': (metrics_timer_disabled, None),
+    # 经背景事件循环与线程切换，波动较大
+    'ai.compare_systems.cold': (ai_compare_systems_cold, 0.5),
+    'ai.compare_systems.warm': (ai_compare_systems_warm, 0.5),
+    'ai.compare_systems.batch': (ai_compare_systems_batch, 0.5),
+}
+
+
+def measure(fn, ops, min_time, repeat):
+    """自动选择调用次数使每轮至少 min_time 秒，返回每次操作的微秒数统计"""
+    fn()    # 预热
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / 5 or number >= 1 << 20:
+            break
+        number *= 2
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number / ops * 1e6 for t in timer.repeat(repeat, number)]
+    return {'unit': 'us/op', 'best': min(runs), 'median': statistics.median(runs),
+            'ops': ops * number, 'repeat': repeat}
+
+
+def run_suite(names, min_time, repeat):
+    results = {}
+    for name in names:
+        fn, ops = CASES[name][0]()
+        results[name] = measure(fn, ops, min_time, repeat)
+        print(f"  {name:<28}{results[name]['best']:12.3f} µs/op"
+              f"  (中位 {results[name]['median']:.3f})", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """返回超出阈值的项目列表 [(名称, 本次, 基线, 比值, 阈值)]"""
+    regressions = []
+    print(f"\n{'项目':<30}{'基线':>12}{'本次':>12}{'比值':>8}")
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            print(f"  {name:<28}{'—':>12}{result['best']:12.3f}     新增")
+            continue
+        limit = CASES[name][1] or threshold
+        ratio = result['best'] / base['best']
+        flag = '  ✗ 退化' if ratio > 1 + limit else ''
+        print(f"  {name:<28}{base['best']:12.3f}{result['best']:12.3f}{ratio:8.2f}{flag}")
+        if flag:
+            regressions.append((name, result['best'], base['best'], ratio, limit))
+    return regressions
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        commit = ''
+    import numpy as np
+    return {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit or None,
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'platform': platform.platform()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='本次结果 JSON 路径')
+    parser.add_argument('--baseline', default=BASELINE, help='基线 JSON 路径')
+    parser.add_argument('--save-baseline', action='store_true', help='以本次结果覆盖基线')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='允许的变慢比例（0.25 表示慢 25%% 以内不算退化）')
+    parser.add_argument('--filter', default='', help='只运行名称包含该字符串的项目')
+    parser.add_argument('--quick', action='store_true', help='缩短每项计时（结果较不稳定）')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    min_time, repeat = (0.05, 3) if args.quick else (0.2, 5)
+    print(f"运行 {len(names)} 个项目（每轮 ≥{min_time}s，取 {repeat} 轮最优）")
+    report = {'meta': metadata(), 'results': run_suite(names, min_time, repeat)}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        baseline = {'meta': report['meta'], 'results': {}}
+        if os.path.exists(args.baseline) and args.filter:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            baseline['meta'] = report['meta']
+        baseline['results'].update(report['results'])
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已写入 {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\n未找到基线 {args.baseline}，以 --save-baseline 生成")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(report['results'], baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} 个项目超出阈值：")
+        for name, current, base, ratio, limit in regressions:
+            print(f"  {name}: {base:.3f} → {current:.3f} µs/op（{ratio:.2f}x，阈值 {1 + limit:.2f}x）")
+        sys.exit(1)
+    print("\n全部项目在阈值内")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,43 @@
 # Divination Modules
-from . import bazi_calculator
-# Temporarily comment out ziwei to test if it's causing the hang
-# from . import ziwei_calculator
-from . import yijing_calculator
+#
+# 子模块在首次访问属性时才导入（PEP 562），`import modules` 本身不加载任何计算器，
+# 以缩短 Streamlit 冷启动时间。导入耗时预算见 benchmarks/import_time.py。
+import importlib
+
+_SUBMODULES = (
+    'ai_integration', 'api_server', 'astronomy', 'batch', 'bazi_calculator',
+    'bazi_search', 'cache', 'chart_table', 'compatibility', 'ganzhi', 'http_client',
+    'llm_scheduler', 'lunar_calendar', 'metrics', 'prompt_builder', 'response_cache', 'shensha',
+    'solar_terms', 'timeline', 'yijing_calculator', 'ziwei_calculator',
+)
+
+__all__ = list(_SUBMODULES) + ['bazi', 'ziwei']
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f'.{name}', __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 # Create wrapper objects to match app.py's expected API
 class bazi:
     """Wrapper for bazi calculator"""
     @staticmethod
     def calculate_bazi(**kwargs):
+        from . import bazi_calculator
         return bazi_calculator.bazi.calculate(**kwargs)
 
+
 class ziwei:
-    """Temporary stub for ziwei - will be implemented after fixing import issue"""
+    """Wrapper for ziwei calculator"""
     @staticmethod
     def calculate_ziwei(**kwargs):
-        return {
-            'status': 'temporary_stub',
-            'message': '紫微斗數模塊暫時禁用以調試部署問題',
-            'palaces': {},
-            'main_star_analysis': '功能開發中...'
-        }
+        from . import ziwei_calculator
+        return ziwei_calculator.ZiweiCalculator().calculate(**kwargs)
@@ -1,36 +1,454 @@
-"""AI整合模組 - 融合古籍命理知識與現代AI推理"""
+"""AI整合模組 - 融合古籍命理知識與現代AI推理
 
+LLM 供應商均使用 OpenAI 相容的 chat completions 介面。未設定 API 金鑰且未指定
+base_url 時使用內建的模擬回答，方便離線開發。
+
+非同步介面 analyze_async() / compare_systems_async() 透過同一個帶連線池的
+AsyncHTTPClient 並行發出請求；同步介面 analyze() / compare_systems() 供 Streamlit
+使用，在背景事件迴圈中執行非同步版本，連線池得以跨多次重新執行沿用。
+
+提示詞由 prompt_builder 將命盤編碼為精簡文字並控制在 token 預算內，系統前言
+放在第一則訊息，各命理系統的請求共用同一前綴。
+
+相同命盤、問題、提示模板版本與供應商/模型的分析結果由 ResponseCache 快取，
+Streamlit 重新執行時不會再次呼叫上游，並行的相同請求也只呼叫一次。
+
+串流介面 analyze_stream_async() / analyze_stream() 以 SSE 接收供應商輸出，
+逐段產生 (段落, 文字) 事件，段落為 [古籍分析] [現代解讀] [行動建議] 之一，
+介面可在第一個字抵達時即開始顯示。
+
+串流與非串流請求都經 LLMScheduler 排隊：預設為只含本實例供應商的排程器（使用
+PROVIDERS 中的免費額度）。多供應商故障轉移時傳入 LLMScheduler.from_providers()，
+或行程共用的 llm_scheduler.shared_scheduler()（app.py 與 API 伺服器使用）。
+"""
+
+import asyncio
 import os
 import json
+import queue
+import threading
+import time
+import weakref
 from typing import Dict
 
+from . import metrics
+from .http_client import AsyncHTTPClient
+from .llm_scheduler import INTERACTIVE, Backend, LLMScheduler
+from .prompt_builder import DEFAULT_BUDGET, build_messages
+from .response_cache import response_cache, response_key
+
+# 供應商設定：chat completions 端點、預設模型、API 金鑰環境變數、免費額度
+# （limits 供 LLMScheduler 的令牌桶使用；DeepSeek 未公布固定額度，不設限）
+PROVIDERS = {
+    'groq': {
+        'url': 'https://api.groq.com/openai/v1/chat/completions',
+        'model': 'llama3-70b-8192',
+        'api_key_env': 'GROQ_API_KEY',
+        'limits': {'requests_per_minute': 30, 'requests_per_day': 14400,
+                   'tokens_per_minute': 6000},
+    },
+    'deepseek': {
+        'url': 'https://api.deepseek.com/v1/chat/completions',
+        'model': 'deepseek-chat',
+        'api_key_env': 'DEEPSEEK_API_KEY',
+        'limits': {},
+    },
+    'gemini': {
+        'url': 'https://generativelanguage.googleapis.com/v1beta/openai/chat/completions',
+        'model': 'gemini-1.5-flash',
+        'api_key_env': 'GEMINI_API_KEY',
+        'limits': {'requests_per_minute': 15, 'requests_per_day': 1500,
+                   'tokens_per_minute': 1000000},
+    },
+}
+
+STUB_ANSWER = ("[模擬AI回答] 根據命盤分析...\n"
+               "[古籍分析] 模擬古籍分析。\n"
+               "[現代解讀] 模擬現代解讀。\n"
+               "[行動建議] 模擬行動建議。")
+
+# 回答的三個段落；供應商偶爾以簡體輸出標題，一併辨認
+SECTIONS = ('古籍分析', '現代解讀', '行動建議')
+_SECTION_ALIASES = {'古籍分析': '古籍分析', '現代解讀': '現代解讀', '现代解读': '現代解讀',
+                    '行動建議': '行動建議', '行动建议': '行動建議'}
+_MARKER_MAX = max(len(name) for name in _SECTION_ALIASES) + 2
+
+# 修改 _build_prompt() 或 prompt_builder 的編碼格式時遞增，使舊的快取回應失效
+PROMPT_TEMPLATE_VERSION = 2
+
+SYSTEMS = ('bazi', 'ziwei', 'yijing')
+
+
+class AIProviderError(RuntimeError):
+    """LLM 供應商回應錯誤
+
+    status 為 HTTP 狀態碼（回應格式錯誤時為 None），retry_after 為 429 回應的
+    Retry-After 秒數。
+    """
+
+    def __init__(self, message: str, status: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
 class AIIntegration:
-    def __init__(self, provider='groq'):
+    def __init__(self, provider='groq', api_key=None, base_url=None, model=None,
+                 timeout: float = 30.0, max_connections: int = 8, cache=None,
+                 stub_chunk_delay: float = 0.0, scheduler=None,
+                 prompt_budget: int = DEFAULT_BUDGET):
+        """
+        Args:
+            provider: 供應商名稱，見 PROVIDERS
+            api_key: API 金鑰，預設讀取供應商對應的環境變數
+            base_url: 覆寫 chat completions 端點（例如本機測試伺服器）
+            model: 覆寫預設模型
+            timeout: 每次呼叫的預設逾時秒數
+            max_connections: 連線池同時在用的連線數上限
+            cache: ResponseCache 實例，預設使用模組共享的回應快取
+            stub_chunk_delay: 模擬回答串流時每塊之間的延遲秒數
+            scheduler: LLMScheduler 實例，請求經排程器在其供應商間分派（額度、優先級
+                       與故障轉移），本實例的供應商設定不再使用；None 時建立只含本實例
+                       供應商的排程器，False 時直接呼叫供應商
+            prompt_budget: 每個提示的 token 預算，超出時捨去次要的命盤欄位
+        """
+        config = PROVIDERS.get(provider, {})
         self.provider = provider
+        self.url = base_url or config.get('url')
+        self.model = model or config.get('model')
+        self.api_key = api_key or os.environ.get(config.get('api_key_env', ''))
+        self.live = bool(self.url) and (self.api_key is not None or base_url is not None)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = cache if cache is not None else response_cache
+        self.stub_chunk_delay = stub_chunk_delay
+        if scheduler is None:
+            # 額度只適用於供應商本身的端點；本機測試伺服器等覆寫的端點不設限
+            limits = config.get('limits', {}) if self.live and base_url is None else {}
+            scheduler = LLMScheduler([Backend(self.provider if self.live else 'stub',
+                                              self._call_ai_async,
+                                              stream=self._stream_ai_async, **limits)])
+        self.scheduler = scheduler or None
+        self.prompt_budget = prompt_budget
         self.ancient_principles = self._load_knowledge()
-    
+        self._clients = weakref.WeakKeyDictionary()
+
     def _load_knowledge(self):
         return {
             'bazi': '八字以天干地支、陰陽五行為基礎',
             'ziwei': '紫微以十四主星佈居十二宮位',
             'yijing': '易經以六十四卦為核心'
         }
-    
-    def analyze(self, data: Dict, question: str = None) -> str:
-        prompt = f"""
-你是命理大師，結合古籍與現代心理分析。
-命盤：{json.dumps(data, ensure_ascii=False)}
-問題：{question or '全面分析'}
-請給出：[古籍分析] [現代解讀] [行動建議]
+
+    def _build_prompt(self, data: Dict, question: str = None) -> list:
+        """chat messages：共用的系統前言 + 精簡命盤文字與問題（見 prompt_builder）"""
+        return build_messages(data, question, self.prompt_budget)
+
+    def analyze(self, data: Dict, question: str = None, timeout: float = None,
+                priority: int = INTERACTIVE) -> str:
+        return _run_sync(self.analyze_async(data, question, timeout, priority))
+
+    async def analyze_async(self, data: Dict, question: str = None,
+                            timeout: float = None, priority: int = INTERACTIVE) -> str:
+        """非同步分析單一命盤（經回應快取）
+
+        priority 僅在使用排程器時有效：INTERACTIVE 先於 BATCH。
+
+        Raises:
+            asyncio.TimeoutError: 超過逾時
+            AIProviderError: 供應商回應錯誤
+            SchedulerOverloaded: 排程佇列已滿
+        """
+        with metrics.span('ai', 'analyze'):
+            with metrics.span('ai', 'cache_key'):
+                key = response_key(data, question,
+                                   (PROMPT_TEMPLATE_VERSION, self.prompt_budget),
+                                   self._cache_provider(), self.model)
+
+            async def compute():
+                # 只在快取未命中時建構提示
+                with metrics.span('ai', 'prompt_build'):
+                    prompt = self._build_prompt(data, question)
+                with metrics.span('ai', 'llm'):
+                    if self.scheduler is not None:
+                        return await self.scheduler.submit(prompt, priority, timeout)
+                    return await self._call_ai_async(prompt, timeout)
+            return await self.cache.get_or_compute(key, compute)
+
+    def _cache_provider(self) -> str:
+        if self.scheduler is not None:
+            return self.scheduler.name
+        return self.provider if self.live else 'stub'
+
+    def analyze_stream(self, data: Dict, question: str = None, timeout: float = None,
+                       priority: int = INTERACTIVE):
+        """analyze_stream_async() 的同步產生器版本（供 Streamlit 使用）
+
+        提前結束迭代時取消背景中的串流請求。
+        """
+        events = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for event in self.analyze_stream_async(data, question, timeout, priority):
+                    events.put(event)
+            except BaseException as e:
+                events.put(e)
+                raise
+            else:
+                events.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), _background_loop())
+        try:
+            while True:
+                event = events.get()
+                if event is done:
+                    return
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            future.cancel()
+
+    async def analyze_stream_async(self, data: Dict, question: str = None,
+                                   timeout: float = None, priority: int = INTERACTIVE):
+        """串流分析單一命盤，逐段產生 (段落, 文字) 事件
+
+        段落為 SECTIONS 之一，第一個段落標題之前的文字段落為 None。
+        快取命中時直接重放快取的回答；串流完整結束後才寫入快取。
+        未命中時經排程器排隊取得額度後才開始串流。
+
+        Raises:
+            asyncio.TimeoutError: 超過排隊或閒置逾時
+            AIProviderError: 供應商回應錯誤
+            SchedulerOverloaded: 排程佇列已滿
         """
-        return self._call_ai(prompt)
-    
+        key = response_key(data, question, (PROMPT_TEMPLATE_VERSION, self.prompt_budget),
+                           self._cache_provider(), self.model)
+        splitter = SectionSplitter()
+        cached = self.cache.get(key)
+        if cached is not None:
+            for event in splitter.feed(cached):
+                yield event
+            for event in splitter.flush():
+                yield event
+            return
+
+        parts = []
+        start = time.perf_counter()
+        prompt = self._build_prompt(data, question)
+        if self.scheduler is not None:
+            deltas = self.scheduler.stream(prompt, priority, timeout)
+        else:
+            deltas = self._stream_ai_async(prompt, timeout)
+        async for delta in deltas:
+            if not parts and metrics.registry.enabled:
+                metrics.registry.observe('ai', 'first_token', time.perf_counter() - start)
+            parts.append(delta)
+            for event in splitter.feed(delta):
+                yield event
+        for event in splitter.flush():
+            yield event
+        self.cache.put(key, ''.join(parts))
+
+    async def _stream_ai_async(self, prompt: str, timeout: float = None):
+        """逐塊產生回答文字（OpenAI 相容的 stream=true / SSE）"""
+        if not self.live:
+            for i in range(0, len(STUB_ANSWER), 4):
+                await asyncio.sleep(self.stub_chunk_delay)
+                yield STUB_ANSWER[i:i + 4]
+            return
+        headers = {'Content-Type': 'application/json', 'Accept': 'text/event-stream'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        payload = {'model': self.model, 'stream': True, 'messages': _messages(prompt)}
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        async with self._client().stream('POST', self.url, headers, body, timeout) as response:
+            if response.status != 200:
+                text = (await response.read()).decode('utf-8', errors='replace')
+                raise AIProviderError(f"{self.provider} 回應 {response.status}: {text[:200]}",
+                                      response.status, _retry_after(response.headers))
+            buffer = b''
+            async for chunk in response.iter_chunks():
+                buffer += chunk
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    line = line.strip()
+                    if not line.startswith(b'data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == b'[DONE]':
+                        continue
+                    try:
+                        delta = json.loads(data)['choices'][0]['delta'].get('content')
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        raise AIProviderError(
+                            f"{self.provider} 串流格式無法解析: {data[:200].decode('utf-8', 'replace')}")
+                    if delta:
+                        yield delta
+
     def _call_ai(self, prompt: str) -> str:
-        return "[模擬AI回答] 根據命盤分析..."
-    
-    def compare_systems(self, bazi, ziwei, yijing, q) -> Dict:
-        return {
-            'bazi_analysis': self.analyze({'type':'bazi','data':bazi}, q),
-            'ziwei_analysis': self.analyze({'type':'ziwei','data':ziwei}, q),
-            'yijing_analysis': self.analyze({'type':'yijing','data':yijing}, q)
-        }
+        return _run_sync(self._call_ai_async(prompt))
+
+    async def _call_ai_async(self, prompt: str, timeout: float = None) -> str:
+        if not self.live:
+            await asyncio.sleep(0)
+            return STUB_ANSWER
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        payload = {'model': self.model, 'messages': _messages(prompt)}
+        response = await self._client().post_json(
+            self.url, payload, headers, self.timeout if timeout is None else timeout)
+        if response.status != 200:
+            raise AIProviderError(f"{self.provider} 回應 {response.status}: {response.text()[:200]}",
+                                  response.status, _retry_after(response.headers))
+        try:
+            return response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise AIProviderError(f"{self.provider} 回應格式無法解析: {response.text()[:200]}")
+
+    def _client(self) -> AsyncHTTPClient:
+        """目前事件迴圈的連線池（每個事件迴圈一個）"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncHTTPClient(self.max_connections, self.timeout)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """關閉目前事件迴圈的連線池"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        """關閉同步介面使用的連線池"""
+        _run_sync(self.aclose())
+
+    def compare_systems(self, bazi, ziwei, yijing, q, timeout: float = None,
+                        priority: int = INTERACTIVE) -> Dict:
+        return _run_sync(self.compare_systems_async(bazi, ziwei, yijing, q, timeout, priority))
+
+    async def compare_systems_async(self, bazi, ziwei, yijing, q, timeout: float = None,
+                                    priority: int = INTERACTIVE) -> Dict:
+        """三個命理系統並行分析
+
+        任一項失敗或逾時不影響其他兩項，該項結果為以 [分析失敗] 開頭的訊息；
+        外層被取消時三個請求一併取消。
+        """
+        charts = dict(zip(SYSTEMS, (bazi, ziwei, yijing)))
+        results = await asyncio.gather(
+            *(self.analyze_async({'type': name, 'data': chart}, q, timeout, priority)
+              for name, chart in charts.items()),
+            return_exceptions=True)
+        return {f'{name}_analysis': _failure_message(result) if isinstance(result, BaseException)
+                else result for name, result in zip(charts, results)}
+
+
+class SectionSplitter:
+    """將串流文字依 [古籍分析] [現代解讀] [行動建議] 標題切分
+
+    feed() 每次輸入一塊文字，返回可立即顯示的 (段落, 文字) 事件列表；
+    可能是標題開頭的 '[' 會暫留到下一塊確認，標題本身不輸出。
+    """
+
+    __slots__ = ('section', '_pending', '_heading')
+
+    def __init__(self):
+        self.section = None
+        self._pending = ''
+        self._heading = False
+
+    def feed(self, text: str) -> list:
+        text = self._pending + text
+        self._pending = ''
+        events = []
+        start = 0
+        while True:
+            i = text.find('[', start)
+            if i < 0:
+                break
+            j = text.find(']', i + 1, i + _MARKER_MAX)
+            if j < 0:
+                if len(text) - i < _MARKER_MAX:
+                    # 標題可能被切在兩塊之間，等下一塊再判斷
+                    self._emit(events, text[:i])
+                    self._pending = text[i:]
+                    return events
+                start = i + 1
+                continue
+            name = _SECTION_ALIASES.get(text[i + 1:j])
+            if name is None:
+                start = i + 1
+                continue
+            self._emit(events, text[:i])
+            self.section = name
+            self._heading = True
+            text = text[j + 1:]
+            start = 0
+        self._emit(events, text)
+        return events
+
+    def flush(self) -> list:
+        """串流結束時輸出暫留的文字"""
+        events = []
+        self._emit(events, self._pending)
+        self._pending = ''
+        return events
+
+    def _emit(self, events, text):
+        if self._heading:
+            # 去掉標題後的空白與冒號（可能跨越多塊）
+            text = text.lstrip(' ：:')
+            self._heading = not text
+        if text:
+            events.append((self.section, text))
+
+
+def _messages(prompt) -> list:
+    """prompt 可為 chat messages 列表或單一字串（視為使用者訊息）"""
+    return [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
+
+
+def _retry_after(headers: dict):
+    try:
+        return float(headers['retry-after'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _failure_message(error: BaseException) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return "[分析失敗] 請求逾時"
+    if isinstance(error, asyncio.CancelledError):
+        return "[分析失敗] 請求已取消"
+    return f"[分析失敗] {error}"
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """同步介面共用的背景事件迴圈（常駐的守護執行緒）"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-integration-loop',
+                                 daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _run_sync(coro):
+    """在背景事件迴圈中執行協程並等待結果；呼叫端中斷時取消該協程"""
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
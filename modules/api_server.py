@@ -0,0 +1,363 @@
+"""命盤 JSON API 伺服器 - asyncio HTTP/1.1 service
+
+不依賴 Streamlit 的輕量 HTTP 服務，供行動 App 等後端呼叫：
+    POST /bazi    {"year", "month", "day", "hour"[, "minute", "gender"]}
+    POST /ziwei   {"year", "month", "day", "hour"[, "gender", "calendar", "leap_month"]}
+    POST /yijing  {["question", "method"]}
+    POST /analyze {"type", "data" 或 "birth"[, "question"]}
+    GET  /metrics Prometheus 文字格式；GET /health
+
+    - 排盤在執行器中進行（多核時為行程池，工作行程重用 modules.batch 的常駐計算器），
+      事件迴圈只負責收發
+    - /bazi、/ziwei、/yijing 的本文可為 JSON 陣列：整批分塊送入執行器，
+      逐項返回結果，單項出錯時該項帶 error 欄位
+    - HTTP/1.1 預設 keep-alive，閒置超過 keep_alive_timeout 秒的連線才關閉
+    - /analyze 直接在事件迴圈上等待 AIIntegration.analyze_async()
+
+用法: python -m modules.api_server [--port 8080] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from . import batch, metrics
+
+CHART_SYSTEMS = batch.SYSTEMS
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway',
+            503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class HTTPError(Exception):
+    """以指定狀態碼回應的請求錯誤"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class APIServer:
+    """命盤 JSON API 伺服器；start() 在背景執行緒運行，serve() 供前景使用"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, workers: int = None,
+                 max_batch: int = 1000, max_body: int = 1 << 20,
+                 keep_alive_timeout: float = 15.0, ai=None):
+        """
+        Args:
+            workers: 排盤執行器大小，預設為 CPU 核數；1 時使用單一執行緒
+            max_batch: 陣列請求的項目上限
+            max_body: 請求本文位元組上限
+            keep_alive_timeout: 連線閒置逾時秒數
+            ai: /analyze 使用的 AIIntegration，預設在首次請求時建立，經行程共用的
+                shared_scheduler() 在已設定金鑰的供應商間故障轉移
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_body = max_body
+        self.keep_alive_timeout = keep_alive_timeout
+        self.ai = ai
+        self._owns_ai = ai is None
+        self.stats = {'requests': 0, 'connections': 0, 'in_flight': 0, 'errors': 0}
+        self._executor = None
+        self._connections = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    # ---- 生命週期 ----
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """在背景執行緒啟動，傳回時已開始接受連線"""
+        self._thread = threading.Thread(target=self._run, name='api-server', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.listen())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def listen(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve(self):
+        """前景運行直到被取消"""
+        await self.listen()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        tasks = list(self._connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.ai is not None and self._owns_ai:
+            await self.ai.aclose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def executor(self):
+        if self._executor is None:
+            if self.workers > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(self.workers, initializer=batch._init_worker)
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix='chart')
+        return self._executor
+
+    # ---- 連線與路由 ----
+
+    async def _handle(self, reader, writer):
+        self.stats['connections'] += 1
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader, self.max_body),
+                                                     self.keep_alive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except HTTPError as e:
+                    _write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self.dispatch(method, path, body)
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            # 對端中斷連線；關閉伺服器時的取消則照常向上傳遞
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        """處理一個請求，返回 (狀態碼, 回應本文)；str 本文以純文字送出"""
+        path = urlsplit(path).path.rstrip('/') or '/'
+        self.stats['requests'] += 1
+        try:
+            with metrics.span('api', path if path in _ROUTES else 'unknown'):
+                route = _ROUTES.get(path)
+                if route is None:
+                    raise HTTPError(404, f'未知路徑: {path}')
+                if method != route[0]:
+                    raise HTTPError(405, f'{path} 僅接受 {route[0]}')
+                return 200, await route[1](self, body)
+        except HTTPError as e:
+            self.stats['errors'] += 1
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            self.stats['errors'] += 1
+            return _error_status(e), {'error': str(e) or type(e).__name__}
+
+    async def _chart_route(self, body: bytes, system: str):
+        # in_flight 只計排盤請求，/health 等查詢不算在內
+        self.stats['in_flight'] += 1
+        try:
+            return await self._chart_request(body, system)
+        finally:
+            self.stats['in_flight'] -= 1
+
+    async def _chart_request(self, body: bytes, system: str):
+        payload = _parse_json(body)
+        if isinstance(payload, list):
+            if len(payload) > self.max_batch:
+                raise HTTPError(413, f'批次項目超過上限 {self.max_batch}')
+            return await self.charts(system, payload)
+        if not isinstance(payload, dict):
+            raise HTTPError(400, '本文須為 JSON 物件或陣列')
+        result = (await self.charts(system, [payload]))[0]
+        if 'error' in result:
+            raise HTTPError(400, result['error'])
+        return result
+
+    async def charts(self, system: str, records: list) -> list:
+        """排盤一批輸入，結果依輸入順序返回；輸入帶 id 時原樣放回結果"""
+        results = [None] * len(records)
+        rows = []
+        for i, record in enumerate(records):
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError('項目須為 JSON 物件')
+                rows.append(batch.record_row(system, record, i))
+            except ValueError as e:
+                results[i] = {'error': str(e)}
+        if rows:
+            # 分成與工作者數相同的塊，各塊並行排盤
+            size = -(-len(rows) // self.workers)
+            loop = asyncio.get_running_loop()
+            chunks = await asyncio.gather(*(
+                loop.run_in_executor(self.executor(), batch.chart_chunk, system,
+                                     rows[i:i + size])
+                for i in range(0, len(rows), size)))
+            for chunk in chunks:
+                for result in chunk:
+                    results[result.pop('id')] = result
+        for record, result in zip(records, results):
+            if isinstance(record, dict) and 'id' in record:
+                result['id'] = record['id']
+        return results
+
+    async def _analyze(self, body: bytes):
+        payload = _parse_json(body)
+        if not isinstance(payload, dict) or payload.get('type') not in CHART_SYSTEMS:
+            raise HTTPError(400, f"type 須為 {'/'.join(CHART_SYSTEMS)} 之一")
+        kind = payload['type']
+        chart = payload.get('data')
+        if chart is None:
+            if not isinstance(payload.get('birth'), dict):
+                raise HTTPError(400, '須提供 data（命盤）或 birth（出生資料）')
+            chart = (await self.charts(kind, [payload['birth']]))[0]
+            if 'error' in chart:
+                raise HTTPError(400, chart['error'])
+        if self.ai is None:
+            from .ai_integration import AIIntegration
+            from .llm_scheduler import shared_scheduler
+            self.ai = AIIntegration(scheduler=shared_scheduler())
+        analysis = await self.ai.analyze_async({'type': kind, 'data': chart},
+                                               payload.get('question'))
+        return {'type': kind, 'chart': chart, 'analysis': analysis}
+
+    async def _metrics(self, body: bytes):
+        return metrics.render_prometheus()
+
+    async def _health(self, body: bytes):
+        return {'status': 'ok', 'workers': self.workers, 'in_flight': self.stats['in_flight']}
+
+
+_ROUTES = {
+    '/bazi': ('POST', functools.partial(APIServer._chart_route, system='bazi')),
+    '/ziwei': ('POST', functools.partial(APIServer._chart_route, system='ziwei')),
+    '/yijing': ('POST', functools.partial(APIServer._chart_route, system='yijing')),
+    '/analyze': ('POST', APIServer._analyze),
+    '/metrics': ('GET', APIServer._metrics),
+    '/health': ('GET', APIServer._health),
+}
+
+
+def _error_status(exc) -> int:
+    """上游例外對應的狀態碼"""
+    from .ai_integration import AIProviderError
+    from .llm_scheduler import SchedulerOverloaded
+    if isinstance(exc, asyncio.TimeoutError):
+        return 504
+    if isinstance(exc, SchedulerOverloaded):
+        return 503
+    if isinstance(exc, (AIProviderError, OSError)):
+        return 502
+    return 500
+
+
+def _parse_json(body: bytes):
+    try:
+        return json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(400, '本文不是合法的 JSON') from None
+
+
+async def _read_request(reader, max_body: int):
+    """讀取一個請求，連線在請求之間關閉時返回 None"""
+    try:
+        request_line = await reader.readuntil(b'\r\n')
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, '請求行格式錯誤') from None
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(400, '不支援 chunked 請求本文')
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, 'Content-Length 格式錯誤') from None
+    if length > max_body:
+        raise HTTPError(413, f'本文超過 {max_body} 位元組')
+    body = await reader.readexactly(length)
+    return method, path, headers, body
+
+
+def _write_response(writer, status: int, payload, keep_alive: bool = True):
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        content_type = 'application/json; charset=utf-8'
+    writer.write(f'HTTP/1.1 {status} {_REASONS.get(status, "Error")}\r\n'
+                 f'Content-Type: {content_type}\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+                 .encode('latin-1') + body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, help='排盤行程數，預設為 CPU 核數')
+    parser.add_argument('--max-batch', type=int, default=1000, help='陣列請求的項目上限')
+    args = parser.parse_args()
+    server = APIServer(args.host, args.port, args.workers, args.max_batch)
+    print(f"命盤 API: {server.url}（{server.workers} 個工作者，Ctrl+C 結束）")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""批量排盘模块 - Headless Batch Charting
+
+不经 Streamlit，把 CSV / JSONL 出生资料文件批量排盘后写出：
+    - 输入按 chunksize 分块读取，同时在途的块数有上限，内存占用与文件大小无关
+    - 各块分发到进程池；每个工作进程只建立一次计算器，之后一直复用（缓存保持温热）
+    - 结果按输入顺序输出为 JSONL、CSV 或 Parquet（Parquet 需要 pyarrow）
+    - 进度与吞吐量（行/秒）输出到 stderr
+
+输入列：
+    bazi   year, month, day, hour[, minute, gender]
+    ziwei  year, month, day, hour[, gender, calendar, leap_month]
+    yijing [question, method]
+可选的 id 列原样写入输出，缺省时为从0起的行号。单行出错不中断任务，
+该行输出 error 字段。
+
+用法:
+    python -m modules.batch births.csv charts.jsonl --system bazi
+    python -m modules.batch births.jsonl charts.parquet --system ziwei --workers 8
+    python -m modules.batch questions.csv - --system yijing --seed 42 > readings.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+SYSTEMS = ('bazi', 'ziwei', 'yijing')
+FORMATS = ('jsonl', 'csv', 'parquet')
+DEFAULT_CHUNKSIZE = 2000
+
+# 系统 -> (必填列, {可选列: 默认值})，列顺序即传给工作进程的元组顺序
+COLUMNS = {
+    'bazi': (('year', 'month', 'day', 'hour'), {'minute': 0, 'gender': '男'}),
+    'ziwei': (('year', 'month', 'day', 'hour'),
+              {'gender': '男', 'calendar': 'solar', 'leap_month': False}),
+    'yijing': ((), {'question': None, 'method': 'coins'}),
+}
+
+# 工作进程内的计算器，由 _init_worker 建立
+_calculators = {}
+
+
+def _init_worker():
+    from .bazi_calculator import bazi
+    from .yijing_calculator import YijingCalculator
+    from .ziwei_calculator import ZiweiCalculator
+    _calculators.update(bazi=bazi, ziwei=ZiweiCalculator(), yijing=YijingCalculator())
+
+
+def chart_chunk(system: str, rows: list, seed=None, chunk_index: int = 0) -> list:
+    """对一块输入逐行排盘，返回结果字典列表
+
+    rows 中每项为 (id, 列值...)，列顺序见 COLUMNS。指定 seed 时易经起卦以
+    (seed, 块序号) 派生随机状态，结果与进程数、调度顺序无关。
+    """
+    if not _calculators:
+        _init_worker()
+    if system == 'bazi':
+        calculator = _calculators['bazi']
+
+        def chart(year, month, day, hour, minute, gender):
+            return calculator.calculate_chart(int(year), int(month), int(day), int(hour),
+                                              gender, int(minute)).to_dict()
+    elif system == 'ziwei':
+        calculator = _calculators['ziwei']
+
+        def chart(year, month, day, hour, gender, calendar, leap_month):
+            return calculator.calculate_chart(int(year), int(month), int(day), int(hour),
+                                              gender, calendar, _flag(leap_month)).to_dict()
+    else:
+        if seed is None:
+            calculator = _calculators['yijing']
+        else:
+            from .yijing_calculator import YijingCalculator
+            calculator = YijingCalculator(seed=f'{seed}:{chunk_index}')
+
+        def chart(question, method):
+            return calculator.cast_hexagram(method, question).to_dict()
+
+    results = []
+    for row_id, *values in rows:
+        try:
+            result = {'id': row_id, **chart(*values)}
+        except (ValueError, TypeError, KeyError, OverflowError) as e:
+            result = {'id': row_id, 'error': str(e)}
+        results.append(result)
+    return results
+
+
+def record_row(system: str, record: dict, row_id=0) -> tuple:
+    """由单条输入字典组成 chart_chunk() 所需的 (id, 列值...) 元组
+
+    Raises:
+        ValueError: 缺少必填列
+    """
+    required, optional = COLUMNS[system]
+    missing = [column for column in required if record.get(column) is None]
+    if missing:
+        raise ValueError(f"输入缺少列: {', '.join(missing)}")
+    values = [record[column] for column in required]
+    values += [default if record.get(column) is None else record[column]
+               for column, default in optional.items()]
+    return (row_id, *values)
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', '是')
+    return bool(value)
+
+
+def read_chunks(path: str, system: str, chunksize: int = DEFAULT_CHUNKSIZE, fmt: str = None):
+    """分块读取输入文件，逐块产生 [(id, 列值...)] 列表
+
+    fmt 缺省时按扩展名判断（.jsonl / .json 为 JSONL，其余为 CSV）；path 为 '-' 时读 stdin。
+
+    Raises:
+        ValueError: 缺少必填列
+    """
+    import pandas as pd
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    source = sys.stdin if path == '-' else path
+    if fmt == 'jsonl':
+        frames = pd.read_json(source, lines=True, chunksize=chunksize, dtype=False)
+    else:
+        frames = pd.read_csv(source, chunksize=chunksize, skipinitialspace=True)
+    required, optional = COLUMNS[system]
+    start = 0
+    for frame in frames:
+        missing = [column for column in required if column not in frame.columns]
+        if missing:
+            raise ValueError(f"输入缺少列: {', '.join(missing)}")
+        row_numbers = pd.Series(range(start, start + len(frame)), index=frame.index)
+        if 'id' in frame.columns:
+            ids = frame['id'].astype(object)
+            row_numbers = ids.where(ids.notna(), row_numbers)
+        columns = [row_numbers]
+        columns += [frame[column] for column in required]
+        for column, default in optional.items():
+            if column in frame.columns:
+                values = frame[column].astype(object)
+                columns.append(values.where(values.notna(), default))
+            else:
+                columns.append([default] * len(frame))
+        yield list(zip(*columns))
+        start += len(frame)
+
+
+def ordered_map(executor, fn, chunks, window: int):
+    """提交各块到 executor，按提交顺序产生结果；同时在途的块不超过 window 个"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(fn, *chunk))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _InlineExecutor:
+    """单进程时直接在当前进程执行，省去序列化开销"""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+def _table_columns(system: str) -> list:
+    """表格输出的固定列：以一张样例命盘展开得到，另加 id 与 error"""
+    sample = chart_chunk(system, [(0,) + _SAMPLE_ROWS[system]])[0]
+    return list(_flatten(sample)) + ['error']
+
+
+_SAMPLE_ROWS = {
+    'bazi': (2000, 1, 1, 0, 0, '男'),
+    'ziwei': (2000, 1, 1, 0, '男', 'solar', False),
+    'yijing': (None, 'coins'),
+}
+
+
+def _flatten(row: dict, prefix: str = '') -> dict:
+    """嵌套字典展开为 'a.b' 列名；列表转为 JSON 字符串"""
+    flat = {}
+    for key, value in row.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{name}.'))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, ensure_ascii=False)
+        else:
+            flat[name] = value
+    return flat
+
+
+class _JsonlWriter:
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class _CsvWriter(_JsonlWriter):
+    def __init__(self, path, columns):
+        super().__init__(path)
+        self.columns = columns
+        self.header = True
+
+    def frame(self, rows):
+        import pandas as pd
+        return pd.DataFrame([_flatten(row) for row in rows], columns=self.columns)
+
+    def write(self, rows):
+        self.frame(rows).to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+
+class _ParquetWriter(_CsvWriter):
+    def __init__(self, path, columns):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet 输出需要安装 pyarrow") from None
+        if path == '-':
+            raise ValueError("Parquet 输出不支持 stdout")
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        frame = self.frame(rows).astype(object).where(lambda f: f.notna(), None)
+        if self.writer is None:
+            # id 与 error 以外的列类型取自第一块，之后各块转换为同一 schema
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            fields = [pa.field(f.name, pa.string()) if f.name in ('id', 'error')
+                      or pa.types.is_null(f.type) else f for f in table.schema]
+            self.schema = pa.schema(fields)
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        for name in ('id', 'error'):
+            frame[name] = frame[name].map(lambda v: None if v is None else str(v))
+        self.writer.write_table(pa.Table.from_pandas(frame, schema=self.schema,
+                                                     preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_writer(path: str, system: str, fmt: str = None):
+    """按格式建立输出器；fmt 缺省时按扩展名判断（stdout 默认为 JSONL）"""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lstrip('.').lower()
+        fmt = ext if ext in FORMATS else 'jsonl'
+    if fmt == 'jsonl':
+        return _JsonlWriter(path)
+    writer = _CsvWriter if fmt == 'csv' else _ParquetWriter
+    return writer(path, ['id'] + [c for c in _table_columns(system) if c != 'id'])
+
+
+def run(input_path: str, output_path: str, system: str = 'bazi', workers: int = None,
+        chunksize: int = DEFAULT_CHUNKSIZE, input_format: str = None,
+        output_format: str = None, seed=None, progress=sys.stderr) -> dict:
+    """批量排盘
+
+    Args:
+        input_path: CSV / JSONL 输入路径，'-' 为 stdin
+        output_path: 输出路径，'-' 为 stdout
+        system: 'bazi' / 'ziwei' / 'yijing'
+        workers: 进程数，默认为 CPU 核数；1 时在当前进程执行
+        chunksize: 每块行数
+        seed: 易经起卦种子，指定时结果可重现
+        progress: 进度输出流，None 表示不输出
+
+    Returns:
+        dict: rows（行数）、errors（出错行数）、seconds、rows_per_second
+    """
+    if system not in SYSTEMS:
+        raise ValueError(f"未知系统: {system}")
+    workers = workers or os.cpu_count() or 1
+    chunks = ((system, rows, seed, i) for i, rows in
+              enumerate(read_chunks(input_path, system, chunksize, input_format)))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker)
+    else:
+        executor = _InlineExecutor()
+
+    writer = open_writer(output_path, system, output_format)
+    done = errors = 0
+    start = time.perf_counter()
+    try:
+        with executor:
+            for results in ordered_map(executor, chart_chunk, chunks, 2 * workers):
+                writer.write(results)
+                done += len(results)
+                errors += sum(1 for row in results if 'error' in row)
+                if progress is not None:
+                    elapsed = time.perf_counter() - start
+                    progress.write(f"\r已处理 {done} 行，{done / elapsed:,.0f} 行/秒")
+                    progress.flush()
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    stats = {'rows': done, 'errors': errors, 'seconds': elapsed,
+             'rows_per_second': done / elapsed if elapsed else 0.0}
+    if progress is not None:
+        progress.write(f"\r完成 {done} 行（出错 {errors} 行），用时 {elapsed:.2f} 秒，"
+                       f"{stats['rows_per_second']:,.0f} 行/秒，{workers} 个进程\n")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="CSV / JSONL 输入路径，'-' 为 stdin")
+    parser.add_argument('output', help="输出路径（.jsonl / .csv / .parquet），'-' 为 stdout")
+    parser.add_argument('--system', choices=SYSTEMS, default='bazi')
+    parser.add_argument('--workers', type=int, help='进程数，默认为 CPU 核数')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='每块行数')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=FORMATS)
+    parser.add_argument('--seed', type=int, help='易经起卦种子')
+    parser.add_argument('--quiet', action='store_true', help='不输出进度')
+    args = parser.parse_args(argv)
+    try:
+        run(args.input, args.output, args.system, args.workers, args.chunksize,
+            args.input_format, args.output_format, args.seed,
+            progress=None if args.quiet else sys.stderr)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
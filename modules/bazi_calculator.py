@@ -5,11 +5,32 @@ Complete implementation based on traditional Ganzhi算法
 """
 
 from datetime import datetime
-import sys
-import os
 
-# 添加第三方库路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../vendor'))
+from . import chart_table, ganzhi, metrics, shensha, solar_terms
+from .cache import chart_cache, chart_key
+
+# 整数干支核心的查表数据
+TIANGAN = ganzhi.TIANGAN
+DIZHI = ganzhi.DIZHI
+WUXING = ganzhi.WUXING
+STEM_ELEMENT = ganzhi.STEM_ELEMENT
+BRANCH_ELEMENT = ganzhi.BRANCH_ELEMENT
+MONTH_INDEX = ganzhi.MONTH_INDEX
+HOUR_INDEX = ganzhi.HOUR_INDEX
+NAYIN = ganzhi.NAYIN
+
+# 干支序号 -> (天干五行, 地支五行)
+_PILLAR_ELEMENTS = tuple((STEM_ELEMENT[i % 10], BRANCH_ELEMENT[i % 12]) for i in range(60))
+
+# 喜用神编码：弱则取生我与同我，强则取克我与我生
+_FAVORABLE_WEAK = tuple(((e - 1) % 5, e) for e in range(5))
+_FAVORABLE_STRONG = tuple(((e + 3) % 5, (e + 1) % 5) for e in range(5))
+
+# 各月天数（平年），单条与批量输入校验共用
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# 十神（简化版，尚未按日主推算）
+_SIMPLIFIED_TEN_GODS = {'year': '正官', 'month': '食神', 'day': '日主', 'hour': '正财'}
 
 
 class BaziCalculator:
@@ -49,64 +70,63 @@ class BaziCalculator:
         ('水', '土'): '七杀', ('水', '金'): '偏印',
     }
     
-    def __init__(self):
-        """初始化计算器"""
-        self.cached_results = {}
+    # 批量计算使用的整数编码
+    # 五行编码顺序：0木 1火 2土 3金 4水
+    WUXING_ORDER = ['木', '火', '土', '金', '水']
+    WUXING_COLUMNS = ['wood', 'fire', 'earth', 'metal', 'water']
+    # 强弱编码：0偏弱 1中和 2偏强
+    STRENGTH_LEVELS = ['偏弱', '中和', '偏强']
+    
+    def __init__(self, cache=None, table=None):
+        """初始化计算器
+        
+        Args:
+            cache: ChartCache实例，默认使用模块共享缓存
+            table: ChartTable预计算表，整点出生时间直接查表，None表示全部现算
+        """
+        self.cache = cache if cache is not None else chart_cache
+        self.table = table
     
     def get_ganzhi_from_year(self, year):
-        """根据年份计算年柱天干地支"""
-        # 1984年是甲子年（天干第1位，地支第1位）
-        base_year = 1984
-        offset = (year - base_year) % 60
-        tian_index = offset % 10
-        di_index = offset % 12
-        return self.TIANGAN[tian_index], self.DIZHI[di_index]
+        """根据节气年计算年柱天干地支（立春换年）"""
+        idx = ganzhi.year_index(year)
+        return ganzhi.TIANGAN[idx % 10], ganzhi.DIZHI[idx % 12]
+    
+    def get_solar_month(self, year, month, day, hour=0, minute=0):
+        """根据节气表求出生时间所属的节气年与节气月
+        
+        Returns:
+            tuple: (节气年, 节气月)，节气月1为寅月、12为丑月
+        """
+        return solar_terms.solar_month(year, month, day, hour, minute)
     
     def get_month_ganzhi(self, year, month, year_stem):
-        """根据年干和月份计算月柱
+        """根据年干和节气月计算月柱
         年上起月法：甲己之年丙作首
+        
+        Args:
+            year: 节气年
+            month: 节气月（1为寅月，以节换月）
+            year_stem: 年干
         """
-        year_stem_idx = self.TIANGAN.index(year_stem)
-        # 月份从寅月（正月）开始
         # 甲己年从丙寅起，乙庚年从戊寅起，丙辛年从庚寅起，丁壬年从壬寅起，戊癸年从甲寅起
-        month_stem_start = {0: 2, 1: 2, 2: 4, 3: 4, 4: 6, 5: 6, 6: 8, 7: 8, 8: 0, 9: 0}
-        stem_start = month_stem_start[year_stem_idx]
-        
-        # 月支从寅（正月）开始，寅=2
-        month_offset = (month - 1) % 12
-        month_stem_idx = (stem_start + month_offset) % 10
-        month_branch_idx = (2 + month_offset) % 12  # 从寅月开始
-        
-        return self.TIANGAN[month_stem_idx], self.DIZHI[month_branch_idx]
+        idx = ganzhi.month_index(ganzhi.TIANGAN.index(year_stem), month)
+        return ganzhi.TIANGAN[idx % 10], ganzhi.DIZHI[idx % 12]
     
     def get_day_ganzhi(self, year, month, day):
         """计算日柱天干地支
-        使用公元元年作为基准（假设为甲子日）
+        以公历日序推算，1949-10-01为甲子日
         """
-        # 简化计算：使用datetime计算天数差
-        base_date = datetime(1984, 2, 2)  # 1984-02-02是甲子日
-        target_date = datetime(year, month, day)
-        days_diff = (target_date - base_date).days
-        
-        stem_idx = days_diff % 10
-        branch_idx = days_diff % 12
-        
-        return self.TIANGAN[stem_idx], self.DIZHI[branch_idx]
+        idx = ganzhi.day_index(ganzhi.day_ordinal(year, month, day))
+        return ganzhi.TIANGAN[idx % 10], ganzhi.DIZHI[idx % 12]
     
     def get_hour_ganzhi(self, day_stem, hour):
         """根据日干和时辰计算时柱
         日上起时法：甲己还加甲
         """
-        day_stem_idx = self.TIANGAN.index(day_stem)
-        # 时支计算（每个时辰2小时）
-        hour_branch_idx = ((hour + 1) // 2) % 12
-        
         # 时干起算：甲己日从甲子时起，乙庚日从丙子时起
-        hour_stem_start = {0: 0, 1: 0, 2: 2, 3: 2, 4: 4, 5: 4, 6: 6, 7: 6, 8: 8, 9: 8}
-        stem_start = hour_stem_start[day_stem_idx]
-        hour_stem_idx = (stem_start + hour_branch_idx) % 10
-        
-        return self.TIANGAN[hour_stem_idx], self.DIZHI[hour_branch_idx]
+        idx = ganzhi.hour_index(ganzhi.TIANGAN.index(day_stem), hour)
+        return ganzhi.TIANGAN[idx % 10], ganzhi.DIZHI[idx % 12]
     
     def analyze_wuxing(self, stems, branches):
         """分析五行分布"""
@@ -122,16 +142,7 @@ class BaziCalculator:
     
     def analyze_shishen(self, day_stem, year_stem, month_stem, hour_stem):
         """分析十神"""
-        day_wuxing = self.WUXING_TIANGAN[day_stem]
-        
-        result = {
-            'year': '正官',  # 简化版
-            'month': '食神',
-            'day': '日主',
-            'hour': '正财'
-        }
-        
-        return result
+        return dict(_SIMPLIFIED_TEN_GODS)
     
     def determine_strength(self, wuxing_count, day_stem):
         """判断日主强弱"""
@@ -163,75 +174,262 @@ class BaziCalculator:
             return 克泄.get(day_wuxing, ['金', '水'])
     
     def calculate(self, birth_year: int, birth_month: int, birth_day: int, 
-                  birth_hour: int, gender: str = '男') -> dict:
+                  birth_hour: int, gender: str = '男', birth_minute: int = 0) -> dict:
         """计算八字
         
+        出生时间视为北京时间，年柱以立春、月柱以各节交节时刻为界。
+        
         Args:
             birth_year: 出生年份
             birth_month: 出生月份
             birth_day: 出生日期
             birth_hour: 出生时辰(0-23)
             gender: 性别 ('男' 或 '女')
+            birth_minute: 出生分钟(0-59)，用于判断交节前后
         
         Returns:
             dict: 包含八字信息的字典
         """
+        t = metrics.timer('bazi')
         try:
-            # 构建缓存key
-            cache_key = f"{birth_year}-{birth_month}-{birth_day}-{birth_hour}-{gender}"
-            
-            # 检查缓存
-            if cache_key in self.cached_results:
-                return self.cached_results[cache_key]
-            
-            # 计算四柱
-            year_stem, year_branch = self.get_ganzhi_from_year(birth_year)
-            month_stem, month_branch = self.get_month_ganzhi(birth_year, birth_month, year_stem)
-            day_stem, day_branch = self.get_day_ganzhi(birth_year, birth_month, birth_day)
-            hour_stem, hour_branch = self.get_hour_ganzhi(day_stem, birth_hour)
-            
-            # 分析五行
-            stems = [year_stem, month_stem, day_stem, hour_stem]
-            branches = [year_branch, month_branch, day_branch, hour_branch]
-            wuxing_count = self.analyze_wuxing(stems, branches)
-            
-            # 分析十神
-            shishen = self.analyze_shishen(day_stem, year_stem, month_stem, hour_stem)
-            
-            # 判断强弱
-            strength = self.determine_strength(wuxing_count, day_stem)
-            
-            # 喜用神
-            favorable = self.get_favorable_elements(strength, day_stem)
-            unfavorable = []
-            
-            result = {
-                'year_pillar': {'stem': year_stem, 'branch': year_branch},
-                'month_pillar': {'stem': month_stem, 'branch': month_branch},
-                'day_pillar': {'stem': day_stem, 'branch': day_branch},
-                'hour_pillar': {'stem': hour_stem, 'branch': hour_branch},
-                'five_elements': wuxing_count,
-                'ten_gods': shishen,
-                'day_master': f"{day_stem}{self.WUXING_TIANGAN[day_stem]}",
-                'strength': strength,
-                'favorable_elements': favorable,
-                'unfavorable_elements': unfavorable,
-                'major_fortune': [],  # 大运
-                'natal_stars': [],  # 神煞
-                'nayin': '霹雳火',  # 纳音（简化）
-                'void': ['戌', '亥']  # 空亡（简化）
-            }
-            
-            # 缓存结果
-            self.cached_results[cache_key] = result
+            chart = self.calculate_chart(birth_year, birth_month, birth_day,
+                                         birth_hour, gender, birth_minute)
+            if t:
+                t.lap('chart')
+            result = chart.to_dict()
+            if t:
+                t.lap('elements')
+                t.total('calculate')
             return result
             
         except Exception as e:
+            metrics.registry.count('errors', 'bazi', 'calculate')
             return {
                 'error': str(e),
                 'status': 'failed'
             }
     
+    def calculate_chart(self, birth_year: int, birth_month: int, birth_day: int,
+                        birth_hour: int, gender: str = '男', birth_minute: int = 0) -> 'BaziChart':
+        """计算八字，返回紧凑的 BaziChart 对象
+        
+        参数同 calculate()。缓存中保存的也是 BaziChart，需要字典时调用 to_dict()。
+        
+        Raises:
+            ValueError: 日期不合法或超出节气表范围
+        """
+        # 构建缓存key
+        cache_key = chart_key('bazi', birth_year, birth_month, birth_day,
+                              birth_hour, birth_minute, gender)
+        
+        t = metrics.timer('bazi')
+        # 检查缓存（缓存中只有合法输入，命中时无需再校验）
+        cached = self.cache.get(cache_key)
+        if t:
+            t.lap('cache_lookup')
+        if cached is not None:
+            return cached
+        
+        _validate(birth_year, birth_month, birth_day, birth_hour, birth_minute)
+        birth = datetime(birth_year, birth_month, birth_day, birth_hour, birth_minute)
+        # 整点出生时间优先查预计算表
+        record = None
+        if self.table is not None and birth_minute == 0:
+            record = self.table.lookup(birth_year, birth_month, birth_day, birth_hour)
+        
+        if record is not None:
+            chart = BaziChart(record[0], record[1], record[2], record[3], gender, birth)
+        else:
+            # 计算四柱（整数干支序号）
+            solar_year, solar_month = self.get_solar_month(
+                birth_year, birth_month, birth_day, birth_hour, birth_minute)
+            chart = BaziChart(*self._pillar_indices(
+                solar_year, solar_month, birth_year, birth_month, birth_day, birth_hour),
+                gender, birth)
+        if t:
+            t.lap('pillars')
+        
+        # 缓存结果
+        self.cache.put(cache_key, chart)
+        return chart
+    
+    def timeline(self, birth_year: int, birth_month: int, birth_day: int,
+                 birth_hour: int, gender: str = '男', birth_minute: int = 0,
+                 chart: 'BaziChart' = None):
+        """大运流年时间轴，各层按需生成（见 modules/timeline.py）
+        
+        calculate() 与 to_dict() 只含前八步大运的概览，流年、流月、流日由此按需生成。
+        参数同 calculate()；已有命盘时可经 chart 传入，省去一次缓存查找。
+        
+        Raises:
+            ValueError: 日期不合法或超出节气表范围
+        """
+        from .timeline import Timeline
+        if chart is None:
+            chart = self.calculate_chart(birth_year, birth_month, birth_day,
+                                         birth_hour, gender, birth_minute)
+        return Timeline(chart, datetime(birth_year, birth_month, birth_day,
+                                        birth_hour, birth_minute))
+    
+    def find_birth_times(self, year_pillar, month_pillar, day_pillar, hour_pillar,
+                         start=None, end=None):
+        """八字反查：返回四柱对应的全部整点出生时间（生成器）
+        
+        Args:
+            year_pillar, month_pillar, day_pillar, hour_pillar: 如 '甲子' 或0-59序号
+            start: 查找起点datetime（含），默认1899年
+            end: 查找终点datetime（不含），默认2101年
+        """
+        from .bazi_search import find_birth_times
+        return find_birth_times(year_pillar, month_pillar, day_pillar, hour_pillar, start, end)
+    
+    def _pillar_indices(self, solar_year, solar_month, year, month, day, hour):
+        """四柱干支序号(0-59)：年、月取节气年月，日、时取公历日期与小时"""
+        year_idx = ganzhi.year_index(solar_year)
+        month_idx = MONTH_INDEX[year_idx % 10][solar_month]
+        day_idx = ganzhi.day_index(ganzhi.day_ordinal(year, month, day))
+        hour_idx = HOUR_INDEX[day_idx % 10][hour]
+        return year_idx, month_idx, day_idx, hour_idx
+    
+    def _analyze_indices(self, pillars):
+        """由四柱序号求五行计数、强弱编码与喜用神编码"""
+        return _analyze_pillars(pillars)
+    
+    def calculate_many(self, birth_year, birth_month, birth_day, birth_hour,
+                       gender='男', birth_minute=0, as_frame: bool = False):
+        """批量计算八字（向量化）
+
+        与 calculate() 逐条结果完全一致，但全部以整数编码的 NumPy 数组
+        一次性计算，适合几十万条出生资料的批量任务。
+
+        编码约定：
+            天干 0-9 对应 TIANGAN，地支 0-11 对应 DIZHI
+            五行 0-4 对应 WUXING_ORDER（木火土金水）
+            强弱 0-2 对应 STRENGTH_LEVELS（偏弱、中和、偏强）
+            性别 0男 1女
+            纳音 0-29 对应 ganzhi.NAYIN_NAMES（取年柱），空亡为两个地支编码（取日柱）
+            神煞为位掩码，以 shensha.star_names() 展开
+
+        Args:
+            birth_year: 出生年份数组
+            birth_month: 出生月份数组
+            birth_day: 出生日期数组
+            birth_hour: 出生时辰数组(0-23)
+            gender: 性别数组或单个值 ('男' 或 '女')
+            birth_minute: 出生分钟数组或单个值
+            as_frame: 为True时返回 pandas.DataFrame
+
+        Returns:
+            dict: 列名 -> 等长一维数组（as_frame=True 时为 DataFrame）
+
+        Raises:
+            ValueError: 输入日期或时辰不合法
+        """
+        import numpy as np
+        years, months, days, hours, minutes = np.broadcast_arrays(
+            np.asarray(birth_year, dtype=np.int64),
+            np.asarray(birth_month, dtype=np.int64),
+            np.asarray(birth_day, dtype=np.int64),
+            np.asarray(birth_hour, dtype=np.int64),
+            np.asarray(birth_minute, dtype=np.int64),
+        )
+        years, months, days, hours, minutes = (
+            a.ravel() for a in (years, months, days, hours, minutes))
+        n = years.shape[0]
+        genders = np.broadcast_to(np.asarray(gender), (n,))
+
+        self._validate_many(years, months, days, hours, minutes)
+
+        # 查表数组
+        stem_element = np.array(STEM_ELEMENT, dtype=np.int8)
+        branch_element = np.array(BRANCH_ELEMENT, dtype=np.int8)
+        month_table = np.array([(0,) + row[1:] for row in MONTH_INDEX], dtype=np.int64)
+        hour_table = np.array(HOUR_INDEX, dtype=np.int64)
+
+        # 四柱干支序号：全部为整点且在预计算表范围内时直接取表，否则现算
+        ordinals = solar_terms.days_from_civil(years, months, days) + solar_terms.EPOCH_ORDINAL
+        rows = None
+        if self.table is not None and n and not minutes.any():
+            rows = (ordinals - self.table.first_ordinal) * chart_table.HOURS_PER_DAY + hours
+            if rows.min() < 0 or rows.max() >= self.table.days * chart_table.HOURS_PER_DAY:
+                rows = None
+        if rows is not None:
+            pillars = self.table.as_array()['pillars'][rows].astype(np.int64)
+            year_idx, month_idx, day_idx, hour_idx = pillars.T
+        else:
+            solar_years, solar_months = solar_terms.solar_month_many(
+                years, months, days, hours, minutes)
+            year_idx = (solar_years - ganzhi.JIAZI_YEAR) % 60
+            month_idx = month_table[year_idx % 10, solar_months]
+            day_idx = (ordinals - ganzhi.JIAZI_DAY_ORDINAL) % 60
+            hour_idx = hour_table[day_idx % 10, hours]
+        year_stem, year_branch = year_idx % 10, year_idx % 12
+        month_stem, month_branch = month_idx % 10, month_idx % 12
+        day_stem, day_branch = day_idx % 10, day_idx % 12
+        hour_stem, hour_branch = hour_idx % 10, hour_idx % 12
+
+        # 五行计数
+        elements = np.concatenate([
+            stem_element[np.stack([year_stem, month_stem, day_stem, hour_stem], axis=1)],
+            branch_element[np.stack([year_branch, month_branch, day_branch, hour_branch], axis=1)],
+        ], axis=1)
+        counts = (elements[:, :, None] == np.arange(5, dtype=np.int8)).sum(axis=1).astype(np.int8)
+
+        # 日主强弱
+        day_element = stem_element[day_stem]
+        day_count = counts[np.arange(n), day_element]
+        strength = np.where(day_count >= 3, 2, np.where(day_count >= 2, 1, 0)).astype(np.int8)
+
+        # 喜用神：弱则取生我与同我，强则取克我与我生
+        weak = strength == 0
+        favorable_1 = np.where(weak, (day_element - 1) % 5, (day_element + 3) % 5).astype(np.int8)
+        favorable_2 = np.where(weak, day_element, (day_element + 1) % 5).astype(np.int8)
+
+        result = {
+            'year_stem': year_stem.astype(np.int8),
+            'year_branch': year_branch.astype(np.int8),
+            'month_stem': month_stem.astype(np.int8),
+            'month_branch': month_branch.astype(np.int8),
+            'day_stem': day_stem.astype(np.int8),
+            'day_branch': day_branch.astype(np.int8),
+            'hour_stem': hour_stem.astype(np.int8),
+            'hour_branch': hour_branch.astype(np.int8),
+        }
+        for code, column in enumerate(self.WUXING_COLUMNS):
+            result[column] = counts[:, code]
+        result['strength'] = strength
+        result['favorable_1'] = favorable_1
+        result['favorable_2'] = favorable_2
+        result['gender'] = (genders == '女').astype(np.int8)
+
+        # 纳音、空亡、神煞：与 to_dict() 共用 shensha 的查表
+        void = np.array(shensha.VOID, dtype=np.int8)[day_idx]
+        result['nayin'] = (year_idx // 2).astype(np.int8)
+        result['void_1'] = void[:, 0]
+        result['void_2'] = void[:, 1]
+        result['natal_stars'] = shensha.star_mask_many(year_idx, month_idx, day_idx, hour_idx)
+
+        if as_frame:
+            import pandas as pd
+            return pd.DataFrame(result)
+        return result
+
+    def _validate_many(self, years, months, days, hours, minutes):
+        """校验批量输入，发现非法值时抛出 ValueError"""
+        import numpy as np
+        bad = (months < 1) | (months > 12) | (hours < 0) | (hours > 23) | (days < 1)
+        bad |= (minutes < 0) | (minutes > 59)
+        bad |= (years < solar_terms.FIRST_YEAR) | (years > solar_terms.LAST_YEAR)
+        safe_months = np.clip(months, 1, 12)
+        month_days = np.array(_MONTH_DAYS)[safe_months - 1]
+        leap = ((years % 4 == 0) & (years % 100 != 0)) | (years % 400 == 0)
+        month_days = month_days + ((safe_months == 2) & leap)
+        bad |= days > month_days
+        if bad.any():
+            i = int(np.flatnonzero(bad)[0])
+            raise ValueError(
+                f"第{i}条输入不合法: {years[i]}-{months[i]}-{days[i]} {hours[i]}时")
+
     def get_interpretation(self, bazi_data: dict) -> str:
         """获取八字解读（简化版）"""
         if 'error' in bazi_data:
@@ -248,5 +446,121 @@ class BaziCalculator:
         return interpretation
 
 
-# 创建全局实例
-bazi = BaziCalculator()
+class BaziChart:
+    """紧凑的八字命盘对象
+    
+    只保存四柱干支序号(0-59)、性别与出生时刻，五行、强弱等在需要时由序号推算。
+    对象不可变，可在线程与会话间安全共享；to_dict() 每次生成新的字典，
+    结构与 calculate() 的返回值一致。
+    """
+    
+    __slots__ = ('year', 'month', 'day', 'hour', 'gender', 'birth', '_fortune')
+    
+    def __init__(self, year: int, month: int, day: int, hour: int, gender: str = '男',
+                 birth: datetime = None):
+        set_slot = object.__setattr__
+        set_slot(self, 'year', year)
+        set_slot(self, 'month', month)
+        set_slot(self, 'day', day)
+        set_slot(self, 'hour', hour)
+        set_slot(self, 'gender', gender)
+        set_slot(self, 'birth', birth)
+        set_slot(self, '_fortune', None)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('BaziChart 为只读对象')
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+    
+    def __eq__(self, other):
+        if not isinstance(other, BaziChart):
+            return NotImplemented
+        return self.pillars == other.pillars and self.gender == other.gender
+    
+    def __hash__(self):
+        return hash((self.pillars, self.gender))
+    
+    def __repr__(self):
+        names = ' '.join(ganzhi.GANZHI[idx] for idx in self.pillars)
+        return f"BaziChart({names}, {self.gender})"
+    
+    @property
+    def pillars(self) -> tuple:
+        """四柱干支序号 (年, 月, 日, 时)"""
+        return self.year, self.month, self.day, self.hour
+    
+    def major_fortune(self) -> list:
+        """前八步大运概览（见 Timeline.major_fortune），首次访问时计算并随命盘缓存
+        
+        无出生时刻或起运所需的节超出节气表范围时为空列表。
+        """
+        fortune = self._fortune
+        if fortune is None:
+            fortune = ()
+            if self.birth is not None:
+                from .timeline import Timeline
+                try:
+                    fortune = tuple(Timeline(self, self.birth).major_fortune())
+                except ValueError:
+                    pass
+            object.__setattr__(self, '_fortune', fortune)
+        # 缓存的是共享对象，每次返回新的字典与列表
+        return [{**step, 'interactions': list(step['interactions'])} for step in fortune]
+    
+    def to_dict(self) -> dict:
+        """生成与 calculate() 相同结构的字典"""
+        pillars = self.pillars
+        year_idx, month_idx, day_idx, hour_idx = pillars
+        counts, strength, favorable = _analyze_pillars(pillars)
+        day_stem = TIANGAN[day_idx % 10]
+        return {
+            'year_pillar': {'stem': TIANGAN[year_idx % 10], 'branch': DIZHI[year_idx % 12]},
+            'month_pillar': {'stem': TIANGAN[month_idx % 10], 'branch': DIZHI[month_idx % 12]},
+            'day_pillar': {'stem': day_stem, 'branch': DIZHI[day_idx % 12]},
+            'hour_pillar': {'stem': TIANGAN[hour_idx % 10], 'branch': DIZHI[hour_idx % 12]},
+            'five_elements': {'金': counts[3], '木': counts[0], '水': counts[4],
+                              '火': counts[1], '土': counts[2]},
+            'ten_gods': dict(_SIMPLIFIED_TEN_GODS),
+            'day_master': f"{day_stem}{WUXING[STEM_ELEMENT[day_idx % 10]]}",
+            'strength': BaziCalculator.STRENGTH_LEVELS[strength],
+            'favorable_elements': [WUXING[favorable[0]], WUXING[favorable[1]]],
+            'unfavorable_elements': [],
+            'major_fortune': self.major_fortune(),  # 大运，流年等见 BaziCalculator.timeline()
+            'natal_stars': shensha.natal_stars(pillars),  # 神煞
+            'nayin': NAYIN[year_idx],  # 年柱纳音
+            'void': list(shensha.VOID_NAMES[day_idx]),  # 日柱旬空
+        }
+
+
+def _validate(year, month, day, hour, minute):
+    """校验单条输入，规则与 BaziCalculator._validate_many 相同，非法时抛出 ValueError"""
+    if 1 <= month <= 12:
+        leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        month_days = _MONTH_DAYS[month - 1] + leap
+    else:
+        month_days = 0
+    if not (solar_terms.FIRST_YEAR <= year <= solar_terms.LAST_YEAR and 1 <= day <= month_days
+            and 0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f"输入不合法: {year}-{month}-{day} {hour}时{minute}分")
+
+
+def _analyze_pillars(pillars):
+    """由四柱序号求五行计数、强弱编码与喜用神编码"""
+    counts = [0, 0, 0, 0, 0]
+    for idx in pillars:
+        stem_element, branch_element = _PILLAR_ELEMENTS[idx]
+        counts[stem_element] += 1
+        counts[branch_element] += 1
+    day_element = _PILLAR_ELEMENTS[pillars[2]][0]
+    day_count = counts[day_element]
+    strength = 2 if day_count >= 3 else 1 if day_count >= 2 else 0
+    favorable = (_FAVORABLE_WEAK if strength == 0 else _FAVORABLE_STRONG)[day_element]
+    return counts, strength, favorable
+
+
+# 创建全局实例（已生成预计算表时自动启用）
+bazi = BaziCalculator(table=chart_table.open_default())
@@ -0,0 +1,108 @@
+"""八字反查模块 - Reverse Bazi Search
+
+由四柱反推所有对应的出生时间
+Find every birth time that produces a given set of four pillars
+
+利用各柱的六十甲子周期建立索引，不做逐时穷举：
+    年柱  节气年每60年循环一次
+    月柱  在节气年内由月支唯一确定一个交节区间，月干须符合五虎遁
+    日柱  日序每60天循环一次，在交节区间内直接跳到对应日期
+    时柱  时支确定1-2个整点小时，时干须符合五鼠遁
+结果为整点时间，与 BaziCalculator.calculate(年, 月, 日, 时) 的结果一致。
+"""
+
+from datetime import datetime, timedelta
+
+from . import ganzhi, solar_terms
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_pillar(pillar) -> int:
+    """把 '甲子' 形式的干支或0-59的序号统一为序号
+
+    Raises:
+        ValueError: 不是合法的六十甲子
+    """
+    if isinstance(pillar, int):
+        if 0 <= pillar < 60:
+            return pillar
+    elif isinstance(pillar, str) and pillar in ganzhi.GANZHI:
+        return ganzhi.GANZHI.index(pillar)
+    raise ValueError(f"无效的干支: {pillar!r}")
+
+
+def find_birth_times(year_pillar, month_pillar, day_pillar, hour_pillar,
+                     start: datetime = None, end: datetime = None):
+    """查找四柱对应的全部出生时间（生成器，按时间先后）
+
+    Args:
+        year_pillar, month_pillar, day_pillar, hour_pillar: 干支字符串或序号
+        start: 查找起点（含），默认节气表起点
+        end: 查找终点（不含），默认节气表终点
+
+    Yields:
+        datetime: 整点出生时间（北京时间）
+    """
+    year_idx = parse_pillar(year_pillar)
+    month_idx = parse_pillar(month_pillar)
+    day_idx = parse_pillar(day_pillar)
+    hour_idx = parse_pillar(hour_pillar)
+
+    # 月干须由年干按五虎遁推出
+    solar_month = (month_idx % 12 - 2) % 12 + 1
+    if ganzhi.MONTH_INDEX[year_idx % 10][solar_month] != month_idx:
+        return
+
+    # 时干须由日干按五鼠遁推出；子时对应0点与23点
+    hour_branch = hour_idx % 12
+    hours = (0, 23) if hour_branch == 0 else (2 * hour_branch - 1, 2 * hour_branch)
+    hours = [h for h in hours if ganzhi.HOUR_INDEX[day_idx % 10][h] == hour_idx]
+    if not hours:
+        return
+
+    table = solar_terms.load_table()
+    lo = solar_terms.to_minutes(start.year, start.month, start.day, start.hour, start.minute) \
+        if start else table[0]
+    hi = solar_terms.to_minutes(end.year, end.month, end.day, end.hour, end.minute) \
+        if end else table[-1]
+
+    # 第一个年干支相符的节气年；表首的小寒至立春属于前一节气年的丑月
+    first_year = solar_terms.FIRST_YEAR - 1
+    solar_year = first_year + (year_idx - ganzhi.year_index(first_year)) % 60
+    day_offset = solar_terms.EPOCH_ORDINAL - ganzhi.JIAZI_DAY_ORDINAL
+
+    while True:
+        # 节气月的交节区间 [t0, t1)
+        i = (solar_year - solar_terms.FIRST_YEAR) * 24 + 2 * solar_month
+        if i >= len(table) - 1:
+            break
+        if i < 0:           # 前一节气年只有丑月在表内
+            solar_year += 60
+            continue
+        # 表尾最后一个节气月只到表末（与 calculate_chart 的可算范围一致）
+        t0, t1 = max(table[i], lo), min(table[min(i + 2, len(table) - 1)], hi)
+        if table[i] >= hi:
+            break
+        if t0 < t1:
+            first_day = t0 // 1440
+            day = first_day + (day_idx - (first_day + day_offset)) % 60
+            while day * 1440 < t1:
+                for hour in hours:
+                    stamp = day * 1440 + hour * 60
+                    if t0 <= stamp < t1:
+                        yield _EPOCH + timedelta(minutes=stamp)
+                day += 60
+        solar_year += 60
+
+
+def find_birth_times_array(year_pillar, month_pillar, day_pillar, hour_pillar,
+                           start: datetime = None, end: datetime = None):
+    """find_birth_times() 的数组版本
+
+    Returns:
+        numpy.ndarray: datetime64[m] 数组
+    """
+    import numpy as np
+    return np.array(list(find_birth_times(year_pillar, month_pillar, day_pillar,
+                                          hour_pillar, start, end)), dtype='datetime64[m]')
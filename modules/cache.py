@@ -0,0 +1,117 @@
+"""命盘缓存模块 - Chart Cache Module
+
+线程安全的有界LRU缓存，供各计算器共享
+Bounded, thread-safe LRU cache shared by the calculators
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+
+def chart_key(system: str, *fields) -> tuple:
+    """构建缓存key
+
+    所有计算器使用同一套key格式：(系统名, 输入字段...)
+
+    Args:
+        system: 命理系统名称，如 'bazi'、'ziwei'
+        *fields: 影响计算结果的全部输入
+
+    Returns:
+        tuple: 可哈希的缓存key
+    """
+    return (system,) + tuple(fields)
+
+
+class ChartCache:
+    """有界LRU缓存，支持TTL过期与命中统计
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 设置 ttl（秒）后，过期条目在读取时失效
+    - 写入与读取都返回深拷贝，调用方修改结果不会影响缓存
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = None, copy_on_read: bool = True):
+        """初始化缓存
+
+        Args:
+            maxsize: 最多保留的条目数
+            ttl: 条目存活秒数，None表示不过期
+            copy_on_read: 读取时是否返回深拷贝
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize必须为正数")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.copy_on_read = copy_on_read
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """读取缓存，未命中或已过期时返回default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value) if self.copy_on_read else value
+
+    def put(self, key, value):
+        """写入缓存，必要时淘汰最久未使用的条目"""
+        if self.copy_on_read:
+            value = copy.deepcopy(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """返回当前命中/未命中/淘汰统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+
+# 各计算器默认共享的缓存实例
+chart_cache = ChartCache(maxsize=4096, ttl=24 * 3600)
+metrics.register_collector(metrics.cache_collector('chart', chart_cache))
@@ -0,0 +1,106 @@
+"""八字预计算表模块 - Precomputed Bazi Chart Table
+
+1900-2100年每天24个整点的四柱，按定长记录写入二进制文件，
+运行时以 mmap 映射，按日序与小时直接定位记录，无需任何计算。
+多个进程映射同一文件时共享操作系统页缓存中的同一份数据。
+五行计数与强弱由四柱查表即得，不存入表中。
+
+文件由 tools/build_chart_table.py 生成，默认位于 modules/data/bazi_chart_table.bin
+（体积约7MB，不纳入版本库）。文件头记录生成时所用节气表的 SHA-256，
+节气表重新生成后旧表被拒绝使用，需重新运行生成脚本。
+
+记录格式：4 x uint8，年、月、日、时柱干支序号(0-59)
+"""
+
+import mmap
+import os
+import struct
+import warnings
+from datetime import date
+
+from . import solar_terms
+
+TABLE_MAGIC = b'BZT1'
+TABLE_VERSION = 2
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'bazi_chart_table.bin')
+
+FIRST_DATE = date(1900, 1, 1)
+LAST_DATE = date(2100, 12, 31)
+HOURS_PER_DAY = 24
+
+# 魔数、版本、每天小时数、首日日序、天数、节气表 SHA-256
+HEADER = struct.Struct('<4sHHii32s')
+RECORD = struct.Struct('<4B')
+# 与 RECORD 对应的 NumPy 结构化类型
+RECORD_DTYPE = [('pillars', 'u1', (4,))]
+
+
+class ChartTable:
+    """只读的八字预计算表（mmap映射）"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """打开并映射预计算表
+
+        Raises:
+            OSError: 文件不存在或无法映射
+            ValueError: 文件格式或版本不符，或生成后节气表已更新
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            self._mm.close()
+            raise ValueError(f"八字预计算表格式不符: {path}")
+        magic, version, hours, first_ordinal, days, digest = HEADER.unpack_from(self._mm, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION or hours != HOURS_PER_DAY:
+            self._mm.close()
+            raise ValueError(f"八字预计算表格式不符: {path}")
+        if digest != solar_terms.table_digest():
+            self._mm.close()
+            raise ValueError(f"八字预计算表与当前节气表不符，请重新运行 "
+                             f"tools/build_chart_table.py: {path}")
+        if len(self._mm) != HEADER.size + days * hours * RECORD.size:
+            self._mm.close()
+            raise ValueError(f"八字预计算表长度不符: {path}")
+        self.first_ordinal = first_ordinal
+        self.days = days
+
+    def row(self, year: int, month: int, day: int, hour: int) -> int:
+        """出生时间对应的记录序号，不在表内时返回 -1"""
+        offset = date(year, month, day).toordinal() - self.first_ordinal
+        if 0 <= offset < self.days and 0 <= hour < HOURS_PER_DAY:
+            return offset * HOURS_PER_DAY + hour
+        return -1
+
+    def lookup(self, year: int, month: int, day: int, hour: int):
+        """查询整点出生时间的记录
+
+        Returns:
+            tuple: (年, 月, 日, 时柱序号)，不在表内时返回 None
+        """
+        row = self.row(year, month, day, hour)
+        if row < 0:
+            return None
+        return RECORD.unpack_from(self._mm, HEADER.size + row * RECORD.size)
+
+    def as_array(self):
+        """以零拷贝方式将全部记录映射为 NumPy 结构化数组"""
+        import numpy as np
+        return np.frombuffer(self._mm, dtype=RECORD_DTYPE, offset=HEADER.size)
+
+    def close(self):
+        self._mm.close()
+
+
+def open_default():
+    """打开默认路径的预计算表，文件不存在或不可用时返回 None
+
+    文件存在但格式不符或已过期时发出警告，排盘改为现算。
+    """
+    try:
+        return ChartTable(DEFAULT_PATH)
+    except OSError:
+        return None
+    except ValueError as e:
+        warnings.warn(str(e), RuntimeWarning, stacklevel=2)
+        return None
@@ -0,0 +1,216 @@
+"""合婚模块 - Bulk Compatibility Matching
+
+两张八字命盘的配对评分，全部化为查表：
+    - 天干五合、相冲与地支六合、三合、六冲、相刑、六害预先展开为位标志矩阵
+      STEM_RELATION[10][10]、BRANCH_RELATION[12][12]
+    - 合成为六十甲子两两之间的 PILLAR_FLAGS / PILLAR_SCORE[60][60]
+    - 两盘分数为各柱对分数按 PILLAR_PAIRS 加权之和，日柱（夫妻宫）权重最高
+单对评分直接查元组表；一对多、多对多用同一张表以 NumPy 花式索引向量化，
+多对多按块计算并逐块只保留前 k 名，不生成完整的 N×M 分数矩阵。
+
+命盘以四柱干支序号 (年, 月, 日, 时) 表示，可为 BaziChart、四元组、
+calculate_many() 的结果或 (N, 4) 整数数组。
+
+    ranked, scores = compatibility.top_k(chart, candidates, k=20)
+"""
+
+from functools import lru_cache
+
+from .ganzhi import GANZHI
+
+# 关系位标志
+STEM_COMBINE = 1        # 天干五合
+STEM_CLASH = 2          # 天干相冲
+BRANCH_COMBINE = 4      # 地支六合
+BRANCH_TRINE = 8        # 地支三合（含半合）
+BRANCH_CLASH = 16       # 地支六冲
+BRANCH_PUNISH = 32      # 地支相刑（含自刑）
+BRANCH_HARM = 64        # 地支六害
+
+RELATION_NAMES = {
+    STEM_COMBINE: '天干五合', STEM_CLASH: '天干相冲', BRANCH_COMBINE: '地支六合',
+    BRANCH_TRINE: '地支三合', BRANCH_CLASH: '地支六冲', BRANCH_PUNISH: '地支相刑',
+    BRANCH_HARM: '地支六害',
+}
+RELATION_SCORES = {
+    STEM_COMBINE: 3, STEM_CLASH: -2, BRANCH_COMBINE: 3, BRANCH_TRINE: 2,
+    BRANCH_CLASH: -3, BRANCH_PUNISH: -2, BRANCH_HARM: -1,
+}
+
+# (本人柱, 对方柱, 权重)：0年 1月 2日 3时
+PILLAR_PAIRS = ((0, 0, 1), (1, 1, 1), (2, 2, 3), (3, 3, 1))
+PILLAR_NAMES = ('年柱', '月柱', '日柱', '时柱')
+
+# 相刑：寅巳申无恩之刑、丑戌未恃势之刑、子卯无礼之刑，辰午酉亥自刑
+_PUNISH_PAIRS = ((2, 5), (5, 8), (8, 2), (1, 10), (10, 7), (7, 1), (0, 3),
+                 (4, 4), (6, 6), (9, 9), (11, 11))
+
+
+def _stem_relation(a: int, b: int) -> int:
+    flags = 0
+    if (a - b) % 10 == 5:
+        flags |= STEM_COMBINE
+    if abs(a - b) == 6 and min(a, b) < 4:      # 甲庚 乙辛 丙壬 丁癸
+        flags |= STEM_CLASH
+    return flags
+
+
+def _branch_relation(a: int, b: int) -> int:
+    flags = 0
+    if (a + b) % 12 == 1:
+        flags |= BRANCH_COMBINE
+    if a != b and a % 4 == b % 4:               # 申子辰 亥卯未 寅午戌 巳酉丑
+        flags |= BRANCH_TRINE
+    if (a - b) % 12 == 6:
+        flags |= BRANCH_CLASH
+    if (a, b) in _PUNISH_PAIRS or (b, a) in _PUNISH_PAIRS:
+        flags |= BRANCH_PUNISH
+    if (a + b) % 12 == 7:
+        flags |= BRANCH_HARM
+    return flags
+
+
+def _flags_score(flags: int) -> int:
+    return sum(score for flag, score in RELATION_SCORES.items() if flags & flag)
+
+
+STEM_RELATION = tuple(tuple(_stem_relation(a, b) for b in range(10)) for a in range(10))
+BRANCH_RELATION = tuple(tuple(_branch_relation(a, b) for b in range(12)) for a in range(12))
+PILLAR_FLAGS = tuple(tuple(STEM_RELATION[a % 10][b % 10] | BRANCH_RELATION[a % 12][b % 12]
+                           for b in range(60)) for a in range(60))
+_FLAGS_SCORE = tuple(_flags_score(flags) for flags in range(1 << len(RELATION_SCORES)))
+PILLAR_SCORE = tuple(tuple(_FLAGS_SCORE[flags] for flags in row) for row in PILLAR_FLAGS)
+# 两盘分数绝对值的上界
+SCORE_BOUND = sum(w for _, _, w in PILLAR_PAIRS) * max(abs(v) for row in PILLAR_SCORE for v in row)
+
+# 多对多每块最多计算的分数个数，控制临时数组大小
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def _pillars(chart) -> tuple:
+    return chart.pillars if hasattr(chart, 'pillars') else tuple(chart)
+
+
+def score(a, b) -> int:
+    """两张命盘的配对分数"""
+    a, b = _pillars(a), _pillars(b)
+    return sum(w * PILLAR_SCORE[a[i]][b[j]] for i, j, w in PILLAR_PAIRS)
+
+
+def explain(a, b) -> list:
+    """逐柱列出两盘之间的合冲刑害，如 '日柱 甲子-己丑 天干五合 地支六合'"""
+    a, b = _pillars(a), _pillars(b)
+    lines = []
+    for i, j, _ in PILLAR_PAIRS:
+        flags = PILLAR_FLAGS[a[i]][b[j]]
+        if flags:
+            names = ' '.join(name for flag, name in RELATION_NAMES.items() if flags & flag)
+            lines.append(f"{PILLAR_NAMES[i]} {GANZHI[a[i]]}-{GANZHI[b[j]]} {names}")
+    return lines
+
+
+@lru_cache(maxsize=None)
+def score_table():
+    """PILLAR_SCORE 的 (60, 60) int16 数组"""
+    import numpy as np
+    return np.array(PILLAR_SCORE, dtype=np.int16)
+
+
+def pillar_array(charts):
+    """各种命盘表示统一为 (N, 4) 的干支序号数组
+
+    charts 可为 calculate_many() 的结果字典 / DataFrame、BaziChart 或四元组序列、
+    单张命盘，或已是 (N, 4) 的整数数组。
+    """
+    import numpy as np
+    if hasattr(charts, 'pillars') or (isinstance(charts, tuple) and len(charts) == 4
+                                      and all(isinstance(v, int) for v in charts)):
+        return np.array([_pillars(charts)], dtype=np.intp)
+    if hasattr(charts, 'keys') and 'year_stem' in charts.keys():
+        columns = []
+        for name in ('year', 'month', 'day', 'hour'):
+            stem = np.asarray(charts[f'{name}_stem'], dtype=np.intp)
+            branch = np.asarray(charts[f'{name}_branch'], dtype=np.intp)
+            columns.append((6 * stem - 5 * branch) % 60)
+        return np.stack(columns, axis=1)
+    if isinstance(charts, np.ndarray):
+        array = charts.astype(np.intp, copy=False)
+    else:
+        array = np.array([_pillars(chart) for chart in charts], dtype=np.intp).reshape(-1, 4)
+    if array.ndim != 2 or array.shape[1] != 4:
+        raise ValueError(f"命盘数组形状须为 (N, 4)，实际为 {array.shape}")
+    if array.size and (array.min() < 0 or array.max() > 59):
+        raise ValueError("干支序号须在 0-59 之间")
+    return array
+
+
+def score_many(chart, candidates):
+    """一对多：一张命盘对 N 个候选的分数，返回 (N,) int16 数组"""
+    import numpy as np
+    a = _pillars(chart)
+    b = pillar_array(candidates)
+    table = score_table()
+    total = np.zeros(len(b), dtype=np.int16)
+    for i, j, w in PILLAR_PAIRS:
+        total += (w * table[a[i]])[b[:, j]]
+    return total
+
+
+def _block_scores(a, b):
+    """(n, 4) 对 (m, 4) 的分数矩阵 (n, m)，只用于单块"""
+    table = score_table()
+    total = None
+    for i, j, w in PILLAR_PAIRS:
+        part = (w * table[a[:, i]])[:, b[:, j]]
+        total = part if total is None else total + part
+    return total
+
+
+def _select(scores, k):
+    """逐行取前 k 名，分数相同时序号小者在前；返回 (序号, 分数)"""
+    import numpy as np
+    m = scores.shape[-1]
+    # 分数与序号合成唯一的非负排序键，结果与完整排序一致；范围允许时用 int32 更快
+    dtype = np.int32 if (2 * SCORE_BOUND + 1) * m < 2 ** 31 else np.int64
+    keys = (scores.astype(dtype) + SCORE_BOUND) * m + (m - 1 - np.arange(m, dtype=dtype))
+    if k < m:
+        part = np.argpartition(keys, m - k, axis=-1)[..., m - k:]
+    else:
+        part = np.broadcast_to(np.arange(m), keys.shape).copy()
+    order = np.argsort(-np.take_along_axis(keys, part, axis=-1), axis=-1)
+    indices = np.take_along_axis(part, order, axis=-1)
+    return indices, np.take_along_axis(scores, indices, axis=-1)
+
+
+def top_k(chart, candidates, k: int = 10):
+    """一对多排名：返回分数最高的 k 个候选 (序号数组, 分数数组)，按分数降序"""
+    scores = score_many(chart, candidates)
+    k = min(k, len(scores))
+    if not k:
+        return scores[:0].astype('intp'), scores[:0]
+    return _select(scores, k)
+
+
+def top_k_many(charts, candidates, k: int = 10, block_rows: int = None):
+    """多对多排名：每张命盘各自的前 k 名候选
+
+    按行分块计算，每块最多 block_rows × M 个分数，块内选出前 k 名后即丢弃，
+    内存与 N 无关。
+
+    Returns:
+        (序号, 分数)：两个 (N, k) 数组，每行按分数降序
+    """
+    import numpy as np
+    a = pillar_array(charts)
+    b = pillar_array(candidates)
+    k = min(k, len(b))
+    indices = np.zeros((len(a), k), dtype=np.intp)
+    scores = np.zeros((len(a), k), dtype=np.int16)
+    if not k:
+        return indices, scores
+    block_rows = block_rows or max(1, _BLOCK_ELEMENTS // len(b))
+    for start in range(0, len(a), block_rows):
+        stop = start + block_rows
+        indices[start:stop], scores[start:stop] = _select(_block_scores(a[start:stop], b), k)
+    return indices, scores
+
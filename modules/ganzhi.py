@@ -0,0 +1,81 @@
+"""干支核心模块 - Sexagenary Core
+
+以整数表示天干(0-9)、地支(0-11)与六十甲子(0-59)的底层运算
+Integer sexagenary arithmetic shared by the scalar and batch paths
+
+汉字只在输出时通过预先计算的元组转换，计算过程不做字符串查找。
+日柱以公历日序（date.toordinal，公元1年1月1日为1）推算，
+以1949-10-01甲子日为基准。
+"""
+
+from datetime import date
+
+TIANGAN = ('甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸')
+DIZHI = ('子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥')
+
+# 六十甲子名称，序号即干支序号
+GANZHI = tuple(TIANGAN[i % 10] + DIZHI[i % 12] for i in range(60))
+
+# 五行编码：0木 1火 2土 3金 4水
+WUXING = ('木', '火', '土', '金', '水')
+STEM_ELEMENT = (0, 0, 1, 1, 2, 2, 3, 3, 4, 4)
+BRANCH_ELEMENT = (4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4)
+
+# 六十甲子纳音，每两柱共用一个
+NAYIN_NAMES = (
+    '海中金', '炉中火', '大林木', '路旁土', '剑锋金', '山头火',
+    '涧下水', '城头土', '白蜡金', '杨柳木', '泉中水', '屋上土',
+    '霹雳火', '松柏木', '长流水', '砂中金', '山下火', '平地木',
+    '壁上土', '金箔金', '覆灯火', '天河水', '大驿土', '钗钏金',
+    '桑柘木', '大溪水', '沙中土', '天上火', '石榴木', '大海水',
+)
+NAYIN = tuple(NAYIN_NAMES[i // 2] for i in range(60))
+NAYIN_ELEMENT = tuple(WUXING.index(name[-1]) for name in NAYIN)
+
+# 1949-10-01 为甲子日
+JIAZI_DAY_ORDINAL = date(1949, 10, 1).toordinal()
+# 1984 为甲子年
+JIAZI_YEAR = 1984
+
+
+def sexagenary(stem: int, branch: int) -> int:
+    """由天干、地支序号求六十甲子序号（阴阳须一致）"""
+    return (6 * stem - 5 * branch) % 60
+
+
+# 年上起月（五虎遁）：MONTH_INDEX[年干][节气月] -> 月柱干支序号，节气月1为寅月
+MONTH_INDEX = tuple(
+    (None,) + tuple(sexagenary((2 * s + 1 + m) % 10, (m + 1) % 12) for m in range(1, 13))
+    for s in range(10)
+)
+
+# 日上起时（五鼠遁）：HOUR_INDEX[日干][小时0-23] -> 时柱干支序号
+HOUR_INDEX = tuple(
+    tuple(sexagenary((2 * s + (h + 1) // 2 % 12) % 10, (h + 1) // 2 % 12) for h in range(24))
+    for s in range(10)
+)
+
+
+def day_ordinal(year: int, month: int, day: int) -> int:
+    """公历日序，公元1年1月1日为1"""
+    return date(year, month, day).toordinal()
+
+
+def year_index(solar_year: int) -> int:
+    """节气年 -> 年柱干支序号"""
+    return (solar_year - JIAZI_YEAR) % 60
+
+
+def month_index(year_idx: int, solar_month: int) -> int:
+    """年柱序号与节气月 -> 月柱干支序号"""
+    return MONTH_INDEX[year_idx % 10][solar_month]
+
+
+def day_index(ordinal: int) -> int:
+    """公历日序 -> 日柱干支序号"""
+    return (ordinal - JIAZI_DAY_ORDINAL) % 60
+
+
+def hour_index(day_idx: int, hour: int) -> int:
+    """日柱序号与小时(0-23) -> 时柱干支序号"""
+    return HOUR_INDEX[day_idx % 10][hour]
@@ -0,0 +1,289 @@
+"""非同步HTTP客戶端 - Pooled asyncio HTTP/1.1 client
+
+以標準庫 asyncio 串流實作的最小HTTP/1.1客戶端，供AI整合模組呼叫LLM API：
+    - 同一主機的連線保持(keep-alive)並放回連線池重用，省去重複的TCP/TLS握手
+    - max_connections 限制同時在用的連線數，超出時排隊等待
+    - 每次請求可單獨指定逾時；逾時或被取消時關閉該連線，不放回連線池
+    - 重用的閒置連線被伺服器關閉時，只有冪等請求(GET 等)自動換新連線重試；
+      POST 寫出後即可能已被處理（例如已計費的 LLM 請求），失敗直接拋出而不重送
+    - 支援 Content-Length 與 chunked 兩種回應本文，stream() 可逐塊讀取（如 SSE）
+連線池綁定建立它的事件迴圈，不可跨事件迴圈共用。
+"""
+
+import asyncio
+import contextlib
+import json
+import ssl
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+# RFC 9110 §9.2.2：重送不改變結果的方法，連線中斷時可自動重試
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'})
+
+
+class HTTPResponse:
+    """HTTP回應"""
+
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
+    def __init__(self, status: int, reason: str, headers: dict, body: bytes):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+    def __repr__(self):
+        return f"HTTPResponse({self.status} {self.reason}, {len(self.body)} bytes)"
+
+
+class StreamingResponse:
+    """串流讀取中的HTTP回應，由 AsyncHTTPClient.stream() 產生"""
+
+    __slots__ = ('status', 'reason', 'headers', 'complete', '_reader', '_timeout')
+
+    def __init__(self, status: int, reason: str, headers: dict, reader, timeout: float):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.complete = False
+        self._reader = reader
+        self._timeout = timeout
+
+    async def iter_chunks(self):
+        """逐塊讀取本文；兩塊之間超過閒置逾時時拋出 asyncio.TimeoutError"""
+        body = iter_body(self._reader, self.headers)
+        while True:
+            try:
+                chunk = await asyncio.wait_for(body.__anext__(), self._timeout)
+            except StopAsyncIteration:
+                self.complete = _has_framing(self.headers)
+                return
+            yield chunk
+
+    async def read(self) -> bytes:
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+    def __repr__(self):
+        return f"StreamingResponse({self.status} {self.reason})"
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'reused')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncHTTPClient:
+    """帶連線池的非同步HTTP客戶端"""
+
+    def __init__(self, max_connections: int = 8, timeout: float = 30.0,
+                 ssl_context: ssl.SSLContext = None):
+        """
+        Args:
+            max_connections: 同時在用的連線數上限
+            timeout: 預設逾時秒數（含排隊、連線與讀取回應）
+            ssl_context: https 使用的 SSLContext，預設為系統預設設定
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._ssl = ssl_context
+        self._idle = defaultdict(list)
+        self._semaphore = None
+        self.connections_opened = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method: str, url: str, headers: dict = None,
+                      body: bytes = None, timeout: float = None) -> HTTPResponse:
+        """發送請求並讀取完整回應
+
+        Raises:
+            asyncio.TimeoutError: 超過逾時
+            OSError: 連線失敗
+            asyncio.IncompleteReadError: 回應未讀完連線即中斷（非冪等請求不自動重試）
+            ValueError: 回應格式錯誤
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._request(method, url, headers, body), timeout)
+
+    async def post_json(self, url: str, payload, headers: dict = None,
+                        timeout: float = None) -> HTTPResponse:
+        """以JSON本文發送POST請求"""
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        return await self.request('POST', url, headers, body, timeout)
+
+    async def close(self):
+        """關閉連線池中的全部閒置連線"""
+        idle, self._idle = self._idle, defaultdict(list)
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method: str, url: str, headers: dict = None,
+                     body: bytes = None, timeout: float = None):
+        """發送請求並以串流方式讀取回應本文
+
+        timeout 為閒置逾時：等待回應標頭及每兩塊本文之間的最長秒數。
+
+            async with client.stream('POST', url, headers, body) as response:
+                async for chunk in response.iter_chunks():
+                    ...
+        本文未讀完即離開時關閉該連線。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._slot():
+            key, conn, head = await asyncio.wait_for(
+                self._open(method, url, headers, body), timeout)
+            status, reason, response_headers, keep_alive = head
+            response = StreamingResponse(status, reason, response_headers, conn.reader, timeout)
+            try:
+                yield response
+            except BaseException:
+                conn.close()
+                raise
+            self._release(key, conn, keep_alive and response.complete)
+
+    async def _request(self, method, url, headers, body):
+        async with self._slot():
+            key, conn, (status, reason, response_headers, keep_alive) = \
+                await self._open(method, url, headers, body)
+            try:
+                if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+                    content = b''
+                else:
+                    keep_alive &= _has_framing(response_headers)
+                    content = b''.join([chunk async for chunk in
+                                        iter_body(conn.reader, response_headers)])
+            except BaseException:
+                conn.close()
+                raise
+            self._release(key, conn, keep_alive)
+            return HTTPResponse(status, reason, response_headers, content)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        async with self._semaphore:
+            yield
+
+    async def _open(self, method, url, headers, body):
+        """取得連線、送出請求並讀取回應標頭，返回 (連線池鍵, 連線, 標頭資訊)"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        head = [f'{method} {path} HTTP/1.1', f'Host: {parts.netloc}',
+                f'Content-Length: {len(body or b"")}', 'Connection: keep-alive']
+        head += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+        while True:
+            conn = await self._acquire(key)
+            try:
+                conn.writer.write(payload)
+                await conn.writer.drain()
+                return key, conn, await _read_head(conn.reader)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                conn.close()
+                # 重用的閒置連線可能已被伺服器關閉；尚未讀到任何回應時換新連線重試。
+                # 非冪等請求已寫出，伺服器可能已經處理，不重送
+                if conn.reused and method in IDEMPOTENT_METHODS \
+                        and not getattr(e, 'partial', b''):
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+    def _release(self, key, conn, keep_alive: bool):
+        if keep_alive:
+            conn.reused = True
+            self._idle[key].append(conn)
+        else:
+            conn.close()
+
+    async def _acquire(self, key):
+        idle = self._idle[key]
+        while idle:
+            conn = idle.pop()
+            if not conn.reader.at_eof() and not conn.writer.is_closing():
+                return conn
+            conn.close()
+        scheme, host, port = key
+        context = None
+        if scheme == 'https':
+            context = self._ssl or ssl.create_default_context()
+        reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+
+async def _read_head(reader):
+    """讀取狀態列與標頭，返回 (狀態碼, 原因, 小寫標頭字典)"""
+    status_line = await reader.readuntil(b'\r\n')
+    try:
+        version, status, *reason = status_line.decode('latin-1').split(' ', 2)
+        status = int(status)
+    except ValueError:
+        raise ValueError(f"無效的HTTP狀態列: {status_line!r}")
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    return status, (reason[0].strip() if reason else ''), headers, keep_alive
+
+
+async def iter_body(reader, headers: dict):
+    """依 Content-Length 或 chunked 編碼逐塊讀取回應本文"""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return
+            chunk = await reader.readexactly(size)
+            await reader.readexactly(2)
+            yield chunk
+    elif 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        while remaining:
+            chunk = await reader.read(min(remaining, 65536))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', remaining)
+            remaining -= len(chunk)
+            yield chunk
+    else:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _has_framing(headers: dict) -> bool:
+    """回應本文長度是否可確定（否則須讀到連線關閉，連線不可重用）"""
+    return 'content-length' in headers or \
+        headers.get('transfer-encoding', '').lower() == 'chunked'
@@ -0,0 +1,526 @@
+"""LLM 請求排程器 - Quota-aware LLM Request Scheduler
+
+放在 AIIntegration 呼叫供應商之前，避免免費額度下的 429 與重試風暴：
+    - 每個供應商以令牌桶(token bucket)限制每分鐘/每日請求數與每分鐘 token 數，
+      額度不足的請求在佇列中等待，而不是發出去換一個 429
+    - 優先佇列：互動請求(INTERACTIVE)先於批次請求(BATCH)，同優先級先進先出
+    - 背壓：佇列滿時，互動請求擠掉最晚排入的批次請求；否則新請求被拒絕
+      (SchedulerOverloaded)，或以 block=True 延後排入直到有空位
+    - 故障轉移：依設定順序選擇有額度的供應商；失敗時換下一個尚未嘗試的供應商，
+      429/5xx/連線錯誤會使該供應商冷卻一段時間
+    - 串流請求 stream() 與 submit() 共用佇列與額度，取得額度後在該供應商上串流；
+      第一塊文字送出前失敗時換下一個供應商
+    - stats() 提供佇列深度、排隊等待時間與各供應商用量，並匯出到 metrics 的
+      Prometheus 輸出（同名排程器合併計算）
+
+AIIntegration 預設建立只含自身供應商的排程器；多供應商故障轉移時以 from_providers()
+建立後傳入。Streamlit 介面與 API 伺服器使用 shared_scheduler()：行程內共用一個含全部
+已設定金鑰供應商的排程器，額度與冷卻狀態一併共用。排程器跟隨目前的事件迴圈，換到新的事件迴圈（例如另一次 asyncio.run()）
+時捨棄舊迴圈中的排隊狀態。
+
+    scheduler = LLMScheduler.from_providers(('groq', 'deepseek', 'gemini'))
+    ai = AIIntegration(scheduler=scheduler)
+    ai.analyze(chart, question)                    # 互動優先級
+    ai.analyze(chart, question, priority=BATCH)    # 批次優先級
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from collections import deque
+
+from . import metrics
+from .prompt_builder import estimate_tokens
+
+INTERACTIVE = 0
+BATCH = 1
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+
+class SchedulerOverloaded(RuntimeError):
+    """排程佇列已滿，請求被拒絕或被擠出"""
+
+
+class TokenBucket:
+    """令牌桶：容量 capacity，每秒補充 rate 個令牌"""
+
+    __slots__ = ('rate', 'capacity', 'level', 'updated', '_clock')
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """取得 amount 個令牌還需等待的秒數（0 表示現在即可取得）
+
+        超過容量的請求視為需要整桶令牌，避免永遠無法取得。
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class Backend:
+    """排程器中的一個供應商：呼叫函式 + 額度令牌桶 + 冷卻狀態"""
+
+    def __init__(self, name: str, call, requests_per_minute: float = None,
+                 requests_per_day: float = None, tokens_per_minute: float = None,
+                 clock=time.monotonic, stream=None):
+        """
+        Args:
+            name: 供應商名稱
+            call: 協程函式 call(prompt, timeout) -> str
+            requests_per_minute / requests_per_day / tokens_per_minute: 額度，None 表示不限
+            stream: 非同步產生器函式 stream(prompt, timeout)，逐塊產生回答文字；
+                    None 表示此供應商不接受串流請求
+        """
+        self.name = name
+        self.call = call
+        self.stream = stream
+        self._clock = clock
+        self._request_buckets = [TokenBucket(limit / period, limit, clock)
+                                 for limit, period in ((requests_per_minute, 60),
+                                                       (requests_per_day, 86400))
+                                 if limit]
+        self._token_bucket = (TokenBucket(tokens_per_minute / 60, tokens_per_minute, clock)
+                              if tokens_per_minute else None)
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.tokens = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def delay(self, tokens: int) -> float:
+        """送出一個估計 tokens 個 token 的請求前還需等待的秒數"""
+        waits = [self.cooldown_until - self._clock()]
+        waits += [bucket.delay(1) for bucket in self._request_buckets]
+        if self._token_bucket is not None:
+            waits.append(self._token_bucket.delay(tokens))
+        return max(0.0, *waits)
+
+    def acquire(self, tokens: int):
+        for bucket in self._request_buckets:
+            bucket.take(1)
+        if self._token_bucket is not None:
+            self._token_bucket.take(tokens)
+        self.requests += 1
+        self.tokens += tokens
+
+    def cool_down(self, seconds: float):
+        self.cooldown_until = max(self.cooldown_until, self._clock() + seconds)
+
+    def stats(self) -> dict:
+        return {'requests': self.requests, 'tokens': self.tokens, 'failures': self.failures,
+                'throttled': self.throttled,
+                'cooling_down': max(0.0, self.cooldown_until - self._clock())}
+
+    def __repr__(self):
+        return f"Backend({self.name!r})"
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'prompt', 'tokens', 'deadline', 'enqueued',
+                 'future', 'task', 'tried', 'error', 'stream')
+
+    def __init__(self, priority, seq, prompt, tokens, deadline, enqueued, future, stream):
+        self.priority = priority
+        self.seq = seq
+        self.prompt = prompt
+        self.tokens = tokens
+        self.deadline = deadline
+        self.enqueued = enqueued
+        self.future = future
+        self.task = None
+        self.tried = set()
+        self.error = None
+        # 串流請求：取得額度後 future 的結果為選定的 Backend，由呼叫端自行串流
+        self.stream = stream
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """帶額度、優先級、背壓與故障轉移的 LLM 請求排程器"""
+
+    def __init__(self, backends, max_queue: int = 64, max_output_tokens: int = 512,
+                 cooldown: float = 5.0, clock=time.monotonic):
+        """
+        Args:
+            backends: Backend 列表，依故障轉移順序排列
+            max_queue: 佇列中等待的請求數上限
+            max_output_tokens: 估算 token 額度時為每個請求預留的回答長度
+            cooldown: 供應商回應 429/5xx 或連線失敗後暫停使用的秒數
+                      （429 帶 Retry-After 時以其為準）
+        """
+        if not backends:
+            raise ValueError("至少需要一個供應商")
+        self.backends = list(backends)
+        self.max_queue = max_queue
+        self.max_output_tokens = max_output_tokens
+        self.cooldown = cooldown
+        self._clock = clock
+        self._loop = None
+        self._queue = []
+        self._seq = itertools.count()
+        self._space_waiters = deque()
+        self._wake = None
+        self._dispatcher = None
+        self._waits = deque(maxlen=1024)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.deferred = 0
+        self.failovers = 0
+        _schedulers.add(self)
+
+    @property
+    def name(self) -> str:
+        """供應商鏈名稱，如 'groq>deepseek>gemini'（用於回應快取鍵）"""
+        return '>'.join(backend.name for backend in self.backends)
+
+    @classmethod
+    def from_providers(cls, providers=('groq', 'deepseek', 'gemini'), timeout: float = 30.0,
+                       max_connections: int = 8, **kwargs) -> 'LLMScheduler':
+        """以 ai_integration.PROVIDERS 中已設定 API 金鑰的供應商建立排程器
+
+        沒有任何可用供應商時使用模擬回答。
+        """
+        from .ai_integration import PROVIDERS, AIIntegration
+        backends = []
+        for name in providers:
+            ai = AIIntegration(name, timeout=timeout, max_connections=max_connections,
+                               scheduler=False)
+            if ai.live:
+                backends.append(Backend(name, ai._call_ai_async, stream=ai._stream_ai_async,
+                                        **PROVIDERS[name]['limits']))
+        if not backends:
+            stub = AIIntegration('stub', scheduler=False)
+            backends.append(Backend('stub', stub._call_ai_async, stream=stub._stream_ai_async))
+        return cls(backends, **kwargs)
+
+    async def submit(self, prompt: str, priority: int = INTERACTIVE, timeout: float = None,
+                     block: bool = False) -> str:
+        """排入一個請求並等待回答
+
+        Args:
+            prompt: 提示詞（字串或 chat messages 列表）
+            priority: INTERACTIVE 或 BATCH（數字越小越優先）
+            timeout: 總逾時秒數（含排隊與呼叫），None 表示只受供應商呼叫逾時限制
+            block: 佇列滿時等待空位而不是立即拒絕
+
+        Raises:
+            SchedulerOverloaded: 佇列已滿，或排隊中被更高優先級的請求擠出
+            asyncio.TimeoutError: 超過逾時
+            AIProviderError 等: 全部供應商都失敗時，最後一個供應商的錯誤
+        """
+        job = await self._enqueue(prompt, priority, timeout, block, stream=False)
+        return await asyncio.wait_for(job.future, self._remaining(job))
+
+    async def stream(self, prompt: str, priority: int = INTERACTIVE, timeout: float = None,
+                     block: bool = False):
+        """排入一個串流請求，取得額度後逐塊產生回答文字
+
+        排隊、額度、優先級與背壓同 submit()，timeout 限制排隊時間並作為供應商串流的
+        閒置逾時。第一塊文字送出前失敗時換下一個支援串流的供應商，之後的錯誤直接拋出。
+
+        Raises:
+            同 submit()
+        """
+        job = await self._enqueue(prompt, priority, timeout, block, stream=True)
+        while True:
+            backend = await asyncio.wait_for(job.future, self._remaining(job))
+            started = False
+            try:
+                async for delta in backend.stream(job.prompt, timeout):
+                    started = True
+                    yield delta
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record_failure(backend, e)
+                if started or self._expired(job, e):
+                    self.failed += 1
+                    raise
+                job.tried.add(backend.name)
+                job.error = e
+                self.failovers += 1
+                job.future = asyncio.get_running_loop().create_future()
+                self._requeue(job)
+            else:
+                self.completed += 1
+                return
+
+    async def _enqueue(self, prompt, priority, timeout, block, stream):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 舊事件迴圈的 future 與分派任務在新迴圈中無法使用
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._dispatcher = None
+            self._queue = []
+            self._space_waiters = deque()
+        deadline = None if timeout is None else self._clock() + timeout
+        self.submitted += 1
+
+        self._start_ready()
+        if len(self._queue) >= self.max_queue:
+            victim = max(self._queue)
+            if victim.priority > priority:
+                self._queue.remove(victim)
+                heapq.heapify(self._queue)
+                self.shed += 1
+                victim.future.set_exception(SchedulerOverloaded("排程佇列已滿，批次請求被擠出"))
+            elif block:
+                self.deferred += 1
+                await asyncio.wait_for(self._wait_for_space(loop), timeout)
+            else:
+                self.shed += 1
+                raise SchedulerOverloaded(f"排程佇列已滿（{self.max_queue}）")
+
+        job = _Job(priority, next(self._seq), prompt,
+                   estimate_tokens(prompt) + self.max_output_tokens,
+                   deadline, self._clock(), loop.create_future(), stream)
+        job.future.add_done_callback(lambda future: _cancel_task(job))
+        heapq.heappush(self._queue, job)
+        # 有額度時立即送出，不必等分派任務下一次被排程
+        self._start_ready()
+        self._ensure_dispatcher()
+        self._wake.set()
+        return job
+
+    def _remaining(self, job):
+        return None if job.deadline is None else max(0.0, job.deadline - self._clock())
+
+    def _expired(self, job, error) -> bool:
+        return (isinstance(error, asyncio.TimeoutError) and job.deadline is not None
+                and self._clock() >= job.deadline)
+
+    def _requeue(self, job):
+        # 換下一個供應商重試，保留原本的排隊順序
+        heapq.heappush(self._queue, job)
+        self._ensure_dispatcher()
+        self._wake.set()
+
+    async def _wait_for_space(self, loop):
+        while len(self._queue) >= self.max_queue:
+            waiter = loop.create_future()
+            self._space_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        # 佇列清空即結束，下一個請求排入時再啟動
+        while True:
+            self._wake.clear()
+            delay = self._start_ready()
+            if delay is None:
+                return
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start_ready(self):
+        """依序啟動佇首可送出的請求；返回下一次檢查前的等待秒數，佇列空時返回 None"""
+        while self._queue:
+            job = self._queue[0]
+            if job.future.done():
+                self._pop()
+                continue
+            candidates = [b for b in self.backends if b.name not in job.tried
+                          and (not job.stream or b.stream is not None)]
+            if not candidates:
+                self._pop()
+                self.failed += 1
+                job.future.set_exception(job.error or SchedulerOverloaded("沒有支援串流的供應商"))
+                continue
+            delays = [backend.delay(job.tokens) for backend in candidates]
+            ready = [backend for backend, delay in zip(candidates, delays) if delay == 0]
+            if not ready:
+                # 嚴格優先：佇首請求等待額度時，後面的請求也不越過它
+                return min(delays)
+            self._pop()
+            backend = ready[0]
+            backend.acquire(job.tokens)
+            if not job.tried:
+                self._waits.append(self._clock() - job.enqueued)
+            if job.stream:
+                job.future.set_result(backend)
+            else:
+                job.task = asyncio.ensure_future(self._run(job, backend))
+        return None
+
+    def _pop(self):
+        heapq.heappop(self._queue)
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    async def _run(self, job, backend):
+        try:
+            result = await backend.call(job.prompt, self._remaining(job))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(backend, e)
+            if job.future.done():
+                return
+            job.tried.add(backend.name)
+            job.error = e
+            if self._expired(job, e):
+                self.failed += 1
+                job.future.set_exception(e)
+                return
+            self.failovers += 1
+            self._requeue(job)
+        else:
+            if not job.future.done():
+                self.completed += 1
+                job.future.set_result(result)
+
+    def _record_failure(self, backend, error):
+        backend.failures += 1
+        status = getattr(error, 'status', None)
+        if status == 429:
+            backend.throttled += 1
+            backend.cool_down(getattr(error, 'retry_after', None) or self.cooldown)
+        elif (status is not None and status >= 500) or isinstance(error, OSError):
+            backend.cool_down(self.cooldown)
+
+    def queue_depth(self) -> dict:
+        depth = dict.fromkeys(PRIORITY_NAMES.values(), 0)
+        for job in self._queue:
+            if not job.future.done():
+                name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+                depth[name] = depth.get(name, 0) + 1
+        return depth
+
+    def stats(self) -> dict:
+        """佇列深度、排隊等待時間（最近 1024 個請求，秒）與各供應商用量"""
+        waits = sorted(self._waits)
+
+        def percentile(p):
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+
+        return {
+            'queue_depth': self.queue_depth(),
+            'submitted': self.submitted, 'completed': self.completed, 'failed': self.failed,
+            'shed': self.shed, 'deferred': self.deferred, 'failovers': self.failovers,
+            'wait': {'count': len(waits), 'mean': sum(waits) / len(waits) if waits else 0.0,
+                     'p50': percentile(0.5), 'p95': percentile(0.95),
+                     'max': waits[-1] if waits else 0.0},
+            'providers': {backend.name: backend.stats() for backend in self.backends},
+        }
+
+    async def close(self):
+        """停止分派並取消全部等待中的請求"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        queue, self._queue = self._queue, []
+        for job in queue:
+            job.future.cancel()
+
+
+# 存活中的排程器，供 metrics 輸出時採集
+_schedulers = weakref.WeakSet()
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler() -> LLMScheduler:
+    """行程共用的排程器，首次呼叫時以 from_providers() 建立
+
+    包含全部已設定 API 金鑰的供應商（依 groq、deepseek、gemini 順序故障轉移），
+    都未設定時使用模擬回答。
+    """
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LLMScheduler.from_providers()
+    return _shared
+
+
+def _collect():
+    """排程器指標：同名排程器（同一供應商鏈）的計數與佇列深度相加，等待時間合併樣本"""
+    merged = {}
+    for scheduler in list(_schedulers):
+        stats = scheduler.stats()
+        entry = merged.setdefault(scheduler.name, {'depth': {}, 'counts': {}, 'waits': [],
+                                                   'providers': {}})
+        for priority, depth in stats['queue_depth'].items():
+            entry['depth'][priority] = entry['depth'].get(priority, 0) + depth
+        for outcome in ('submitted', 'completed', 'failed', 'shed', 'deferred', 'failovers'):
+            entry['counts'][outcome] = entry['counts'].get(outcome, 0) + stats[outcome]
+        entry['waits'] += scheduler._waits
+        for provider, usage in stats['providers'].items():
+            total = entry['providers'].setdefault(provider, dict.fromkeys(usage, 0))
+            for field, value in usage.items():
+                total[field] = max(total[field], value) if field == 'cooling_down' \
+                    else total[field] + value
+
+    rows = []
+    for name, entry in merged.items():
+        labels = {'scheduler': name}
+        for priority, depth in entry['depth'].items():
+            rows.append(('divination_llm_queue_depth', 'gauge', 'LLM 排程佇列中等待的請求數',
+                         {**labels, 'priority': priority}, depth))
+        for outcome, value in entry['counts'].items():
+            rows.append(('divination_llm_scheduler_requests_total', 'counter',
+                         'LLM 排程器請求數（依結果）', {**labels, 'outcome': outcome}, value))
+        waits = sorted(entry['waits'])
+        for quantile in (0.5, 0.95, 1.0):
+            value = waits[min(len(waits) - 1, int(quantile * len(waits)))] if waits else 0.0
+            rows.append(('divination_llm_queue_wait_seconds', 'gauge',
+                         '最近請求的排隊等待時間分位數', {**labels, 'quantile': str(quantile)},
+                         value))
+        for provider, usage in entry['providers'].items():
+            provider_labels = {**labels, 'provider': provider}
+            rows += [('divination_llm_provider_requests_total', 'counter',
+                      '排程器發往各供應商的請求數', provider_labels, usage['requests']),
+                     ('divination_llm_provider_throttled_total', 'counter',
+                      '供應商回應 429 的次數', provider_labels, usage['throttled']),
+                     ('divination_llm_provider_cooldown_seconds', 'gauge',
+                      '供應商剩餘冷卻秒數', provider_labels, usage['cooling_down'])]
+    return rows
+
+
+metrics.register_collector(_collect)
+
+
+def _cancel_task(job):
+    # 呼叫端取消或逾時時，一併取消已送出的供應商請求
+    if job.future.cancelled() and job.task is not None:
+        job.task.cancel()
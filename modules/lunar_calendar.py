@@ -0,0 +1,236 @@
+"""农历模块 - Lunar Calendar Module
+
+公历与农历互相转换，支持农历1900-2100年
+Solar <-> lunar conversion for lunar years 1900-2100
+
+每个农历年压缩为一个uint32（小端）：
+    位0-3    闰月月份，0为无闰月
+    位4-16   按顺序各月大小（含闰月），1为30天、0为29天
+    位17-22  正月初一距公历当年1月1日的天数
+表由 tools/build_lunar_table.py 按天文算法推算生成，运行时只加载一次并展开为
+每年的月首偏移，单次换算为常数时间；*_many() 为 NumPy 向量化版本。
+"""
+
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+TABLE_MAGIC = b'NL24'
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'lunar_table.bin')
+
+LUNAR_MONTHS = ('正月', '二月', '三月', '四月', '五月', '六月',
+                '七月', '八月', '九月', '十月', '冬月', '腊月')
+
+_EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+_year_start = None     # 各年正月初一，自1970-01-01起的天数
+_month_offsets = None  # 各年每月初一距正月初一的天数，末项为全年天数
+_leap = None           # 各年闰月月份
+_arrays = None         # 向量化换算用的 NumPy 数组
+_load_lock = threading.Lock()
+
+
+def pack_year(lengths, leap: int, new_year_offset: int) -> int:
+    """农历年的各月天数、闰月与正月初一偏移打包为uint32"""
+    packed = leap | new_year_offset << 17
+    for i, length in enumerate(lengths):
+        packed |= (length == 30) << (4 + i)
+    return packed
+
+
+def unpack_year(packed: int) -> tuple:
+    """uint32解包为 (各月天数列表, 闰月月份, 正月初一偏移)"""
+    leap = packed & 0xF
+    count = 13 if leap else 12
+    lengths = [29 + ((packed >> (4 + i)) & 1) for i in range(count)]
+    return lengths, leap, (packed >> 17) & 0x3F
+
+
+def load_table():
+    """加载农历表（进程内只读取一次）"""
+    global _year_start, _month_offsets, _leap
+    if _year_start is None:
+        with _load_lock:
+            if _year_start is None:
+                with open(TABLE_PATH, 'rb') as f:
+                    raw = f.read()
+                header = struct.calcsize('<4sHH')
+                magic, first_year, years = struct.unpack_from('<4sHH', raw)
+                if magic != TABLE_MAGIC or first_year != FIRST_YEAR or \
+                        years != LAST_YEAR - FIRST_YEAR + 1:
+                    raise RuntimeError(f"农历表格式不符: {TABLE_PATH}")
+                table = array('I')
+                table.frombytes(raw[header:])
+                if sys.byteorder != 'little':
+                    table.byteswap()
+
+                starts, offsets, leaps = [], [], []
+                for year, packed in zip(range(FIRST_YEAR, LAST_YEAR + 1), table):
+                    lengths, leap, new_year = unpack_year(packed)
+                    starts.append(date(year, 1, 1).toordinal() - _EPOCH_ORDINAL + new_year)
+                    cumulative = [0]
+                    for length in lengths:
+                        cumulative.append(cumulative[-1] + length)
+                    offsets.append(tuple(cumulative))
+                    leaps.append(leap)
+                _month_offsets = tuple(offsets)
+                _leap = tuple(leaps)
+                _year_start = tuple(starts)
+    return _year_start, _month_offsets, _leap
+
+
+def _month_position(leap: int, month: int, is_leap: bool) -> int:
+    """农历月在当年月序列中的位置，不存在时返回 -1"""
+    if not 1 <= month <= 12:
+        return -1
+    if is_leap:
+        return month if leap == month else -1
+    return month - 1 + (0 < leap < month)
+
+
+def solar_to_lunar(year: int, month: int, day: int) -> tuple:
+    """公历转农历
+
+    Returns:
+        tuple: (农历年, 农历月, 农历日, 是否闰月)
+
+    Raises:
+        ValueError: 超出支持范围
+    """
+    starts, offsets, leaps = load_table()
+    days = date(year, month, day).toordinal() - _EPOCH_ORDINAL
+    i = year - FIRST_YEAR
+    if i >= len(starts) or (i >= 0 and days < starts[i]):
+        i -= 1
+    if i < 0 or days - starts[i] >= offsets[i][-1]:
+        raise ValueError(f"超出农历支持范围({FIRST_YEAR}-{LAST_YEAR})")
+
+    offset = days - starts[i]
+    position = bisect_right(offsets[i], offset) - 1
+    leap = leaps[i]
+    if leap and position >= leap:
+        lunar_month, is_leap = position, position == leap
+    else:
+        lunar_month, is_leap = position + 1, False
+    return FIRST_YEAR + i, lunar_month, offset - offsets[i][position] + 1, is_leap
+
+
+def lunar_to_solar(year: int, month: int, day: int, is_leap: bool = False) -> date:
+    """农历转公历
+
+    Raises:
+        ValueError: 农历日期不存在或超出支持范围
+    """
+    starts, offsets, leaps = load_table()
+    i = year - FIRST_YEAR
+    position = _month_position(leaps[i], month, is_leap) if 0 <= i < len(starts) else -1
+    if position < 0:
+        raise ValueError(f"不存在的农历日期: {year}年{'闰' if is_leap else ''}{month}月")
+    start, end = offsets[i][position], offsets[i][position + 1]
+    if not 1 <= day <= end - start:
+        raise ValueError(f"不存在的农历日期: {year}年{'闰' if is_leap else ''}{month}月{day}日")
+    return _EPOCH + timedelta(days=starts[i] + start + day - 1)
+
+
+def leap_month(year: int) -> int:
+    """返回农历年的闰月月份，无闰月时为0"""
+    _, _, leaps = load_table()
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        raise ValueError(f"超出农历支持范围({FIRST_YEAR}-{LAST_YEAR})")
+    return leaps[year - FIRST_YEAR]
+
+
+def month_days(year: int, month: int, is_leap: bool = False) -> int:
+    """农历月的天数（29或30）"""
+    _, offsets, leaps = load_table()
+    i = year - FIRST_YEAR
+    position = _month_position(leaps[i], month, is_leap) if 0 <= i < len(offsets) else -1
+    if position < 0:
+        raise ValueError(f"不存在的农历月份: {year}年{'闰' if is_leap else ''}{month}月")
+    return offsets[i][position + 1] - offsets[i][position]
+
+
+def _load_arrays():
+    """展开为 NumPy 数组：(正月初一, 月首偏移矩阵, 闰月)"""
+    global _arrays
+    if _arrays is None:
+        import numpy as np
+        starts, offsets, leaps = load_table()
+        matrix = np.full((len(offsets), 14), np.iinfo(np.int32).max, dtype=np.int32)
+        for i, row in enumerate(offsets):
+            matrix[i, :len(row)] = row
+        _arrays = (np.array(starts, dtype=np.int64), matrix, np.array(leaps, dtype=np.int64))
+    return _arrays
+
+
+def solar_to_lunar_many(years, months, days):
+    """solar_to_lunar() 的向量化版本
+
+    Returns:
+        tuple: (农历年数组, 农历月数组, 农历日数组, 是否闰月布尔数组)
+
+    Raises:
+        ValueError: 有日期超出支持范围
+    """
+    import numpy as np
+    from .solar_terms import days_from_civil
+    starts, matrix, leaps = _load_arrays()
+    years, months, days = (a.astype(np.int64) for a in
+                           np.broadcast_arrays(np.asarray(years), np.asarray(months),
+                                               np.asarray(days)))
+    stamps = days_from_civil(years, months, days)
+
+    i = years - FIRST_YEAR
+    clipped = np.clip(i, 0, len(starts) - 1)
+    i = np.where((i >= len(starts)) | ((i >= 0) & (stamps < starts[clipped])), i - 1, i)
+    valid = (i >= 0) & (i < len(starts))
+    i = np.where(valid, i, 0)
+    offset = stamps - starts[i]
+    rows = matrix[i]
+    count = np.where(leaps[i] > 0, 13, 12)
+    year_days = np.take_along_axis(rows, count[..., None], axis=-1)[..., 0]
+    if not (valid & (offset < year_days)).all():
+        raise ValueError(f"超出农历支持范围({FIRST_YEAR}-{LAST_YEAR})")
+
+    position = (rows <= offset[..., None]).sum(axis=-1) - 1
+    leap = leaps[i]
+    after_leap = (leap > 0) & (position >= leap)
+    lunar_day = offset - np.take_along_axis(rows, position[..., None], axis=-1)[..., 0] + 1
+    return (FIRST_YEAR + i, np.where(after_leap, position, position + 1),
+            lunar_day, after_leap & (position == leap))
+
+
+def lunar_to_solar_many(years, months, days, is_leap=False):
+    """lunar_to_solar() 的向量化版本
+
+    Returns:
+        numpy.ndarray: datetime64[D] 数组
+
+    Raises:
+        ValueError: 有农历日期不存在或超出支持范围
+    """
+    import numpy as np
+    starts, matrix, leaps = _load_arrays()
+    years, months, days, is_leap = np.broadcast_arrays(
+        np.asarray(years, dtype=np.int64), np.asarray(months, dtype=np.int64),
+        np.asarray(days, dtype=np.int64), np.asarray(is_leap, dtype=bool))
+
+    i = years - FIRST_YEAR
+    valid = (i >= 0) & (i < len(starts)) & (months >= 1) & (months <= 12)
+    i = np.where(valid, i, 0)
+    leap = leaps[i]
+    valid &= ~is_leap | (leap == months)
+    position = np.where(is_leap, months, months - 1 + ((leap > 0) & (months > leap)))
+    position = np.where(valid, position, 0)
+    start = matrix[i, position]
+    valid &= (days >= 1) & (days <= matrix[i, position + 1] - start)
+    if not valid.all():
+        raise ValueError("存在不存在的农历日期或超出支持范围")
+    return (starts[i] + start + days - 1).astype('datetime64[D]')
@@ -0,0 +1,242 @@
+"""运行指标模块 - Lightweight Stage Metrics
+
+为计算器与AI调用的各阶段计时，汇总为延迟直方图与计数器：
+    - 默认关闭；设置环境变量 DIVINATION_METRICS=1 或调用 enable() 开启
+    - 微秒级热路径用 timer()：关闭时返回 None，每个阶段只多一次真值判断
+    - 其余代码用 span() 上下文（关闭时为共享的空上下文，约 0.2 µs）
+    - render_prometheus() 输出 Prometheus 文本格式，snapshot() 供界面展示
+
+    t = metrics.timer('bazi')
+    cached = cache.get(key)
+    if t:
+        t.lap('cache_lookup')
+
+    with metrics.span('ai', 'llm'):
+        ...
+"""
+
+import bisect
+import os
+import threading
+import time
+
+# 直方图桶上界（秒），覆盖微秒级计算到数十秒的LLM请求
+DEFAULT_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """固定桶延迟直方图（计数按桶累计，不保存样本）"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估计分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class _Span:
+    __slots__ = ('registry', 'system', 'stage', 'start')
+
+    def __init__(self, registry, system, stage):
+        self.registry = registry
+        self.system = system
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.system, self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.registry.count('errors', self.system, self.stage)
+
+
+class Timer:
+    """分段计时：lap() 记录距上一次 lap（或开始）的耗时，total() 记录距开始的耗时"""
+
+    __slots__ = ('registry', 'system', 'start', 'last')
+
+    def __init__(self, registry, system):
+        self.registry = registry
+        self.system = system
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.registry.observe(self.system, stage, now - self.last)
+        self.last = now
+
+    def total(self, stage: str):
+        self.registry.observe(self.system, stage, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Registry:
+    """指标注册表：(系统, 阶段) -> 直方图，(名称, 系统, 阶段) -> 计数"""
+
+    def __init__(self, enabled: bool = False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def timer(self, system: str):
+        """分段计时器；关闭时返回 None"""
+        return Timer(self, system) if self.enabled else None
+
+    def span(self, system: str, stage: str):
+        """阶段计时上下文；关闭时返回空上下文"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, system, stage)
+
+    def observe(self, system: str, stage: str, seconds: float):
+        key = (system, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def count(self, name: str, system: str, stage: str, value: int = 1):
+        if not self.enabled:
+            return
+        key = (name, system, stage)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, collect):
+        """注册在输出时读取的外部指标
+
+        collect() 返回 [(名称, 类型, 说明, 标签字典, 值)]，类型为 'counter' 或 'gauge'。
+        """
+        self._collectors.append(collect)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> list:
+        """各阶段统计（秒）：[{'system', 'stage', 'count', 'mean', 'p50', 'p95', 'p99', 'errors'}]"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = dict(self._counters)
+        rows = []
+        for (system, stage), h in histograms:
+            rows.append({'system': system, 'stage': stage, 'count': h.count,
+                         'mean': h.sum / h.count if h.count else 0.0,
+                         'p50': h.quantile(0.5), 'p95': h.quantile(0.95),
+                         'p99': h.quantile(0.99),
+                         'errors': counters.get(('errors', system, stage), 0)})
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式（exposition format 0.0.4）"""
+        lines = ['# HELP divination_stage_seconds 各阶段耗时',
+                 '# TYPE divination_stage_seconds histogram']
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for (system, stage), h in histograms:
+            labels = f'system="{system}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), h.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(
+                    f'divination_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'divination_stage_seconds_sum{{{labels}}} {h.sum!r}')
+            lines.append(f'divination_stage_seconds_count{{{labels}}} {h.count}')
+
+        lines += ['# HELP divination_stage_errors_total 各阶段抛出异常的次数',
+                  '# TYPE divination_stage_errors_total counter']
+        for (name, system, stage), value in counters:
+            if name == 'errors':
+                lines.append(f'divination_stage_errors_total'
+                             f'{{system="{system}",stage="{stage}"}} {value}')
+
+        # 同名指标须连续输出，先按名称归并各采集函数的结果
+        families = {}
+        for collect in self._collectors:
+            for name, kind, help_text, labels, value in collect():
+                families.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+        for name, (kind, help_text, samples) in families.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text
+                             else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(enabled=os.environ.get('DIVINATION_METRICS', '') not in ('', '0'))
+timer = registry.timer
+span = registry.span
+snapshot = registry.snapshot
+render_prometheus = registry.render_prometheus
+register_collector = registry.register_collector
+
+
+def enable():
+    registry.enabled = True
+
+
+def disable():
+    registry.enabled = False
+
+
+def cache_collector(name: str, cache):
+    """ChartCache / ResponseCache 的命中统计采集函数"""
+    def collect():
+        stats = cache.stats()
+        labels = {'cache': name}
+        rows = [('divination_cache_hits_total', 'counter', '缓存命中次数', labels, stats['hits']),
+                ('divination_cache_misses_total', 'counter', '缓存未命中次数', labels,
+                 stats['misses']),
+                ('divination_cache_entries', 'gauge', '缓存条目数', labels, stats['size'])]
+        if 'upstream_calls' in stats:
+            rows.append(('divination_llm_upstream_calls_total', 'counter',
+                         '实际发往LLM供应商的请求数', {}, stats['upstream_calls']))
+        return rows
+    return collect
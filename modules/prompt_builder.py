@@ -0,0 +1,217 @@
+"""提示詞建構 - Compact Prompt Encoder
+
+將命盤轉為精簡的規範文字，取代整份 JSON：
+    - 每種命盤有專用編碼器，逐行輸出，重要的行在前
+    - 空欄位、與其他欄位重複的欄位（紫微 major_stars 等）與固定佔位欄位
+      （八字 ten_gods）不輸出
+    - 以 estimate_tokens() 估算 token 數，超出預算時從最不重要的行開始捨去
+    - 固定的系統前言放在第一則訊息，三個命理系統的請求共用同一前綴，
+      供應商可重用提示前綴快取
+
+    messages = build_messages({'type': 'bazi', 'data': chart}, '事業', budget=600)
+"""
+
+import math
+
+SYSTEM_PREAMBLE = (
+    "你是命理大師，結合古籍與現代心理分析。\n"
+    "命盤以精簡格式給出，每行一項，宮位寫作「宮名干支:主星/輔星」。\n"
+    "請以繁體中文回答，分三部分：[古籍分析] [現代解讀] [行動建議]"
+)
+
+# 整份提示（系統前言 + 命盤 + 問題）的預設 token 預算
+DEFAULT_BUDGET = 1024
+
+# 每則訊息的格式開銷（角色標記等）
+_MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(prompt) -> int:
+    """粗估 token 數：CJK 字元約一字一個 token，其餘約四個字元一個 token
+
+    prompt 可為字串或 chat messages 列表。
+    """
+    if not isinstance(prompt, str):
+        return sum(estimate_tokens(message['content']) + _MESSAGE_OVERHEAD
+                   for message in prompt)
+    cjk = sum(1 for ch in prompt if ord(ch) >= 0x2E80)
+    return cjk + math.ceil((len(prompt) - cjk) / 4)
+
+
+def chart_type(data) -> str:
+    """命盤類型：'bazi' / 'ziwei' / 'yijing'，無法辨認時返回 None"""
+    if isinstance(data, dict) and 'type' in data and 'data' in data:
+        return data['type']
+    chart = _as_dict(data)
+    if 'year_pillar' in chart:
+        return 'bazi'
+    if 'palaces' in chart:
+        return 'ziwei'
+    if 'hexagram_number' in chart:
+        return 'yijing'
+    return None
+
+
+def encode_chart(data) -> list:
+    """將命盤編碼為精簡文字行（重要的在前）
+
+    data 可為 {'type': ..., 'data': 命盤} 包裝、命盤字典或具有 to_dict() 的命盤物件。
+    """
+    kind = chart_type(data)
+    if isinstance(data, dict) and 'type' in data and 'data' in data:
+        data = data['data']
+    chart = _as_dict(data)
+    encoder = _ENCODERS.get(kind, _encode_generic)
+    return [line for line in encoder(chart) if line]
+
+
+def build_messages(data, question: str = None, budget: int = DEFAULT_BUDGET,
+                   preamble: str = SYSTEM_PREAMBLE) -> list:
+    """建構 chat messages：[系統前言, 命盤 + 問題]
+
+    估算總 token 數超出 budget 時依序捨去最後的命盤行；第一行（命盤核心）
+    與問題總是保留，問題過長時截短。
+    """
+    question = question or '全面分析'
+    question_line = f"問題：{question}"
+    lines = encode_chart(data)
+    remaining = budget - estimate_tokens(preamble) - 2 * _MESSAGE_OVERHEAD
+    kept = []
+    for i, line in enumerate(lines):
+        cost = estimate_tokens(line) + 1
+        if i and cost > remaining - estimate_tokens(question_line):
+            break
+        kept.append(line)
+        remaining -= cost
+    if estimate_tokens(question_line) > remaining:
+        question_line = "問題：" + _truncate(question, remaining - estimate_tokens("問題："))
+    kept.append(question_line)
+    return [{'role': 'system', 'content': preamble},
+            {'role': 'user', 'content': '\n'.join(kept)}]
+
+
+def _truncate(text: str, budget: int) -> str:
+    """截短至 budget 個 token 以內（至少保留一個字）"""
+    while len(text) > 1 and estimate_tokens(text + '…') > budget:
+        text = text[:-1]
+    return text + '…'
+
+
+def _as_dict(chart) -> dict:
+    if hasattr(chart, 'to_dict'):
+        chart = chart.to_dict()
+    return chart if isinstance(chart, dict) else {}
+
+
+def _join(values, sep=''):
+    return sep.join(str(v) for v in values if v not in (None, '', [], {}))
+
+
+def _pillar(pillar) -> str:
+    return f"{pillar['stem']}{pillar['branch']}" if pillar else ''
+
+
+def _encode_bazi(chart):
+    pillars = [_pillar(chart.get(key)) for key in
+               ('year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar')]
+    yield f"八字 {' '.join(pillars)}"
+    day_master = _join([chart.get('day_master'), chart.get('strength')], ' ')
+    if chart.get('favorable_elements'):
+        day_master += f" 喜{_join(chart['favorable_elements'])}"
+    if chart.get('unfavorable_elements'):
+        day_master += f" 忌{_join(chart['unfavorable_elements'])}"
+    if day_master:
+        yield f"日主 {day_master}"
+    if chart.get('five_elements'):
+        yield "五行 " + ' '.join(f'{k}{v}' for k, v in chart['five_elements'].items())
+    extras = []
+    if chart.get('nayin'):
+        extras.append(f"納音{chart['nayin']}")
+    if chart.get('void'):
+        extras.append(f"空亡{_join(chart['void'])}")
+    if chart.get('natal_stars'):
+        extras.append(f"神煞{_join(chart['natal_stars'], ',')}")
+    if extras:
+        yield ' '.join(extras)
+    if chart.get('major_fortune'):
+        yield "大運 " + ' '.join(_fortune(step) for step in chart['major_fortune'])
+
+
+def _fortune(step) -> str:
+    if isinstance(step, dict):
+        ages = _join([step.get('start_age'), step.get('end_age')], '-')
+        ganzhi = step.get('ganzhi') or _join([step.get('heavenly_stem'),
+                                              step.get('earthly_branch')])
+        return f"{ages}{ganzhi}"
+    return str(step)
+
+
+def _encode_ziwei(chart):
+    info = chart.get('birth_info', {})
+    head = ["紫微", chart.get('five_elements'),
+            f"命{chart['life_palace']}" if chart.get('life_palace') else '',
+            f"身{chart['body_palace']}" if chart.get('body_palace') else '',
+            f"命主{chart['life_master']}" if chart.get('life_master') else '',
+            f"身主{chart['body_master']}" if chart.get('body_master') else '']
+    if info:
+        head += [info.get('year_ganzhi'), info.get('gender')]
+        if info.get('lunar_month'):
+            leap = '閏' if info.get('is_leap_month') else ''
+            head.append(f"農曆{leap}{info['lunar_month']}月{info.get('lunar_day')}日")
+    yield _join(head, ' ')
+    if chart.get('four_transformations'):
+        yield "四化 " + ' '.join(f'{name[-1]}{star}' for name, star
+                                 in chart['four_transformations'].items())
+    for palace in chart.get('palaces', []):
+        stars = _join(palace.get('major_stars', []), ',')
+        minor = _join(palace.get('minor_stars', []), ',')
+        if minor:
+            stars += f'/{minor}'
+        bright = f" {palace['brightness']}" if palace.get('brightness') else ''
+        yield (f"{palace['name']}{palace.get('heavenly_stem', '')}"
+               f"{palace.get('earthly_branch', '')}:{stars or '空宮'}{bright}")
+    if chart.get('decadal_fortune'):
+        yield "大限 " + ' '.join(f"{step['start_age']}{step['palace']}"
+                                 for step in chart['decadal_fortune'])
+
+
+def _encode_yijing(chart):
+    info = chart.get('interpretation') or {}
+    trigrams = f"({info['upper']}上{info['lower']}下)" if info.get('upper') else ''
+    moving = chart.get('changing_lines') or []
+    yield (f"易經 第{chart.get('hexagram_number')}卦{chart.get('hexagram_name', '')}{trigrams}"
+           f" 動爻{_join(moving, ',') or '無'}")
+    if chart.get('lines'):
+        yield "六爻(初→上) " + _join(line.get('value') for line in chart['lines'])
+    related = []
+    for key, label in (('changed_hexagram', '之卦'), ('nuclear_hexagram', '互卦'),
+                       ('inverse_hexagram', '綜卦'), ('opposite_hexagram', '錯卦')):
+        hexagram = chart.get(key)
+        if hexagram:
+            related.append(f"{label}{hexagram.get('number')}{hexagram.get('name', '')}")
+    if related:
+        yield ' '.join(related)
+    extras = []
+    if info.get('element'):
+        extras.append(f"五行{info['element']}")
+    if info.get('nature'):
+        extras.append(f"卦德{info['nature']}")
+    if chart.get('question'):
+        extras.append(f"占問{chart['question']}")
+    if extras:
+        yield ' '.join(extras)
+
+
+def _encode_generic(chart):
+    """未知類型：扁平化為「鍵=值」，略去空值"""
+    for key, value in chart.items():
+        if value in (None, '', [], {}) or key == 'timestamp':
+            continue
+        if isinstance(value, dict):
+            value = ','.join(f'{k}={v}' for k, v in value.items() if v not in (None, '', [], {}))
+        elif isinstance(value, (list, tuple)):
+            value = ','.join(str(v) for v in value)
+        yield f"{key}={value}"
+
+
+_ENCODERS = {'bazi': _encode_bazi, 'ziwei': _encode_ziwei, 'yijing': _encode_yijing}
@@ -0,0 +1,174 @@
+"""LLM 回應快取 - Content-addressed LLM Response Cache
+
+以「正規化命盤 + 問題 + 提示模板版本 + 供應商/模型」的 SHA-256 為鍵：
+    - 記憶體層：ChartCache（LRU + TTL）
+    - 磁碟層（選用）：每個鍵一個 JSON 檔，跨程序、跨重新部署沿用
+    - 單飛(single-flight)：同一事件迴圈中相同鍵的並行請求只向上游呼叫一次，
+      其餘請求等待同一結果
+失敗的呼叫不寫入快取。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import metrics
+from .cache import ChartCache
+
+# 正規化時忽略的欄位（每次起卦都不同，但不影響分析內容）
+_VOLATILE_KEYS = frozenset({'timestamp'})
+
+# 領頭呼叫被取消時交給跟隨者的結果，表示需重新查詢或接手計算
+_ABANDONED = object()
+
+
+def _canonical(obj):
+    if hasattr(obj, 'to_dict'):
+        obj = obj.to_dict()
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items() if k not in _VOLATILE_KEYS}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, 'item'):          # NumPy 純量
+        return obj.item()
+    return str(obj)
+
+
+def response_key(chart, question, template_version, provider: str, model: str) -> str:
+    """回應快取鍵：正規化內容的 SHA-256 十六進位字串
+
+    命盤可為字典或具有 to_dict() 的命盤物件；鍵序與時間戳不影響結果。
+    """
+    payload = json.dumps([_canonical(chart), question, template_version, provider, model],
+                         ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """兩層 LLM 回應快取，附單飛去重"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, disk_dir: str = None):
+        """
+        Args:
+            maxsize: 記憶體層最多保留的回應數
+            ttl: 回應存活秒數，None 表示不過期（兩層共用）
+            disk_dir: 磁碟層目錄，None 表示只用記憶體層
+        """
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._memory = ChartCache(maxsize=maxsize, ttl=ttl, copy_on_read=False)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+
+    def get(self, key: str):
+        """讀取回應，依序查記憶體層與磁碟層；未命中返回 None"""
+        value = self._memory.get(key)
+        if value is None and self.disk_dir:
+            value = self._disk_get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._memory.put(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        self._memory.put(key, value)
+        if self.disk_dir:
+            self._disk_put(key, value)
+
+    async def get_or_compute(self, key: str, compute):
+        """讀取快取，未命中時呼叫 compute() 協程函式並寫入快取
+
+        同一事件迴圈中相同鍵的並行呼叫共用同一次 compute()。領頭的呼叫被取消時
+        （重新執行、用戶端斷線、逾時），等待中的跟隨者不受牽連，由其中一個接手重新計算。
+        """
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            with self._lock:
+                future = self._inflight.get(flight)
+                leader = future is None
+                if leader:
+                    future = self._inflight[flight] = loop.create_future()
+                else:
+                    self.coalesced += 1
+            if leader:
+                return await self._lead(flight, future, compute)
+            value = await asyncio.shield(future)
+            if value is not _ABANDONED:
+                return value
+
+    async def _lead(self, flight, future, compute):
+        key = flight[1]
+        try:
+            self.upstream_calls += 1
+            value = await compute()
+        except asyncio.CancelledError:
+            future.set_result(_ABANDONED)   # 跟隨者改為重新競爭領頭
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()      # 無跟隨者時避免「例外未被取出」警告
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[flight]
+
+    def clear(self):
+        """清空記憶體層（磁碟層保留）"""
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        stats = self._memory.stats()
+        stats.update(disk_hits=self.disk_hits, coalesced=self.coalesced,
+                     upstream_calls=self.upstream_calls)
+        return stats
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f'{key}.json')
+
+    def _disk_get(self, key: str):
+        try:
+            with open(self._disk_path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl is not None and entry.get('created', 0) + self.ttl <= time.time():
+            return None
+        return entry.get('response')
+
+    def _disk_put(self, key: str, value: str):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'response': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 磁碟層只是加速手段，寫入失敗時僅保留記憶體層
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+# AIIntegration 預設共享的回應快取；設定 DIVINATION_CACHE_DIR 時啟用磁碟層
+response_cache = ResponseCache(maxsize=1024, ttl=24 * 3600,
+                               disk_dir=os.environ.get('DIVINATION_CACHE_DIR'))
+metrics.register_collector(metrics.cache_collector('llm_response', response_cache))
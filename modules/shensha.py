@@ -0,0 +1,259 @@
+"""神煞模块 - Natal Stars, Nayin and Void
+
+神煞以声明式规则列出，导入时编译为按干支序号直接索引的扁平查表：
+    - 每条规则：名称、起例（以哪一柱的干或支查）、所查对象（干、支或整柱）、
+      查哪些柱，以及 "起例:所见" 形式的对照表
+    - 起例柱、起例类别、对象类别相同的规则合并到同一组，每组对每个被查柱
+      编译出一张 key * size + target -> 神煞位掩码 的元组表
+    - 首次使用时再把涉及同一对柱的各组（不分起例与被查，起例柱查自身的
+      并入含该柱的一对）合并为以两柱干支序号索引的 60*60 表，一张命盘
+      只查 6 次，增加规则只会改变表中的位，不增加每盘开销
+纳音直接取年柱的 ganzhi.NAYIN，空亡取日柱所在旬的两个地支，都是 0-59 序号直接查表。
+单盘（BaziChart.to_dict）与批量（calculate_many）使用同一组表，批量路径
+只是把它们转为 NumPy 数组。
+
+    mask = shensha.star_mask(chart.pillars)
+    shensha.star_names(mask)        # ['天乙贵人', '桃花', ...]
+"""
+
+from functools import lru_cache
+
+from .ganzhi import DIZHI, GANZHI, TIANGAN
+
+# (名称, 起例, 对象, 查哪些柱, 对照表)
+#   起例: year_stem / day_stem / year_branch / day_branch / month_branch 的元组，
+#         None 表示不需起例、只看被查柱本身
+#   对象: stem / branch / pillar
+#   查哪些柱: 四柱、余柱（除起例柱外）、日柱、日时
+#   对照表: 空格分隔的 "起例:所见"；起例为 None 时直接列出所见
+RULES = (
+    # 以年干、日干查四柱地支
+    ('天乙贵人', ('year_stem', 'day_stem'), 'branch', '四柱',
+     '甲戊庚:丑未 乙己:子申 丙丁:亥酉 辛:寅午 壬癸:卯巳'),
+    ('太极贵人', ('year_stem', 'day_stem'), 'branch', '四柱',
+     '甲乙:子午 丙丁:卯酉 戊己:辰戌丑未 庚辛:寅亥 壬癸:巳申'),
+    ('文昌贵人', ('year_stem', 'day_stem'), 'branch', '四柱',
+     '甲:巳 乙:午 丙:申 丁:酉 戊:申 己:酉 庚:亥 辛:子 壬:寅 癸:卯'),
+    ('国印贵人', ('year_stem', 'day_stem'), 'branch', '四柱',
+     '甲:戌 乙:亥 丙:丑 丁:寅 戊:丑 己:寅 庚:辰 辛:巳 壬:未 癸:申'),
+    ('福星贵人', ('year_stem', 'day_stem'), 'branch', '四柱',
+     '甲丙:寅子 乙癸:卯丑 丁:亥 戊:申 己:未 庚:午 辛:巳 壬:辰'),
+    # 以日干查四柱地支
+    ('禄神', ('day_stem',), 'branch', '四柱',
+     '甲:寅 乙:卯 丙:巳 丁:午 戊:巳 己:午 庚:申 辛:酉 壬:亥 癸:子'),
+    ('羊刃', ('day_stem',), 'branch', '四柱',
+     '甲:卯 乙:辰 丙:午 丁:未 戊:午 己:未 庚:酉 辛:戌 壬:子 癸:丑'),
+    ('飞刃', ('day_stem',), 'branch', '四柱',
+     '甲:酉 乙:戌 丙:子 丁:丑 戊:子 己:丑 庚:卯 辛:辰 壬:午 癸:未'),
+    ('金舆', ('day_stem',), 'branch', '四柱',
+     '甲:辰 乙:巳 丙:未 丁:申 戊:未 己:申 庚:戌 辛:亥 壬:丑 癸:寅'),
+    ('学堂', ('day_stem',), 'branch', '四柱',
+     '甲:亥 乙:午 丙:寅 丁:酉 戊:寅 己:酉 庚:巳 辛:子 壬:申 癸:卯'),
+    ('红艳煞', ('day_stem',), 'branch', '四柱',
+     '甲:午 乙:午 丙:寅 丁:未 戊:辰 己:辰 庚:戌 辛:酉 壬:子 癸:申'),
+    ('流霞', ('day_stem',), 'branch', '四柱',
+     '甲:酉 乙:戌 丙:未 丁:申 戊:巳 己:午 庚:辰 辛:卯 壬:亥 癸:寅'),
+    # 以年支、日支三合局查其余地支
+    ('桃花', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:酉 寅午戌:卯 巳酉丑:午 亥卯未:子'),
+    ('驿马', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:寅 寅午戌:申 巳酉丑:亥 亥卯未:巳'),
+    ('华盖', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:辰 寅午戌:戌 巳酉丑:丑 亥卯未:未'),
+    ('将星', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:子 寅午戌:午 巳酉丑:酉 亥卯未:卯'),
+    ('劫煞', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:巳 寅午戌:亥 巳酉丑:寅 亥卯未:申'),
+    ('灾煞', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:午 寅午戌:子 巳酉丑:卯 亥卯未:酉'),
+    ('亡神', ('year_branch', 'day_branch'), 'branch', '余柱',
+     '申子辰:亥 寅午戌:巳 巳酉丑:申 亥卯未:寅'),
+    # 以年支查其余地支
+    ('孤辰', ('year_branch',), 'branch', '余柱', '亥子丑:寅 寅卯辰:巳 巳午未:申 申酉戌:亥'),
+    ('寡宿', ('year_branch',), 'branch', '余柱', '亥子丑:戌 寅卯辰:丑 巳午未:辰 申酉戌:未'),
+    ('红鸾', ('year_branch',), 'branch', '余柱',
+     '子:卯 丑:寅 寅:丑 卯:子 辰:亥 巳:戌 午:酉 未:申 申:未 酉:午 戌:巳 亥:辰'),
+    ('天喜', ('year_branch',), 'branch', '余柱',
+     '子:酉 丑:申 寅:未 卯:午 辰:巳 巳:辰 午:卯 未:寅 申:丑 酉:子 戌:亥 亥:戌'),
+    ('丧门', ('year_branch',), 'branch', '余柱',
+     '子:寅 丑:卯 寅:辰 卯:巳 辰:午 巳:未 午:申 未:酉 申:戌 酉:亥 戌:子 亥:丑'),
+    ('吊客', ('year_branch',), 'branch', '余柱',
+     '子:戌 丑:亥 寅:子 卯:丑 辰:寅 巳:卯 午:辰 未:巳 申:午 酉:未 戌:申 亥:酉'),
+    # 以月支查四柱天干、地支（天德、天德合所见干支兼有，分两条）
+    ('天德贵人', ('month_branch',), 'stem', '四柱',
+     '寅:丁 辰:壬 巳:辛 未:甲 申:癸 戌:丙 亥:乙 丑:庚'),
+    ('天德贵人', ('month_branch',), 'branch', '四柱', '卯:申 午:亥 酉:寅 子:巳'),
+    ('天德合', ('month_branch',), 'stem', '四柱',
+     '寅:壬 辰:丁 巳:丙 未:己 申:戊 戌:辛 亥:庚 丑:乙'),
+    ('天德合', ('month_branch',), 'branch', '四柱', '卯:巳 午:寅 酉:亥 子:申'),
+    ('月德贵人', ('month_branch',), 'stem', '四柱', '寅午戌:丙 申子辰:壬 亥卯未:甲 巳酉丑:庚'),
+    ('月德合', ('month_branch',), 'stem', '四柱', '寅午戌:辛 申子辰:丁 亥卯未:己 巳酉丑:乙'),
+    ('天医', ('month_branch',), 'branch', '余柱',
+     '寅:丑 卯:寅 辰:卯 巳:辰 午:巳 未:午 申:未 酉:申 戌:酉 亥:戌 子:亥 丑:子'),
+    ('天赦', ('month_branch',), 'pillar', '日柱', '寅卯辰:戊寅 巳午未:甲午 申酉戌:戊申 亥子丑:甲子'),
+    # 只看日柱（金神兼看时柱）本身
+    ('魁罡', None, 'pillar', '日柱', '庚辰 壬辰 戊戌 庚戌'),
+    ('阴差阳错', None, 'pillar', '日柱', '丙子 丁丑 戊寅 辛卯 壬辰 癸巳 丙午 丁未 戊申 辛酉 壬戌 癸亥'),
+    ('十恶大败', None, 'pillar', '日柱', '甲辰 乙巳 丙申 丁亥 戊戌 己丑 庚辰 辛巳 壬申 癸亥'),
+    ('孤鸾煞', None, 'pillar', '日柱', '乙巳 丁巳 辛亥 戊申 甲寅 壬子 丙午 戊午'),
+    ('十灵日', None, 'pillar', '日柱', '甲辰 乙亥 丙辰 丁酉 戊午 庚戌 庚寅 辛亥 壬寅 癸未'),
+    ('六秀日', None, 'pillar', '日柱', '丙午 丁未 戊子 戊午 己丑 己未'),
+    ('金神', None, 'pillar', '日时', '乙丑 己巳 癸酉'),
+)
+
+# 起例 -> (柱位, 类别)；柱位 0年 1月 2日 3时
+KEYS = {
+    'year_stem': (0, 'stem'), 'day_stem': (2, 'stem'),
+    'year_branch': (0, 'branch'), 'day_branch': (2, 'branch'),
+    'month_branch': (1, 'branch'),
+}
+# 类别 -> 由干支序号取值的模数，同时是取值个数
+KINDS = {'stem': 10, 'branch': 12, 'pillar': 60}
+_NAMES = {'stem': TIANGAN, 'branch': DIZHI, 'pillar': GANZHI}
+_WHERE = {'四柱': (0, 1, 2, 3), '日柱': (2,), '日时': (2, 3)}
+
+# 批量路径以 int64 位掩码保存，神煞名称不能超过 63 个
+MAX_STARS = 63
+
+
+def _values(text: str, kind: str) -> list:
+    """'甲戊庚' -> [0, 4, 6]；整柱每两个字一个"""
+    names = _NAMES[kind]
+    width = 2 if kind == 'pillar' else 1
+    try:
+        return [names.index(text[i:i + width]) for i in range(0, len(text), width)]
+    except ValueError:
+        raise ValueError(f"无法识别的{kind}: {text}") from None
+
+
+def _compile(rules):
+    """规则 -> (神煞名称元组, 查表组元组)
+
+    每个查表组为 (起例柱位, 起例模数, 被查柱位, 对象模数, 表)，
+    表[起例值 * 对象模数 + 对象值] 为该组在此柱命中的神煞位掩码。
+    """
+    stars = []
+    groups = {}
+    for name, keys, target, where, table in rules:
+        if name not in stars:
+            stars.append(name)
+        bit = 1 << stars.index(name)
+        size = KINDS[target]
+        for key in keys or (None,):
+            key_pos, key_kind = KEYS[key] if key else (2, None)
+            cells = []
+            for entry in table.split():
+                key_text, _, seen = entry.rpartition(':')
+                hits = _values(seen, target)
+                for value in _values(key_text, key_kind) if key_kind else (0,):
+                    cells.extend(value * size + hit for hit in hits)
+            positions = _WHERE.get(where) or tuple(p for p in range(4) if p != key_pos)
+            for position in positions:
+                group = (key_pos, KINDS[key_kind] if key_kind else 1, position, size)
+                lookup = groups.setdefault(group, [0] * (group[1] * size))
+                for cell in cells:
+                    lookup[cell] |= bit
+    if len(stars) > MAX_STARS:
+        raise ValueError(f"神煞名称超过 {MAX_STARS} 个")
+    return tuple(stars), tuple(group + (tuple(cells),) for group, cells in groups.items())
+
+
+STARS, GROUPS = _compile(RULES)
+
+# 日柱所在旬的空亡地支：VOID[日柱序号] -> (地支编码, 地支编码)
+VOID = tuple(((i - i % 10 + 10) % 12, (i - i % 10 + 11) % 12) for i in range(60))
+VOID_NAMES = tuple((DIZHI[a], DIZHI[b]) for a, b in VOID)
+
+
+def star_mask(pillars) -> int:
+    """四柱干支序号 (年, 月, 日, 时) -> 神煞位掩码，第 i 位对应 STARS[i]"""
+    year, month, day, hour = pillars
+    ym, yd, yh, md, mh, dh = _pair_tables()
+    return (ym[year * 60 + month] | yd[year * 60 + day] | yh[year * 60 + hour]
+            | md[month * 60 + day] | mh[month * 60 + hour] | dh[day * 60 + hour])
+
+
+def star_names(mask: int) -> list:
+    """位掩码 -> 神煞名称列表，按 RULES 中首次出现的顺序"""
+    mask = int(mask)
+    names = []
+    for table in _byte_names():
+        names += table[mask & 0xFF]
+        mask >>= 8
+    return names
+
+
+@lru_cache(maxsize=None)
+def _byte_names() -> tuple:
+    """每 8 位一张表：表[字节值] 为该字节各位对应的神煞名称（首次使用时生成）"""
+    return tuple(tuple(tuple(STARS[shift + i] for i in range(8)
+                             if byte >> i & 1 and shift + i < len(STARS))
+                       for byte in range(256))
+                 for shift in range(0, len(STARS), 8))
+
+
+def natal_stars(pillars) -> list:
+    """四柱干支序号 -> 原局神煞名称列表"""
+    return star_names(star_mask(pillars))
+
+
+def star_mask_many(year_idx, month_idx, day_idx, hour_idx):
+    """star_mask() 的向量化版本，参数为四柱干支序号数组，返回 int64 数组"""
+    import numpy as np
+    pillars = [np.asarray(idx, dtype=np.intp) for idx in (year_idx, month_idx, day_idx, hour_idx)]
+    mask = np.zeros(pillars[0].shape, dtype=np.int64)
+    for (a, b, _), table in zip(_pairs(), _pair_arrays()):
+        mask |= table.take(pillars[a] * 60 + pillars[b])
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _pairs() -> tuple:
+    """把 GROUPS 合并为 (柱位 a, 柱位 b, 表)，a < b，表[a柱序号 * 60 + b柱序号] 为掩码
+
+    固定返回按 (a, b) 排序的六对柱位，没有规则的一对为全零表。起例柱在后的组
+    转置后并入，起例柱与被查柱相同的组只取对角线，并入含该柱的一对。每张命盘
+    每对柱位查一次（共 6 次），与规则数和组数都无关；首次使用时由 GROUPS 展开，
+    单盘与批量路径共用。
+    """
+    pairs = {(a, b): [0] * 3600 for a in range(4) for b in range(a + 1, 4)}
+
+    for key_pos, key_mod, position, size, table in GROUPS:
+        # 对象模数整除 60，一行按干支序号展开即是把该行重复 60 // size 次
+        rows = [table[k * size:(k + 1) * size] * (60 // size) for k in range(key_mod)]
+        if key_pos == position:
+            partner = 3 if position != 3 else 2
+            cells = pairs[min(position, partner), max(position, partner)]
+            for k in range(60):
+                value = rows[k % key_mod][k]
+                if value:
+                    indices = (range(k * 60, k * 60 + 60) if position < partner
+                               else range(k, 3600, 60))
+                    for i in indices:
+                        cells[i] |= value
+        elif key_pos < position:
+            cells = pairs[key_pos, position]
+            for k in range(60):
+                row = rows[k % key_mod]
+                for t in range(60):
+                    cells[k * 60 + t] |= row[t]
+        else:
+            cells = pairs[position, key_pos]
+            for k in range(60):
+                row = rows[k % key_mod]
+                for t in range(60):
+                    cells[t * 60 + k] |= row[t]
+    return tuple((a, b, tuple(cells)) for (a, b), cells in sorted(pairs.items()))
+
+
+@lru_cache(maxsize=None)
+def _pair_tables() -> tuple:
+    """_pairs() 的六张表：年月、年日、年时、月日、月时、日时"""
+    return tuple(table for _, _, table in _pairs())
+
+
+@lru_cache(maxsize=None)
+def _pair_arrays() -> tuple:
+    """_pairs() 各表对应的 int64 数组"""
+    import numpy as np
+    return tuple(np.array(table, dtype=np.int64) for _, _, table in _pairs())
@@ -0,0 +1,159 @@
+"""节气模块 - Solar Terms Module
+
+预先计算的节气时刻表（北京时间，分钟精度），二分查找定位节气
+Precomputed solar-term instants with O(log n) bisect lookup
+
+月柱以"节"换月，年柱以立春换年。表由 tools/build_solar_terms.py 生成，
+运行时只做一次加载，不涉及任何天文计算。
+出生时间均视为北京时间（UTC+8）。
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+FIRST_YEAR = 1899
+LAST_YEAR = 2101
+TABLE_MAGIC = b'JQ24'
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'solar_terms.bin')
+
+# 每年24节气，自小寒起；偶数序号为"节"，奇数序号为"中气"
+SOLAR_TERMS = (
+    '小寒', '大寒', '立春', '雨水', '惊蛰', '春分',
+    '清明', '谷雨', '立夏', '小满', '芒种', '夏至',
+    '小暑', '大暑', '立秋', '处暑', '白露', '秋分',
+    '寒露', '霜降', '立冬', '小雪', '大雪', '冬至',
+)
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1)
+
+_table = None
+_table_bytes = None
+_table_digest = None
+_load_lock = threading.Lock()
+
+
+def load_table() -> array:
+    """加载节气表（进程内只读取一次）"""
+    global _table, _table_bytes, _table_digest
+    if _table is None:
+        with _load_lock:
+            if _table is None:
+                with open(TABLE_PATH, 'rb') as f:
+                    raw = f.read()
+                header = struct.calcsize('<4sHH')
+                magic, first_year, years = struct.unpack_from('<4sHH', raw)
+                if magic != TABLE_MAGIC or first_year != FIRST_YEAR or \
+                        years != LAST_YEAR - FIRST_YEAR + 1:
+                    raise RuntimeError(f"节气表格式不符: {TABLE_PATH}")
+                table = array('i')
+                table.frombytes(raw[header:])
+                if sys.byteorder != 'little':
+                    table.byteswap()
+                _table_bytes = raw[header:]
+                _table_digest = hashlib.sha256(raw).digest()
+                _table = table
+    return _table
+
+
+def table_digest() -> bytes:
+    """节气表文件的 SHA-256，由节气表派生的预计算数据据此判断是否过期"""
+    load_table()
+    return _table_digest
+
+
+def to_minutes(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> int:
+    """北京时间转为自1970-01-01 00:00起的分钟数"""
+    days = date(year, month, day).toordinal() - EPOCH_ORDINAL
+    return days * 1440 + hour * 60 + minute
+
+
+def term_index(minutes: int) -> int:
+    """返回不晚于给定时刻的最近一个节气在表中的序号"""
+    table = load_table()
+    i = bisect_right(table, minutes) - 1
+    if i < 0 or i >= len(table) - 1:
+        raise ValueError(f"超出节气表范围({FIRST_YEAR}-{LAST_YEAR})")
+    return i
+
+
+def solar_month(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> tuple:
+    """求出生时间所属的节气年与节气月
+
+    Args:
+        year, month, day, hour, minute: 北京时间
+
+    Returns:
+        tuple: (节气年, 节气月)，节气月1为寅月（立春起）、12为丑月（小寒起）
+    """
+    i = term_index(to_minutes(year, month, day, hour, minute))
+    jie = (i % 24) // 2
+    solar_year = FIRST_YEAR + i // 24 - (jie == 0)
+    return solar_year, jie if jie else 12
+
+
+def adjacent_jie(minutes: int) -> tuple:
+    """给定时刻前后最近的两个"节"（不含中气）在表中的序号 (上一节, 下一节)"""
+    i = term_index(minutes)
+    i -= i % 2
+    if i + 2 >= len(load_table()):
+        raise ValueError(f"超出节气表范围({FIRST_YEAR}-{LAST_YEAR})")
+    return i, i + 2
+
+
+def jie_month(i: int) -> tuple:
+    """"节"在表中的序号 -> 该节开始的 (节气年, 节气月)"""
+    jie = (i % 24) // 2
+    return FIRST_YEAR + i // 24 - (jie == 0), jie if jie else 12
+
+
+def from_minutes(minutes: int) -> datetime:
+    """to_minutes() 的逆运算"""
+    return _EPOCH + timedelta(minutes=minutes)
+
+
+def term_time(year: int, k: int) -> datetime:
+    """返回某公历年第k个节气（0为小寒）的北京时间"""
+    table = load_table()
+    i = (year - FIRST_YEAR) * 24 + k
+    if not 0 <= i < len(table) or not 0 <= k < 24:
+        raise ValueError(f"超出节气表范围({FIRST_YEAR}-{LAST_YEAR})")
+    return _EPOCH + timedelta(minutes=table[i])
+
+
+def days_from_civil(year, month, day):
+    """公历日期转为自1970-01-01起的天数（支持NumPy数组）"""
+    import numpy as np
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def solar_month_many(years, months, days, hours, minutes=0):
+    """solar_month() 的向量化版本
+
+    Returns:
+        tuple: (节气年数组, 节气月数组)
+
+    Raises:
+        ValueError: 有时间超出节气表范围
+    """
+    import numpy as np
+    load_table()
+    table = np.frombuffer(_table_bytes, dtype='<i4')
+    stamps = days_from_civil(years, months, days) * 1440 + hours * 60 + minutes
+    i = np.searchsorted(table, stamps, side='right') - 1
+    if ((i < 0) | (i >= len(table) - 1)).any():
+        raise ValueError(f"超出节气表范围({FIRST_YEAR}-{LAST_YEAR})")
+    jie = (i % 24) // 2
+    solar_year = FIRST_YEAR + i // 24 - (jie == 0)
+    return solar_year, np.where(jie == 0, 12, jie)
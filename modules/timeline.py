@@ -0,0 +1,254 @@
+"""大运流年模块 - Luck Pillar Timeline
+
+由八字命盘与出生时刻按需生成大运、流年、流月、流日：
+    - 阳年男、阴年女顺排，阴年男、阳年女逆排
+    - 起运岁数按出生时刻到下一个（顺排）或上一个（逆排）"节"的距离，三日折一岁
+    - 大运自月柱起顺逆各推一位，每步十年
+    - 流年以立春、流月以各节、流日以公历日期为界
+各层都是生成器，可按时间区间截取；构造 Timeline 只做一次节气表查找，
+界面只显示一个大运时不会算出整个百年。每柱与原局四柱的合冲刑害
+复用 compatibility 的 PILLAR_FLAGS 查表，访问时才计算。
+
+    timeline = bazi.timeline(1990, 5, 15, 14, '女')
+    luck, years = timeline.decade(3)
+    for day in timeline.days(date(2025, 3, 1), date(2025, 4, 1)):
+        day.interactions()
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from . import ganzhi, solar_terms
+from .compatibility import PILLAR_FLAGS, PILLAR_NAMES, RELATION_NAMES
+
+LUCK_YEARS = 10
+LUCK_STEPS = 12                 # 十二步大运，覆盖一百二十年
+MAJOR_FORTUNE_STEPS = 8         # major_fortune() 默认列出的大运步数
+
+LEVELS = ('大运', '流年', '流月', '流日')
+
+_DAYS_PER_YEAR = 365.2425
+_TENTH_YEAR = timedelta(days=_DAYS_PER_YEAR / 10)
+# 三日折一岁：出生到节的每一分钟折合起运前的 365.2425 / 3（约 121.75）分钟
+_LUCK_SCALE = 365.2425 / 3
+
+
+class TimelinePillar:
+    """时间轴上的一柱：层级、干支序号与 [start, end) 时间区间"""
+
+    __slots__ = ('level', 'index', 'start', 'end', 'timeline')
+
+    def __init__(self, level: str, index: int, start: datetime, end: datetime, timeline):
+        self.level = level
+        self.index = index
+        self.start = start
+        self.end = end
+        self.timeline = timeline
+
+    def __repr__(self):
+        return f"TimelinePillar({self.level} {self.ganzhi}, {self.start:%Y-%m-%d %H:%M})"
+
+    @property
+    def ganzhi(self) -> str:
+        return ganzhi.GANZHI[self.index]
+
+    @property
+    def flags(self) -> tuple:
+        """与原局年、月、日、时柱的关系位标志"""
+        row = PILLAR_FLAGS[self.index]
+        return tuple(row[natal] for natal in self.timeline.chart.pillars)
+
+    def interactions(self) -> list:
+        """与原局各柱的伏吟与合冲刑害，如 '日柱甲子 地支六冲'"""
+        return interactions(self.index, self.timeline.chart.pillars)
+
+    def to_dict(self) -> dict:
+        return {
+            'level': self.level,
+            'ganzhi': self.ganzhi,
+            'start': self.start.isoformat(timespec='minutes'),
+            'end': self.end.isoformat(timespec='minutes'),
+            'start_age': round(self.timeline.age_at(self.start), 1),
+            'end_age': round(self.timeline.age_at(self.end), 1),
+            'interactions': self.interactions(),
+        }
+
+
+class Timeline:
+    """一张命盘的大运流年时间轴（出生时间为北京时间）"""
+
+    def __init__(self, chart, birth: datetime):
+        """
+        Args:
+            chart: BaziChart
+            birth: 出生时刻
+
+        Raises:
+            ValueError: 出生时刻超出节气表范围
+        """
+        self.chart = chart
+        self.birth = birth
+        yang = chart.year % 2 == 0
+        self.forward = yang == (chart.gender == '男')
+        minutes = _minutes(birth)
+        previous, following = solar_terms.adjacent_jie(minutes)
+        table = solar_terms.load_table()
+        distance = table[following] - minutes if self.forward else minutes - table[previous]
+        self.luck_start = birth + timedelta(minutes=round(distance * _LUCK_SCALE))
+
+    def __repr__(self):
+        return (f"Timeline({self.chart!r}, {'顺' if self.forward else '逆'}排, "
+                f"{self.start_age:.1f}岁起运)")
+
+    @property
+    def start_age(self) -> float:
+        """起运岁数（周岁）"""
+        return self.age_at(self.luck_start)
+
+    def age_at(self, when: datetime) -> float:
+        return (when - self.birth) / timedelta(days=_DAYS_PER_YEAR)
+
+    # ---- 大运 ----
+
+    def luck_pillar(self, n: int) -> TimelinePillar:
+        """第 n 步大运（自0起）"""
+        step = 1 if self.forward else -1
+        start = _add_years(self.luck_start, LUCK_YEARS * n)
+        return TimelinePillar('大运', (self.chart.month + step * (n + 1)) % 60, start,
+                              _add_years(self.luck_start, LUCK_YEARS * (n + 1)), self)
+
+    def luck_pillars(self, start=None, end=None, steps: int = LUCK_STEPS):
+        """与 [start, end) 有交集的大运（生成器）"""
+        start, end = _bounds(start, end)
+        for n in range(steps):
+            pillar = self.luck_pillar(n)
+            if end is not None and pillar.start >= end:
+                return
+            if start is None or pillar.end > start:
+                yield pillar
+
+    def luck_pillar_at(self, when) -> TimelinePillar:
+        """某时刻所在的大运，起运之前返回 None"""
+        when = _as_datetime(when)
+        if when < self.luck_start:
+            return None
+        n = int(self.age_at(when) - self.start_age) // LUCK_YEARS
+        pillar = self.luck_pillar(n)
+        # 年数换算的舍入误差
+        if when < pillar.start:
+            pillar = self.luck_pillar(n - 1)
+        elif when >= pillar.end:
+            pillar = self.luck_pillar(n + 1)
+        return pillar
+
+    def decade(self, n: int) -> tuple:
+        """第 n 步大运及其十年内的流年生成器，供逐个大运展示"""
+        pillar = self.luck_pillar(n)
+        return pillar, self.years(pillar.start, pillar.end)
+
+    # ---- 流年、流月、流日 ----
+
+    def years(self, start=None, end=None):
+        """与 [start, end) 有交集的流年（以立春为界），start 默认为出生时刻"""
+        start, end = _bounds(start, end)
+        year = solar_terms.solar_month(*_parts(start or self.birth))[0]
+        while True:
+            try:
+                begin, finish = solar_terms.term_time(year, 2), solar_terms.term_time(year + 1, 2)
+            except ValueError:
+                return
+            if end is not None and begin >= end:
+                return
+            yield TimelinePillar('流年', ganzhi.year_index(year), begin, finish, self)
+            year += 1
+
+    def months(self, start=None, end=None):
+        """与 [start, end) 有交集的流月（以节为界），start 默认为出生时刻"""
+        start, end = _bounds(start, end)
+        table = solar_terms.load_table()
+        i = solar_terms.adjacent_jie(_minutes(start or self.birth))[0]
+        stop = None if end is None else _minutes(end)
+        while i + 2 < len(table) and (stop is None or table[i] < stop):
+            solar_year, solar_month = solar_terms.jie_month(i)
+            index = ganzhi.month_index(ganzhi.year_index(solar_year), solar_month)
+            yield TimelinePillar('流月', index, solar_terms.from_minutes(table[i]),
+                                 solar_terms.from_minutes(table[i + 2]), self)
+            i += 2
+
+    def days(self, start=None, end=None):
+        """[start, end) 内的流日（以公历日期为界）；end 为 None 时无限延续"""
+        start, end = _bounds(start, end)
+        day = datetime.combine((start or self.birth).date(), datetime.min.time())
+        one_day = timedelta(days=1)
+        ordinal = day.toordinal()
+        while end is None or day < end:
+            following = day + one_day
+            yield TimelinePillar('流日', ganzhi.day_index(ordinal), day, following, self)
+            day = following
+            ordinal += 1
+
+    def major_fortune(self, steps: int = MAJOR_FORTUNE_STEPS) -> list:
+        """前 steps 步大运的精简列表（不逐步换算时刻），供排盘结果、界面概览与 AI 提示词使用"""
+        # 岁数以 0.1 岁为单位取整一次，各步只做整数加法
+        tenths = round((self.luck_start - self.birth) / _TENTH_YEAR)
+        year = self.luck_start.year
+        natal = self.chart.pillars
+        r0, r1, r2, r3 = [_relation_row(position, value) for position, value in enumerate(natal)]
+        step = 1 if self.forward else -1
+        indices = [(natal[1] + step * n) % 60 for n in range(1, steps + 1)]
+        return [{
+            'ganzhi': ganzhi.GANZHI[i],
+            'start_age': (tenths + 100 * n) / 10,
+            'end_age': (tenths + 100 * n + 100) / 10,
+            'start_year': year + LUCK_YEARS * n,
+            'interactions': [*r0[i], *r1[i], *r2[i], *r3[i]],
+        } for n, i in enumerate(indices)]
+
+
+def interactions(index: int, natal: tuple) -> list:
+    """干支 index 与原局四柱 natal 的关系说明列表"""
+    return [line for position, value in enumerate(natal)
+            for line in _relation_row(position, value)[index]]
+
+
+@lru_cache(maxsize=None)
+def _relation_row(position: int, natal: int) -> tuple:
+    """原局第 position 柱为 natal 时，六十甲子各自与它的关系说明
+
+    每项为只含一条说明的元组，无关系时为空元组，便于逐柱直接展开拼接。
+    """
+    row = []
+    for index in range(60):
+        names = ['伏吟'] if natal == index else []
+        flags = PILLAR_FLAGS[index][natal]
+        names += [label for flag, label in RELATION_NAMES.items() if flags & flag]
+        row.append((f"{PILLAR_NAMES[position]}{ganzhi.GANZHI[natal]} {' '.join(names)}",)
+                   if names else ())
+    return tuple(row)
+
+
+def _as_datetime(value) -> datetime:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    raise TypeError(f"需要 date 或 datetime，实际为 {type(value).__name__}")
+
+
+def _bounds(start, end) -> tuple:
+    return _as_datetime(start), _as_datetime(end)
+
+
+def _parts(when: datetime) -> tuple:
+    return when.year, when.month, when.day, when.hour, when.minute
+
+
+def _minutes(when: datetime) -> int:
+    return solar_terms.to_minutes(*_parts(when))
+
+
+def _add_years(when: datetime, years: int) -> datetime:
+    try:
+        return when.replace(year=when.year + years)
+    except ValueError:      # 2月29日
+        return when.replace(year=when.year + years, day=28)
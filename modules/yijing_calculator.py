@@ -1,91 +1,336 @@
-"""易經卦象計算模組 - 結合六爻與梅花易數"""
+"""易經卦象計算模組 - 結合六爻與梅花易數
+
+卦以6位整數編碼：第i位（0為初爻）為1表示陽爻，低3位為下卦、高3位為上卦。
+六十四卦資料預先展開為以編碼為下標的表，之卦、互卦、綜卦、錯卦皆以位運算求得。
+"""
 import random
 from datetime import datetime
 
-# 六十四卦卦名與卦象
+from . import metrics
+
+# 八卦以3位編碼（第0位為下爻）：(卦名, 符號, 象, 五行, 先天數)
+TRIGRAMS = (
+    ('坤', '☷', '地', '土', 8),
+    ('震', '☳', '雷', '木', 4),
+    ('坎', '☵', '水', '水', 6),
+    ('兌', '☱', '澤', '金', 2),
+    ('艮', '☶', '山', '土', 7),
+    ('離', '☲', '火', '火', 3),
+    ('巽', '☴', '風', '木', 5),
+    ('乾', '☰', '天', '金', 1),
+)
+# 梅花易數先天數 1-8 -> 八卦編碼
+_XIANTIAN_TRIGRAM = {t[4]: code for code, t in enumerate(TRIGRAMS)}
+
+# 文王卦序：(卦名, 上卦, 下卦, 卦義)
+_KING_WEN = (
+    ('乾為天', 7, 7, '剛健'), ('坤為地', 0, 0, '柔順'), ('水雷屯', 2, 1, '艱難'),
+    ('山水蒙', 4, 2, '蒙昧'), ('水天需', 2, 7, '等待'), ('天水訟', 7, 2, '爭訟'),
+    ('地水師', 0, 2, '統眾'), ('水地比', 2, 0, '親附'), ('風天小畜', 6, 7, '蓄養'),
+    ('天澤履', 7, 3, '謹行'), ('地天泰', 0, 7, '通泰'), ('天地否', 7, 0, '閉塞'),
+    ('天火同人', 7, 5, '和同'), ('火天大有', 5, 7, '豐有'), ('地山謙', 0, 4, '謙遜'),
+    ('雷地豫', 1, 0, '安樂'), ('澤雷隨', 3, 1, '隨從'), ('山風蠱', 4, 6, '整治'),
+    ('地澤臨', 0, 3, '監臨'), ('風地觀', 6, 0, '觀察'), ('火雷噬嗑', 5, 1, '決斷'),
+    ('山火賁', 4, 5, '文飾'), ('山地剝', 4, 0, '剝落'), ('地雷復', 0, 1, '回復'),
+    ('天雷無妄', 7, 1, '真實'), ('山天大畜', 4, 7, '積蓄'), ('山雷頤', 4, 1, '頤養'),
+    ('澤風大過', 3, 6, '過甚'), ('坎為水', 2, 2, '險陷'), ('離為火', 5, 5, '附麗'),
+    ('澤山咸', 3, 4, '感應'), ('雷風恆', 1, 6, '恆久'), ('天山遯', 7, 4, '退避'),
+    ('雷天大壯', 1, 7, '強盛'), ('火地晉', 5, 0, '晉升'), ('地火明夷', 0, 5, '晦藏'),
+    ('風火家人', 6, 5, '齊家'), ('火澤睽', 5, 3, '乖離'), ('水山蹇', 2, 4, '險阻'),
+    ('雷水解', 1, 2, '解脫'), ('山澤損', 4, 3, '減損'), ('風雷益', 6, 1, '增益'),
+    ('澤天夬', 3, 7, '決去'), ('天風姤', 7, 6, '相遇'), ('澤地萃', 3, 0, '聚集'),
+    ('地風升', 0, 6, '上升'), ('澤水困', 3, 2, '困窮'), ('水風井', 2, 6, '養民'),
+    ('澤火革', 3, 5, '變革'), ('火風鼎', 5, 6, '鼎新'), ('震為雷', 1, 1, '震動'),
+    ('艮為山', 4, 4, '止息'), ('風山漸', 6, 4, '漸進'), ('雷澤歸妹', 1, 3, '歸嫁'),
+    ('雷火豐', 1, 5, '豐盛'), ('火山旅', 5, 4, '行旅'), ('巽為風', 6, 6, '順入'),
+    ('兌為澤', 3, 3, '喜悅'), ('風水渙', 6, 2, '離散'), ('水澤節', 2, 3, '節制'),
+    ('風澤中孚', 6, 3, '誠信'), ('雷山小過', 1, 4, '小過'), ('水火既濟', 2, 5, '成功'),
+    ('火水未濟', 5, 2, '未完'),
+)
+
+
+def _hexagram_entry(number, name, upper, lower, nature):
+    upper_element, lower_element = TRIGRAMS[upper][3], TRIGRAMS[lower][3]
+    return {
+        'number': number,
+        'code': upper << 3 | lower,
+        'name': name,
+        'symbol': TRIGRAMS[upper][1] + TRIGRAMS[lower][1],
+        'upper': TRIGRAMS[upper][0],
+        'lower': TRIGRAMS[lower][0],
+        'element': upper_element if upper_element == lower_element
+        else upper_element + lower_element,
+        'nature': nature,
+    }
+
+
+# 六十四卦卦名與卦象，以文王卦序為鍵
 HEXAGRAMS = {
-    1: {'name': '乾為天', 'symbol': '☰☰', 'element': '金', 'nature': '剛健'},
-    2: {'name': '坤為地', 'symbol': '☷☷', 'element': '土', 'nature': '柔順'},
-    3: {'name': '水雷屯', 'symbol': '☵☳', 'element': '水木', 'nature': '艱難'},
-    4: {'name': '山水蒙', 'symbol': '☶☵', 'element': '土水', 'nature': '蒙昧'},
-    11: {'name': '地天泰', 'symbol': '☷☰', 'element': '土金', 'nature': '通泰'},
-    12: {'name': '天地否', 'symbol': '☰☷', 'element': '金土', 'nature': '閉塞'},
-    63: {'name': '水火既濟', 'symbol': '☵☲', 'element': '水火', 'nature': '成功'},
-    64: {'name': '火水未濟', 'symbol': '☲☵', 'element': '火水', 'nature': '未完'}
+    number: _hexagram_entry(number, *row) for number, row in enumerate(_KING_WEN, 1)
 }
 
+# 以下各表均以6位卦碼為下標
+KING_WEN = tuple(sorted(HEXAGRAMS, key=lambda n: HEXAGRAMS[n]['code']))
+HEXAGRAM_TABLE = tuple(HEXAGRAMS[n] for n in KING_WEN)
+NUCLEAR = tuple((code >> 2 & 7) << 3 | (code >> 1 & 7) for code in range(64))   # 互卦
+INVERSE = tuple(int(f'{code:06b}'[::-1], 2) for code in range(64))              # 綜卦
+
+_UNKNOWN_HEXAGRAM = {'name': '未知卦', 'symbol': '??', 'element': '未知', 'nature': '待解'}
+
+
+def lines_to_code(lines):
+    """六爻數值（6老陰 7少陽 8少陰 9老陽，自初爻起）轉為 (卦碼, 動爻掩碼)"""
+    code = moving = 0
+    for i, value in enumerate(lines):
+        code |= (value & 1) << i
+        moving |= (value in (6, 9)) << i
+    return code, moving
+
+
+def code_to_lines(code: int, moving: int = 0):
+    """lines_to_code() 的逆運算"""
+    return tuple((9 if code >> i & 1 else 6) if moving >> i & 1 else (7 if code >> i & 1 else 8)
+                 for i in range(6))
+
+
+def code_to_number(code: int) -> int:
+    """卦碼轉文王卦序"""
+    return KING_WEN[code & 63]
+
+
+def number_to_code(number: int) -> int:
+    """文王卦序轉卦碼"""
+    return HEXAGRAMS[number]['code']
+
+
+# 一次擲三枚硬幣以3位隨機數表示，正面數即1的個數
+_HEADS = (0, 1, 1, 2, 1, 2, 2, 3)
+
+
+def session_generators(count: int, seed=None):
+    """由同一種子派生 count 個互相獨立的 NumPy Generator（每個會話一個）"""
+    import numpy as np
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(count)]
+
+
 class YijingCalculator:
-    def __init__(self):
+    def __init__(self, seed=None):
+        """初始化計算器
+
+        Args:
+            seed: 隨機種子；每個實例擁有獨立的隨機狀態，不共用全域 random
+        """
         self.hexagram_data = HEXAGRAMS
-    
-    def cast_hexagram(self, method='coins'):
-        """起卦 - 支援硬幣法與時間法"""
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._generator = None
+
+    def cast_hexagram(self, method='coins', question=None):
+        """起卦 - 支援硬幣法、時間法與隨機法，皆返回 HexagramReading"""
         if method == 'coins':
-            return self._coin_method()
+            return self._coin_method(question)
         elif method == 'time':
-            return self._time_method()
+            return self._time_method(question)
         else:
-            return self._random_method()
-    
-    def _coin_method(self):
+            return self._random_method(question)
+
+    def _coin_method(self, question=None):
         """三枚硬幣法起卦（模擬）"""
-        lines = []
-        for i in range(6):
-            coins = [random.choice([2, 3]) for _ in range(3)]  # 2=背, 3=正
-            total = sum(coins)
-            if total == 6:  # 老陰
-                lines.append({'value': 6, 'type': '老陰', 'changing': True})
-            elif total == 7:  # 少陽
-                lines.append({'value': 7, 'type': '少陽', 'changing': False})
-            elif total == 8:  # 少陰
-                lines.append({'value': 8, 'type': '少陰', 'changing': False})
-            elif total == 9:  # 老陽
-                lines.append({'value': 9, 'type': '老陽', 'changing': True})
-        return lines
-    
-    def _time_method(self):
-        """梅花易數時間起卦法"""
-        now = datetime.now()
-        upper = (now.year + now.month + now.day) % 8
-        lower = (now.year + now.month + now.day + now.hour) % 8
-        changing_line = (now.year + now.month + now.day + now.hour + now.minute) % 6
-        
-        return {
-            'upper_trigram': upper,
-            'lower_trigram': lower,
-            'changing_line': changing_line,
-            'method': 'time'
-        }
-    
-    def _random_method(self):
-        """隨機起卦"""
-        hexagram_num = random.randint(1, 64)
-        return hexagram_num
-    
+        return HexagramReading(self._toss_lines(), question, method='coins')
+
+    def _toss_lines(self):
+        """擲六次硬幣，返回六爻數值（6老陰 7少陽 8少陰 9老陽）"""
+        # 2=背, 3=正
+        return tuple(sum(self._random.choice([2, 3]) for _ in range(3)) for _ in range(6))
+
+    def _time_method(self, question=None, now=None):
+        """梅花易數時間起卦法
+
+        年月日之和除8取餘得上卦，加時辰得下卦，再加分鐘除6取餘得動爻
+        （餘數為0時分別取8與6）。
+        """
+        now = now or datetime.now()
+        base = now.year + now.month + now.day
+        upper = _XIANTIAN_TRIGRAM[(base - 1) % 8 + 1]
+        lower = _XIANTIAN_TRIGRAM[(base + now.hour - 1) % 8 + 1]
+        changing_line = (base + now.hour + now.minute - 1) % 6
+        lines = code_to_lines(upper << 3 | lower, 1 << changing_line)
+        return HexagramReading(lines, question, now, method='time')
+
+    def _random_method(self, question=None):
+        """隨機起卦（無動爻）"""
+        return HexagramReading(code_to_lines(self._random.randrange(64)), question, method='random')
+
+    def cast_many(self, n: int, seed=None, rng=None, as_frame: bool = False):
+        """批量硬幣法起卦（向量化）
+
+        N次起卦的全部硬幣一次抽出：每爻取一個0-7的隨機數，其二進位中1的個數
+        即三枚硬幣的正面數，爻值為6加正面數。
+
+        Args:
+            n: 起卦次數
+            seed: 隨機種子，指定時結果可重現
+            rng: numpy.random.Generator，例如 session_generators() 派生的會話流；
+                 不可與 seed 同時指定，兩者皆未指定時使用本實例的 Generator
+            as_frame: 為True時返回 pandas.DataFrame
+
+        Returns:
+            dict: 列名 -> 長度為n的int8陣列：line1-line6（初爻至上爻的爻值）、
+                  code（卦碼）、moving（動爻掩碼）、number（文王卦序）、
+                  changed_number（之卦卦序）
+
+        Raises:
+            ValueError: 同時指定 seed 與 rng
+        """
+        if seed is not None and rng is not None:
+            raise ValueError("seed 與 rng 只能指定其一")
+        import numpy as np
+        if rng is None:
+            rng = np.random.default_rng(seed) if seed is not None else self.generator()
+        tosses = rng.integers(0, 8, size=(n, 6), dtype=np.uint8)
+        lines = np.array(_HEADS, dtype=np.int8)[tosses] + 6
+
+        weights = np.int8(1) << np.arange(6, dtype=np.int8)
+        code = ((lines & 1) * weights).sum(axis=1, dtype=np.int8)
+        moving = (((lines == 6) | (lines == 9)) * weights).sum(axis=1, dtype=np.int8)
+        king_wen = np.array(KING_WEN, dtype=np.int8)
+
+        result = {f'line{i + 1}': lines[:, i] for i in range(6)}
+        result.update({
+            'code': code,
+            'moving': moving,
+            'number': king_wen[code],
+            'changed_number': king_wen[code ^ moving],
+        })
+        if as_frame:
+            import pandas as pd
+            return pd.DataFrame(result)
+        return result
+
+    def generator(self):
+        """本實例的 NumPy Generator（首次使用時以 seed 建立）"""
+        if self._generator is None:
+            import numpy as np
+            self._generator = np.random.default_rng(self.seed)
+        return self._generator
+
     def interpret_hexagram(self, hexagram_num):
         """解卦 - 返回卦象基本資訊"""
         if hexagram_num in self.hexagram_data:
             return self.hexagram_data[hexagram_num]
         else:
-            return {'name': '未知卦', 'symbol': '??', 'element': '未知', 'nature': '待解'}
-    
+            return dict(_UNKNOWN_HEXAGRAM)
+
     def get_full_reading(self, question=None):
         """完整卦象解讀"""
-        lines = self.cast_hexagram('coins')
-        hexagram_num = self._lines_to_number(lines)
-        interpretation = self.interpret_hexagram(hexagram_num)
-        
+        t = metrics.timer('yijing')
+        reading = self.cast_reading(question)
+        if t:
+            t.lap('cast')
+        result = reading.to_dict()
+        if t:
+            t.lap('interpret')
+            t.total('get_full_reading')
+        return result
+
+    def cast_reading(self, question=None):
+        """硬幣法起卦，返回緊湊的 HexagramReading 物件"""
+        return self._coin_method(question)
+
+    def _lines_to_number(self, lines):
+        """將六爻（_line_dict 字典列表）轉換為文王卦序"""
+        return code_to_number(lines_to_code([line['value'] for line in lines])[0])
+
+
+_LINE_TYPES = {6: '老陰', 7: '少陽', 8: '少陰', 9: '老陽'}
+
+
+def _line_dict(value):
+    """爻值轉為字典表示"""
+    return {'value': value, 'type': _LINE_TYPES[value], 'changing': value in (6, 9)}
+
+
+def _hexagram_summary(code):
+    entry = HEXAGRAM_TABLE[code]
+    return {'number': entry['number'], 'name': entry['name'], 'symbol': entry['symbol']}
+
+
+class HexagramReading:
+    """緊湊的卦象解讀物件
+
+    只保存六爻數值、卦碼、問題、起卦時間與起卦方法，字典在 to_dict() 時才生成。
+    物件不可變，可在執行緒與會話間安全共享。
+    """
+
+    __slots__ = ('lines', 'code', 'moving', 'question', 'cast_at', 'method')
+
+    def __init__(self, lines, question=None, cast_at=None, method='coins'):
+        lines = tuple(lines)
+        code, moving = lines_to_code(lines)
+        set_slot = object.__setattr__
+        set_slot(self, 'lines', lines)
+        set_slot(self, 'code', code)
+        set_slot(self, 'moving', moving)
+        set_slot(self, 'question', question)
+        set_slot(self, 'cast_at', cast_at or datetime.now())
+        set_slot(self, 'method', method)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('HexagramReading 為唯讀物件')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"HexagramReading({self.number}, lines={''.join(map(str, self.lines))})"
+
+    @property
+    def number(self):
+        """本卦文王卦序"""
+        return KING_WEN[self.code]
+
+    @property
+    def changed_code(self):
+        """之卦卦碼：動爻陰陽互換"""
+        return self.code ^ self.moving
+
+    @property
+    def nuclear_code(self):
+        """互卦卦碼：二三四爻為下卦，三四五爻為上卦"""
+        return NUCLEAR[self.code]
+
+    @property
+    def inverse_code(self):
+        """綜卦卦碼：六爻上下顛倒"""
+        return INVERSE[self.code]
+
+    @property
+    def opposite_code(self):
+        """錯卦卦碼：六爻陰陽全變"""
+        return self.code ^ 63
+
+    @property
+    def changing_lines(self):
+        """動爻位置（1為初爻）"""
+        return [i + 1 for i in range(6) if self.moving >> i & 1]
+
+    def to_dict(self):
+        """生成與 get_full_reading() 相同結構的字典"""
+        interpretation = dict(HEXAGRAM_TABLE[self.code])
         return {
-            'question': question,
-            'hexagram_number': hexagram_num,
+            'question': self.question,
+            'method': self.method,
+            'hexagram_number': self.number,
             'hexagram_name': interpretation['name'],
-            'lines': lines,
+            'lines': [_line_dict(value) for value in self.lines],
+            'changing_lines': self.changing_lines,
             'interpretation': interpretation,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'changed_hexagram': _hexagram_summary(self.changed_code) if self.moving else None,
+            'nuclear_hexagram': _hexagram_summary(self.nuclear_code),
+            'inverse_hexagram': _hexagram_summary(self.inverse_code),
+            'opposite_hexagram': _hexagram_summary(self.opposite_code),
+            'timestamp': self.cast_at.strftime('%Y-%m-%d %H:%M:%S')
         }
-    
-    def _lines_to_number(self, lines):
-        """將六爻轉換為卦號"""
-        # 簡化版：根據陰陽組合計算
-        binary = ''.join(['1' if line['type'] in ['老陽', '少陽'] else '0' for line in lines])
-        return int(binary, 2) % 64 + 1
@@ -1,38 +1,112 @@
 """紫微斗数计算模块 - Ziwei Doushu Calculator Module
 
-基于iztro库的Python封装
-Python wrapper for iztro library (JavaScript)
+纯Python查表排盘，不依赖Node.js
+Table-driven Ziwei Doushu chart engine, no external runtime required
 
-注：由于iztro是JavaScript/TypeScript库，需要通过Node.js或者PyExecJS调用
+排盘步骤：
+    1. 公历转农历（闰月前半月按本月、后半月按下月；23点起按次日）
+    2. 由生月、生时定命宫与身宫，五虎遁定十二宫宫干
+    3. 命宫干支纳音定五行局，五行局与生日定紫微星位置
+    4. 紫微、天府两系主星按固定间隔排布
+    5. 年干定四化、禄存、魁钺，年支定天马、火铃，月时定辅弼昌曲空劫
+    6. 五行局数起大限，阳男阴女顺行，阴男阳女逆行
+星曜位置均查模块加载时生成的表，单盘计算为微秒级。
 """
 
-from datetime import datetime
-from typing import Dict, List, Optional
-import json
-import subprocess
-import os
+from datetime import date, timedelta
+from typing import Dict, List
+
+from . import ganzhi, lunar_calendar, metrics
+from .cache import chart_cache, chart_key
+
+PALACES = (
+    '命宫', '兄弟宫', '夫妻宫', '子女宫', '财帛宫', '疾厄宫',
+    '迁移宫', '奴仆宫', '官禄宫', '田宅宫', '福德宫', '父母宫'
+)
+
+# 十四主星：前6颗为紫微星系，后8颗为天府星系
+MAJOR_STARS = (
+    '紫微', '天机', '太阳', '武曲', '天同', '廉贞',
+    '天府', '太阴', '贪狼', '巨门', '天相', '天梁', '七杀', '破军'
+)
+_ZIWEI_SERIES = (0, -1, -3, -4, -5, -8)          # 相对紫微逆数
+_TIANFU_SERIES = (0, 1, 2, 3, 4, 5, 6, 10)       # 相对天府顺数
+
+MINOR_STARS = (
+    '文昌', '文曲', '左辅', '右弼', '天魁', '天钺', '禄存',
+    '擎羊', '陀罗', '天马', '火星', '铃星', '地空', '地劫'
+)
+
+# 五行局数，按 ganzhi.WUXING 编码（木火土金水）
+BUREAU = (3, 6, 5, 4, 2)
+BUREAU_NAMES = {2: '水二局', 3: '木三局', 4: '金四局', 5: '土五局', 6: '火六局'}
+
+# 四化（禄、权、科、忌），按年干
+FOUR_TRANSFORMATIONS = ('化禄', '化权', '化科', '化忌')
+MUTAGENS = (
+    ('廉贞', '破军', '武曲', '太阳'),   # 甲
+    ('天机', '天梁', '紫微', '太阴'),   # 乙
+    ('天同', '天机', '文昌', '廉贞'),   # 丙
+    ('太阴', '天同', '天机', '巨门'),   # 丁
+    ('贪狼', '太阴', '右弼', '天机'),   # 戊
+    ('武曲', '贪狼', '天梁', '文曲'),   # 己
+    ('太阳', '武曲', '太阴', '天同'),   # 庚
+    ('巨门', '太阳', '文曲', '文昌'),   # 辛
+    ('天梁', '紫微', '左辅', '武曲'),   # 壬
+    ('破军', '巨门', '太阴', '贪狼'),   # 癸
+)
+
+# 以下地支均以子=0编码
+_KUI_YUE = ((1, 7), (0, 8), (11, 9), (11, 9), (1, 7), (0, 8), (1, 7), (6, 2), (3, 5), (3, 5))
+_LUCUN = (2, 3, 5, 6, 5, 6, 8, 9, 11, 0)
+_TIANMA = (2, 11, 8, 5)                               # 按年支 % 4
+_HUO_LING = ((2, 10), (3, 10), (1, 3), (9, 10))       # 按年支 % 4，再顺数生时
+_LIFE_MASTER = ('贪狼', '巨门', '禄存', '文曲', '廉贞', '武曲',
+                '破军', '武曲', '廉贞', '文曲', '禄存', '巨门')
+_BODY_MASTER = ('火星', '天相', '天梁', '天同', '文昌', '天机',
+                '火星', '天相', '天梁', '天同', '文昌', '天机')
+
+
+def _ziwei_position(bureau: int, day: int) -> int:
+    """安紫微：补足x使(生日+x)整除局数，商数自寅起数，x奇数逆退、偶数顺进"""
+    x = -day % bureau
+    pos = 2 + (day + x) // bureau - 1
+    return (pos - x if x % 2 else pos + x) % 12
+
+
+# ZIWEI_POSITION[局数][生日] -> 紫微所在地支；与 ganzhi.MONTH_INDEX 一样下标0不用
+ZIWEI_POSITION = tuple(
+    tuple([None] + [_ziwei_position(n, d) for d in range(1, 31)]) if n in BUREAU_NAMES else None
+    for n in range(7)
+)
+
+# MAJOR_STAR_POSITION[紫微地支] -> 十四主星所在地支
+MAJOR_STAR_POSITION = tuple(
+    tuple((z + k) % 12 for k in _ZIWEI_SERIES) +
+    tuple(((4 - z) + k) % 12 for k in _TIANFU_SERIES)
+    for z in range(12)
+)
+
 
 class ZiweiCalculator:
     """紫微斗数计算器 - Ziwei Doushu Calculator"""
-    
-    def __init__(self, use_nodejs: bool = True):
+
+    def __init__(self, use_nodejs: bool = True, cache=None):
         """初始化计算器
-        
+
         Args:
-            use_nodejs: 是否使用Node.js执行（默认True）
+            use_nodejs: 已不再使用，保留以兼容旧的调用方式
+            cache: ChartCache实例，默认使用模块共享缓存
         """
         self.use_nodejs = use_nodejs
-        self.cached_results = {}
-        self.palaces = [
-            '命宫', '兄弟宫', '夫妻宫', '子女宫', '财帛宫', '疾厄宫',
-            '迁移宫', '奴仆宫', '官禄宫', '田宅宫', '福德宫', '父母宫'
-        ]
-    
+        self.cache = cache if cache is not None else chart_cache
+        self.palaces = list(PALACES)
+
     def calculate(self, birth_year: int, birth_month: int, birth_day: int,
-                  birth_hour: int, gender: str = '男', 
-                  calendar_type: str = 'solar') -> dict:
+                  birth_hour: int, gender: str = '男',
+                  calendar_type: str = 'solar', is_leap_month: bool = False) -> dict:
         """计算紫微斗数命盘
-        
+
         Args:
             birth_year: 出生年份
             birth_month: 出生月份
@@ -40,164 +114,318 @@ class ZiweiCalculator:
             birth_hour: 出生时辰(0-23)
             gender: 性别 ('男' 或 '女')
             calendar_type: 日历类型 ('solar'阳历 或 'lunar'阴历)
-        
+            is_leap_month: 阴历输入时是否为闰月
+
         Returns:
             dict: 包含紫微斗数命盘信息的字典
         """
+        t = metrics.timer('ziwei')
         try:
-            # 构建缓存key
-            cache_key = f"{birth_year}-{birth_month}-{birth_day}-{birth_hour}-{gender}-{calendar_type}"
-            
-            # 检查缓存
-            if cache_key in self.cached_results:
-                return self.cached_results[cache_key]
-            
-            # TODO: 集成iztro库调用
-            # 当前返回模拟数据结构
-            result = {
-                'birth_info': {
-                    'year': birth_year,
-                    'month': birth_month,
-                    'day': birth_day,
-                    'hour': birth_hour,
-                    'gender': gender,
-                    'calendar': calendar_type
-                },
-                'palaces': self._generate_palace_data(),
-                'major_stars': {
-                    '命宫': ['紫微', '天府'],
-                    '兄弟宫': ['天机', '天梁'],
-                    '夫妻宫': ['太阳'],
-                    '子女宫': ['武曲', '天同'],
-                    '财帛宫': ['太阴'],
-                    '疾厄宫': ['贪狼'],
-                    '迁移宫': ['巨门', '天相'],
-                    '奴仆宫': ['天魁'],
-                    '官禄宫': ['天府'],
-                    '田宅宫': ['廉贞'],
-                    '福德宫': ['七杀'],
-                    '父母宫': ['破军']
-                },
-                'four_transformations': {
-                    '化禄': '廉贞',
-                    '化权': '破军',
-                    '化科': '武曲',
-                    '化忌': '太阳'
-                },
-                'life_palace': '寅宫',
-                'body_palace': '午宫',
-                'five_elements': '火六局',
-                'decadal_fortune': []  # 大限
-            }
-            
-            # 缓存结果
-            self.cached_results[cache_key] = result
+            chart = self.calculate_chart(birth_year, birth_month, birth_day,
+                                         birth_hour, gender, calendar_type, is_leap_month)
+            if t:
+                t.lap('chart')
+            result = chart.to_dict()
+            if t:
+                t.lap('palaces')
+                t.total('calculate')
             return result
-            
+
         except Exception as e:
+            metrics.registry.count('errors', 'ziwei', 'calculate')
             return {
                 'error': str(e),
                 'status': 'failed'
             }
-    
-    def _generate_palace_data(self) -> List[Dict]:
-        """生成十二宫数据"""
-        palace_data = []
-        earthly_branches = ['寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥', '子', '丑']
-        
-        for i, palace_name in enumerate(self.palaces):
-            palace_data.append({
-                'name': palace_name,
-                'earthly_branch': earthly_branches[i],
-                'heavenly_stem': self._get_heavenly_stem(i),
-                'major_stars': [],
-                'minor_stars': [],
-                'brightness': ''
-            })
-        
-        return palace_data
-    
-    def _get_heavenly_stem(self, index: int) -> str:
-        """获取天干"""
-        stems = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
-        return stems[index % 10]
-    
+
+    def calculate_chart(self, birth_year: int, birth_month: int, birth_day: int,
+                        birth_hour: int, gender: str = '男',
+                        calendar_type: str = 'solar',
+                        is_leap_month: bool = False) -> 'ZiweiChart':
+        """计算紫微斗数命盘，返回紧凑的 ZiweiChart 对象
+
+        参数同 calculate()。缓存中保存的也是 ZiweiChart，需要字典时调用 to_dict()。
+
+        Raises:
+            ValueError: 输入不合法或超出农历支持范围
+        """
+        is_leap_month = bool(is_leap_month) and calendar_type == 'lunar'
+        # 构建缓存key
+        cache_key = chart_key('ziwei', birth_year, birth_month, birth_day,
+                              birth_hour, gender, calendar_type, is_leap_month)
+
+        t = metrics.timer('ziwei')
+        # 检查缓存
+        cached = self.cache.get(cache_key)
+        if t:
+            t.lap('cache_lookup')
+        if cached is not None:
+            return cached
+
+        chart = ZiweiChart(birth_year, birth_month, birth_day, birth_hour,
+                           gender, calendar_type, is_leap_month)
+        if t:
+            t.lap('lunar_and_stars')    # 农历换算与安星
+
+        # 缓存结果
+        self.cache.put(cache_key, chart)
+        return chart
+
     def get_interpretation(self, ziwei_data: dict) -> str:
         """获取紫微斗数解读
-        
+
         Args:
             ziwei_data: calculate()返回的紫微数据
-        
+
         Returns:
             str: 基础解读文本
         """
         if 'error' in ziwei_data:
             return f"计算出错: {ziwei_data['error']}"
-        
+
         interpretation = []
         interpretation.append(f"命宫: {ziwei_data.get('life_palace', '未知')}")
         interpretation.append(f"身宫: {ziwei_data.get('body_palace', '未知')}")
         interpretation.append(f"五行局: {ziwei_data.get('five_elements', '未知')}")
-        
+
         major_stars = ziwei_data.get('major_stars', {}).get('命宫', [])
         if major_stars:
             interpretation.append(f"命宫主星: {', '.join(major_stars)}")
-        
+
         four_trans = ziwei_data.get('four_transformations', {})
         if four_trans:
             trans_text = ', '.join([f"{k}:{v}" for k, v in four_trans.items()])
             interpretation.append(f"四化: {trans_text}")
-        
+
         return '\n'.join(interpretation)
-    
+
     def format_palaces(self, ziwei_data: dict) -> str:
         """格式化十二宫输出
-        
+
         Args:
             ziwei_data: calculate()返回的紫微数据
-        
+
         Returns:
             str: 格式化的十二宫文本
         """
         if 'error' in ziwei_data:
             return f"错误: {ziwei_data['error']}"
-        
+
         palace_texts = []
         major_stars = ziwei_data.get('major_stars', {})
-        
+
         for palace_name in self.palaces:
             stars = major_stars.get(palace_name, [])
             star_text = ', '.join(stars) if stars else '无主星'
             palace_texts.append(f"{palace_name}: {star_text}")
-        
+
         return '\n'.join(palace_texts)
-    
+
     def get_palace_analysis(self, ziwei_data: dict, palace_name: str) -> dict:
         """获取特定宫位的详细分析
-        
+
         Args:
             ziwei_data: 紫微数据
             palace_name: 宫位名称
-        
+
         Returns:
             dict: 宫位分析数据
         """
         if palace_name not in self.palaces:
             return {'error': f'无效的宫位名称: {palace_name}'}
-        
+
         palaces = ziwei_data.get('palaces', [])
         palace_index = self.palaces.index(palace_name)
-        
+
         if palace_index < len(palaces):
             return palaces[palace_index]
-        
+
         return {'error': '未找到宫位数据'}
 
 
-def quick_calculate(year: int, month: int, day: int, hour: int, 
+def _to_lunar(year: int, month: int, day: int, hour: int,
+              calendar: str, is_leap: bool) -> tuple:
+    """出生资料统一为农历 (年, 月, 日, 是否闰月)；23点起按次日排盘"""
+    if calendar == 'solar':
+        solar = date(year, month, day)
+    elif calendar == 'lunar':
+        if hour < 23:
+            lunar_calendar.lunar_to_solar(year, month, day, is_leap)   # 校验日期存在
+            return year, month, day, is_leap
+        solar = lunar_calendar.lunar_to_solar(year, month, day, is_leap)
+    else:
+        raise ValueError(f"无效的日历类型: {calendar}")
+    if hour >= 23:
+        solar += timedelta(days=1)
+    return lunar_calendar.solar_to_lunar(solar.year, solar.month, solar.day)
+
+
+class ZiweiChart:
+    """紧凑的紫微斗数命盘对象
+
+    保存出生资料与排盘得到的几个地支序号（子=0），星曜与宫位字典在
+    to_dict() 时查表生成。对象不可变，可在线程与会话间安全共享。
+    """
+
+    __slots__ = ('year', 'month', 'day', 'hour', 'gender', 'calendar', 'is_leap_month',
+                 'lunar', 'year_index', 'life', 'body', 'bureau', 'ziwei')
+
+    def __init__(self, year: int, month: int, day: int, hour: int,
+                 gender: str = '男', calendar: str = 'solar', is_leap_month: bool = False):
+        if gender not in ('男', '女'):
+            raise ValueError(f"无效的性别: {gender}")
+        if not 0 <= hour <= 23:
+            raise ValueError(f"无效的时辰: {hour}")
+        lunar = _to_lunar(year, month, day, hour, calendar, bool(is_leap_month))
+        lunar_year, lunar_month, lunar_day, is_leap = lunar
+        month_no = _month_number(lunar_month, lunar_day, is_leap)
+        hour_branch = (hour + 1) // 2 % 12
+
+        year_idx = ganzhi.year_index(lunar_year)
+        life = (2 + month_no - 1 - hour_branch) % 12
+        body = (2 + month_no - 1 + hour_branch) % 12
+        bureau = BUREAU[ganzhi.NAYIN_ELEMENT[_palace_ganzhi(year_idx % 10, life)]]
+
+        set_slot = object.__setattr__
+        set_slot(self, 'year', year)
+        set_slot(self, 'month', month)
+        set_slot(self, 'day', day)
+        set_slot(self, 'hour', hour)
+        set_slot(self, 'gender', gender)
+        set_slot(self, 'calendar', calendar)
+        set_slot(self, 'is_leap_month', bool(is_leap_month))
+        set_slot(self, 'lunar', lunar)
+        set_slot(self, 'year_index', year_idx)
+        set_slot(self, 'life', life)
+        set_slot(self, 'body', body)
+        set_slot(self, 'bureau', bureau)
+        set_slot(self, 'ziwei', ZIWEI_POSITION[bureau][lunar_day])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ZiweiChart 为只读对象')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return (f"ZiweiChart({self.year}-{self.month}-{self.day} {self.hour}时, "
+                f"{self.gender}, {self.calendar})")
+
+    @property
+    def hour_branch(self) -> int:
+        return (self.hour + 1) // 2 % 12
+
+    @property
+    def month_number(self) -> int:
+        """排盘所用农历月（已处理闰月）"""
+        return _month_number(*self.lunar[1:])
+
+    def palace_branch(self, palace: int) -> int:
+        """PALACES 中第 palace 宫所在地支"""
+        return (self.life - palace) % 12
+
+    def star_positions(self) -> Dict[str, int]:
+        """全部星曜所在地支（子=0）"""
+        stem, branch = self.year_index % 10, self.year_index % 12
+        h, m = self.hour_branch, self.month_number
+        positions = dict(zip(MAJOR_STARS, MAJOR_STAR_POSITION[self.ziwei]))
+        kui, yue = _KUI_YUE[stem]
+        lucun = _LUCUN[stem]
+        huo, ling = _HUO_LING[branch % 4]
+        positions.update(zip(MINOR_STARS, (
+            (10 - h) % 12, (4 + h) % 12, (4 + m - 1) % 12, (10 - m + 1) % 12,
+            kui, yue, lucun, (lucun + 1) % 12, (lucun - 1) % 12,
+            _TIANMA[branch % 4], (huo + h) % 12, (ling + h) % 12,
+            (11 - h) % 12, (11 + h) % 12,
+        )))
+        return positions
+
+    def decadal_fortune(self) -> List[Dict]:
+        """大限：自命宫起，五行局数为起运岁数，每宫十年"""
+        yang = self.year_index % 2 == 0
+        step = 1 if yang == (self.gender == '男') else -1
+        stem = self.year_index % 10
+        fortunes = []
+        for i in range(12):
+            branch = (self.life + step * i) % 12
+            start = self.bureau + 10 * i
+            fortunes.append({
+                'start_age': start,
+                'end_age': start + 9,
+                'palace': PALACES[(self.life - branch) % 12],
+                'heavenly_stem': ganzhi.TIANGAN[_palace_ganzhi(stem, branch) % 10],
+                'earthly_branch': ganzhi.DIZHI[branch],
+            })
+        return fortunes
+
+    def to_dict(self) -> dict:
+        """生成与 calculate() 相同结构的字典"""
+        lunar_year, lunar_month, lunar_day, is_leap = self.lunar
+        stem = self.year_index % 10
+
+        by_branch = [([], []) for _ in range(12)]
+        for star, branch in self.star_positions().items():
+            by_branch[branch][star in MINOR_STARS].append(star)
+
+        palaces = []
+        major_stars = {}
+        for i, name in enumerate(PALACES):
+            branch = self.palace_branch(i)
+            major, minor = by_branch[branch]
+            major_stars[name] = major
+            palaces.append({
+                'name': name,
+                'earthly_branch': ganzhi.DIZHI[branch],
+                'heavenly_stem': ganzhi.TIANGAN[_palace_ganzhi(stem, branch) % 10],
+                'major_stars': major,
+                'minor_stars': minor,
+                'brightness': ''
+            })
+
+        return {
+            'birth_info': {
+                'year': self.year,
+                'month': self.month,
+                'day': self.day,
+                'hour': self.hour,
+                'gender': self.gender,
+                'calendar': self.calendar,
+                'lunar_year': lunar_year,
+                'lunar_month': lunar_month,
+                'lunar_day': lunar_day,
+                'is_leap_month': is_leap,
+                'year_ganzhi': ganzhi.GANZHI[self.year_index]
+            },
+            'palaces': palaces,
+            'major_stars': major_stars,
+            'four_transformations': dict(zip(FOUR_TRANSFORMATIONS, MUTAGENS[stem])),
+            'life_palace': f"{ganzhi.DIZHI[self.life]}宫",
+            'body_palace': f"{ganzhi.DIZHI[self.body]}宫",
+            'five_elements': BUREAU_NAMES[self.bureau],
+            'life_master': _LIFE_MASTER[self.life],
+            'body_master': _BODY_MASTER[self.year_index % 12],
+            'decadal_fortune': self.decadal_fortune()  # 大限
+        }
+
+
+def _month_number(lunar_month: int, lunar_day: int, is_leap: bool) -> int:
+    """闰月前半月按本月，十六日起按下月"""
+    return lunar_month % 12 + 1 if is_leap and lunar_day > 15 else lunar_month
+
+
+def _palace_ganzhi(year_stem: int, branch: int) -> int:
+    """五虎遁：由年干求某地支宫位的干支序号"""
+    stem = (2 * year_stem + 2 + (branch - 2) % 12) % 10
+    return ganzhi.sexagenary(stem, branch)
+
+
+def quick_calculate(year: int, month: int, day: int, hour: int,
                    gender: str = '男', calendar: str = 'solar') -> dict:
     """快速计算紫微斗数的便捷函数
-    
+
     Args:
         year: 出生年份
         month: 出生月份
@@ -205,7 +433,7 @@ def quick_calculate(year: int, month: int, day: int, hour: int,
         hour: 出生时辰(0-23)
         gender: 性别
         calendar: 日历类型
-    
+
     Returns:
         dict: 紫微数据
     """
@@ -0,0 +1,6 @@
+"""pytest 公共设置：以仓库根目录为导入路径，与 benchmarks/ 脚本一致"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,75 @@
+"""命盤 API：輸入錯誤回 4xx，關閉時連線任務以取消結束"""
+
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from modules.api_server import APIServer
+
+
+@pytest.fixture(scope='module')
+def server():
+    with APIServer(port=0, workers=1) as server:
+        yield server
+
+
+def _request(server, path, payload=None):
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(server.url + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_chart_ok(server):
+    status, body = _request(server, '/bazi', {'year': 1990, 'month': 5, 'day': 15, 'hour': 14})
+    assert status == 200
+    assert body['day_pillar'] == {'stem': '庚', 'branch': '辰'}
+
+
+@pytest.mark.parametrize('payload', [
+    {'year': 1990, 'month': 5, 'day': 15, 'hour': 25},
+    {'year': 1990, 'month': 5, 'day': 15, 'hour': -1},
+    {'year': 1990, 'month': 2, 'day': 30, 'hour': 3},
+    {'year': 1990, 'month': 5, 'day': 15},
+])
+def test_invalid_birth_is_400(server, payload):
+    status, body = _request(server, '/bazi', payload)
+    assert status == 400
+    assert body['error']
+
+
+def test_batch_reports_bad_items(server):
+    status, body = _request(server, '/bazi', [
+        {'year': 1990, 'month': 5, 'day': 15, 'hour': 14, 'id': 'a'},
+        {'year': 1990, 'month': 5, 'day': 15, 'hour': 25, 'id': 'b'},
+    ])
+    assert status == 200
+    assert 'error' not in body[0] and body[0]['id'] == 'a'
+    assert body[1]['error'] and body[1]['id'] == 'b'
+
+
+def test_health_not_counted_in_flight(server):
+    status, body = _request(server, '/health')
+    assert status == 200
+    assert body['in_flight'] == 0
+
+
+def test_stop_cancels_idle_connections():
+    server = APIServer(port=0, workers=1)
+    server.start()
+    with socket.create_connection((server.host, server.port)):
+        deadline = time.monotonic() + 5
+        while not server._connections and time.monotonic() < deadline:
+            time.sleep(0.01)
+        tasks = list(server._connections)
+        assert tasks
+        server.stop()
+    assert all(task.cancelled() for task in tasks)
@@ -0,0 +1,42 @@
+"""管理員模式只由部署方開啟，網址參數無法切換"""
+
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from modules import metrics
+
+APP = os.path.join(os.path.dirname(__file__), '..', 'app.py')
+
+
+def _admin_buttons(at):
+    return [button.label for button in at.sidebar.button]
+
+
+def test_query_param_does_not_enable_admin(monkeypatch):
+    monkeypatch.delenv('DIVINATION_ADMIN', raising=False)
+    monkeypatch.setattr(metrics.registry, 'enabled', False)
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.query_params['admin'] = '1'
+    at.run()
+    assert not at.exception
+    assert '重設指標' not in _admin_buttons(at)
+    assert not metrics.registry.enabled
+
+
+def test_environment_enables_admin(monkeypatch):
+    monkeypatch.setenv('DIVINATION_ADMIN', '1')
+    monkeypatch.setattr(metrics.registry, 'enabled', False)
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    assert not at.exception
+    assert '重設指標' in _admin_buttons(at)
+
+
+def test_secret_enables_admin(monkeypatch):
+    monkeypatch.delenv('DIVINATION_ADMIN', raising=False)
+    monkeypatch.setattr(metrics.registry, 'enabled', False)
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.secrets['divination_admin'] = True
+    at.run()
+    assert not at.exception
+    assert '重設指標' in _admin_buttons(at)
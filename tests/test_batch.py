@@ -0,0 +1,70 @@
+"""批量排盘：坏行只在该行输出 error 字段，不中断整批"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from modules import batch
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+CSV = """id,year,month,day,hour,minute
+1,1990,5,15,14,0
+2,1990,5,15,25,0
+3,1990,2,30,3,0
+4,2000,1,1,-1,0
+5,1991,6,6,6,61
+6,1991,6,6,6,30
+"""
+BAD_IDS = {2, 3, 4, 5}
+
+
+def _check(results):
+    assert [row['id'] for row in results] == [1, 2, 3, 4, 5, 6]
+    for row in results:
+        if row['id'] in BAD_IDS:
+            assert set(row) == {'id', 'error'}
+        else:
+            assert 'error' not in row
+            assert row['day_pillar']['stem']
+
+
+def test_chart_chunk_isolates_bad_rows():
+    rows = [(1, 1990, 5, 15, 14, 0, '男'), (2, 1990, 5, 15, 25, 0, '男'),
+            (3, 1990, 2, 30, 3, 0, '女'), (4, 2000, 1, 1, -1, 0, '女'),
+            (5, 1991, 6, 6, 6, 61, '男'), (6, 1991, 6, 6, 6, 30, '男')]
+    _check(batch.chart_chunk('bazi', rows))
+
+
+def test_chart_chunk_isolates_bad_ziwei_rows():
+    rows = [(1, 1990, 5, 15, 14, '男', 'solar', False), (2, 1990, 5, 15, 25, '男', 'solar', False),
+            (3, 1990, 2, 30, 3, '女', 'solar', False), (4, 1990, 5, 15, 14, '男', 'julian', False)]
+    results = batch.chart_chunk('ziwei', rows)
+    assert [row['id'] for row in results] == [1, 2, 3, 4]
+    assert 'error' not in results[0]
+    assert all('error' in row for row in results[1:])
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cli_main_writes_every_row(workers, tmp_path):
+    source, target = tmp_path / 'births.csv', tmp_path / 'charts.jsonl'
+    source.write_text(CSV, encoding='utf-8')
+    batch.main([str(source), str(target), '--workers', str(workers),
+                '--chunksize', '2', '--quiet'])
+    _check(_read_jsonl(target))
+
+
+def test_cli_module_exit_status(tmp_path):
+    source, target = tmp_path / 'births.csv', tmp_path / 'charts.jsonl'
+    source.write_text(CSV, encoding='utf-8')
+    subprocess.run([sys.executable, '-m', 'modules.batch', str(source), str(target),
+                    '--workers', '1', '--quiet'], cwd=ROOT, check=True)
+    _check(_read_jsonl(target))
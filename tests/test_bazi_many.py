@@ -0,0 +1,61 @@
+"""批量排盘与逐条排盘结果一致
+
+随机出生资料分两批：整点（有预计算表时走查表路径）与带分钟（走现算路径），
+把 calculate_many() 的整数编码逐行还原后与 calculate_chart().to_dict() 比对
+四柱、五行计数、强弱、喜用、纳音、空亡与神煞。
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from modules import ganzhi, shensha
+from modules.bazi_calculator import DIZHI, TIANGAN, BaziCalculator, bazi
+from modules.cache import ChartCache
+
+FIELDS = ('year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar', 'five_elements',
+          'strength', 'favorable_elements', 'nayin', 'void', 'natal_stars')
+
+
+def _births(n, whole_hours, seed):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        year, month = rng.randint(1900, 2100), rng.randint(1, 12)
+        rows.append((year, month, rng.randint(1, 28), rng.randrange(24),
+                     0 if whole_hours else rng.randrange(60), rng.choice('男女')))
+    return rows
+
+
+def _decode(batch, i) -> dict:
+    """calculate_many() 第 i 行还原为 to_dict() 的对应字段"""
+    row = {}
+    for name in ('year', 'month', 'day', 'hour'):
+        row[f'{name}_pillar'] = {'stem': TIANGAN[batch[f'{name}_stem'][i]],
+                                 'branch': DIZHI[batch[f'{name}_branch'][i]]}
+    row['five_elements'] = {element: int(batch[column][i]) for element, column in
+                            zip(BaziCalculator.WUXING_ORDER, BaziCalculator.WUXING_COLUMNS)}
+    row['strength'] = BaziCalculator.STRENGTH_LEVELS[batch['strength'][i]]
+    row['favorable_elements'] = [BaziCalculator.WUXING_ORDER[batch['favorable_1'][i]],
+                                 BaziCalculator.WUXING_ORDER[batch['favorable_2'][i]]]
+    row['nayin'] = ganzhi.NAYIN_NAMES[batch['nayin'][i]]
+    row['void'] = [DIZHI[batch['void_1'][i]], DIZHI[batch['void_2'][i]]]
+    row['natal_stars'] = shensha.star_names(int(batch['natal_stars'][i]))
+    return row
+
+
+@pytest.mark.parametrize('whole_hours, seed', [(True, 1), (False, 2)],
+                         ids=['table-path', 'compute-path'])
+@pytest.mark.parametrize('calculator', [bazi, BaziCalculator(table=None,
+                                                             cache=ChartCache(maxsize=1))],
+                         ids=['default', 'no-table'])
+def test_batch_matches_scalar(calculator, whole_hours, seed):
+    births = _births(2000, whole_hours, seed)
+    years, months, days, hours, minutes, genders = (np.array(c) for c in zip(*births))
+    batch = calculator.calculate_many(years, months, days, hours, genders, minutes)
+    reference = BaziCalculator(table=None, cache=ChartCache(maxsize=1))
+    for i, (year, month, day, hour, minute, gender) in enumerate(births):
+        expected = reference.calculate_chart(year, month, day, hour, gender, minute).to_dict()
+        assert _decode(batch, i) == {field: expected[field] for field in FIELDS}, births[i]
+    assert list(batch['gender']) == [gender == '女' for *_, gender in births]
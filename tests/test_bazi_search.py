@@ -0,0 +1,101 @@
+"""八字反查与排盘互为逆运算
+
+- 正向排盘的出生时间必在反查结果中，反查出的每个时间正向排盘都得到原四柱
+- 子时 23 点与 0 点、交节前后一小时、节气表首尾的节气月单独覆盖
+- 月干不合五虎遁、时干不合五鼠遁的四柱没有任何出生时间
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules import ganzhi, solar_terms
+from modules.bazi_calculator import BaziCalculator
+from modules.bazi_search import find_birth_times, find_birth_times_array
+from modules.cache import ChartCache
+
+
+@pytest.fixture(scope='module')
+def calculator():
+    return BaziCalculator(table=None, cache=ChartCache(maxsize=1))
+
+
+def _pillars(calculator, when: datetime) -> tuple:
+    return calculator.calculate_chart(when.year, when.month, when.day, when.hour).pillars
+
+
+def _assert_round_trip(calculator, birth: datetime):
+    pillars = _pillars(calculator, birth)
+    found = list(find_birth_times(*pillars))
+    assert birth in found
+    assert found == sorted(found)
+    assert all(_pillars(calculator, when) == pillars for when in found)
+
+
+def _random_births(n, seed=7):
+    rng = random.Random(seed)
+    first, last = solar_terms.term_time(1899, 0), solar_terms.term_time(2101, 23)
+    hours = int((last - first) / timedelta(hours=1))
+    for _ in range(n):
+        yield (first + timedelta(hours=rng.randrange(1, hours))).replace(minute=0)
+
+
+@pytest.mark.parametrize('birth', list(_random_births(300)), ids=str)
+def test_round_trip(calculator, birth):
+    _assert_round_trip(calculator, birth)
+
+
+@pytest.mark.parametrize('birth', [datetime(2000, 1, 1, 23), datetime(2000, 1, 2, 0),
+                                   datetime(1984, 2, 29, 23), datetime(2024, 12, 31, 23)],
+                         ids=str)
+def test_zi_hour(calculator, birth):
+    # 23 点与同日 0 点同为子时，日柱不换日，时干按当日五鼠遁
+    _assert_round_trip(calculator, birth)
+    midnight = birth.replace(hour=0)
+    assert _pillars(calculator, birth)[2] == _pillars(calculator, midnight)[2]
+
+
+def _jie_boundaries():
+    rng = random.Random(11)
+    for year in (1900, 1949, 1984, 2000, 2023, 2100):
+        k = 2 * rng.randrange(12)
+        jie = solar_terms.term_time(year, k)
+        before = jie.replace(minute=0) if jie.minute else jie - timedelta(hours=1)
+        yield before, before + timedelta(hours=1)
+
+
+@pytest.mark.parametrize('before, after', list(_jie_boundaries()), ids=str)
+def test_month_boundary(calculator, before, after):
+    assert _pillars(calculator, before)[1] != _pillars(calculator, after)[1]
+    _assert_round_trip(calculator, before)
+    _assert_round_trip(calculator, after)
+
+
+@pytest.mark.parametrize('birth', [
+    datetime(1899, 1, 5, 21),        # 表首小寒之后：前一节气年的丑月
+    datetime(1899, 2, 3, 12),
+    datetime(1899, 2, 4, 12),
+    datetime(2101, 12, 15, 12),      # 表尾大雪之后：最后一个节气月只到表末
+    datetime(2101, 12, 22, 8),
+], ids=str)
+def test_table_edges(calculator, birth):
+    _assert_round_trip(calculator, birth)
+
+
+def test_mismatched_stems_yield_nothing():
+    # 甲年寅月为丙寅，甲寅不合五虎遁；甲日子时为甲子，丙子不合五鼠遁
+    assert list(find_birth_times('甲子', '甲寅', '甲子', '甲子')) == []
+    assert list(find_birth_times('甲子', '丙寅', '甲子', '丙子')) == []
+    assert len(find_birth_times_array('甲子', '甲寅', '甲子', '甲子')) == 0
+
+
+def test_range_bounds(calculator):
+    birth = datetime(1990, 5, 15, 14)
+    pillars = _pillars(calculator, birth)
+    found = list(find_birth_times(*pillars, start=birth, end=birth + timedelta(hours=1)))
+    assert found == [birth]
+    assert list(find_birth_times(*pillars, start=birth + timedelta(hours=1),
+                                 end=datetime(2000, 1, 1))) == []
+    names = [ganzhi.GANZHI[p] for p in pillars]
+    assert list(calculator.find_birth_times(*names)) == list(find_birth_times(*pillars))
@@ -0,0 +1,45 @@
+"""八字输入校验：单条与批量路径拒绝同样的输入"""
+
+import numpy as np
+import pytest
+
+from modules.bazi_calculator import bazi
+
+INVALID = [
+    (1990, 5, 15, 24, 0),
+    (1990, 5, 15, -1, 0),
+    (1990, 5, 15, 12, 60),
+    (1990, 0, 1, 0, 0),
+    (1990, 13, 1, 0, 0),
+    (1990, 4, 31, 0, 0),
+    (1990, 2, 29, 0, 0),
+    (1900, 2, 29, 0, 0),
+    (1800, 6, 1, 0, 0),
+    (2200, 6, 1, 0, 0),
+]
+VALID = [(2000, 2, 29, 23, 59), (1990, 5, 15, 0, 0), (2024, 12, 31, 12, 30)]
+
+
+def _many(year, month, day, hour, minute):
+    return bazi.calculate_many(np.array([year]), np.array([month]), np.array([day]),
+                               np.array([hour]), birth_minute=np.array([minute]))
+
+
+@pytest.mark.parametrize('birth', INVALID)
+def test_invalid_input_rejected_by_both_paths(birth):
+    year, month, day, hour, minute = birth
+    with pytest.raises(ValueError):
+        bazi.calculate_chart(year, month, day, hour, '男', minute)
+    with pytest.raises(ValueError):
+        _many(*birth)
+    assert bazi.calculate(year, month, day, hour, '男', minute)['status'] == 'failed'
+
+
+@pytest.mark.parametrize('birth', VALID)
+def test_valid_input_matches_batch(birth):
+    year, month, day, hour, minute = birth
+    chart = bazi.calculate_chart(year, month, day, hour, '男', minute)
+    batch = _many(*birth)
+    for name, idx in zip(('year', 'month', 'day', 'hour'), chart.pillars):
+        assert batch[f'{name}_stem'][0] == idx % 10
+        assert batch[f'{name}_branch'][0] == idx % 12
@@ -0,0 +1,72 @@
+"""八字预计算表：查表结果与现算一致，格式不符或节气表更新后的旧表被拒绝"""
+
+import os
+import random
+import warnings
+from datetime import date
+
+import pytest
+
+from modules import chart_table, solar_terms
+from modules.bazi_calculator import BaziCalculator
+from modules.cache import ChartCache
+from modules.chart_table import HEADER, HOURS_PER_DAY, RECORD, TABLE_MAGIC, TABLE_VERSION
+
+
+def _write_table(path, digest=None, magic=TABLE_MAGIC, version=TABLE_VERSION):
+    """写出只含一天（1990-05-15）的小表，四柱以 calculate_chart 现算"""
+    calculator = BaziCalculator(table=None, cache=ChartCache(maxsize=1))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(magic, version, HOURS_PER_DAY,
+                            date(1990, 5, 15).toordinal(), 1,
+                            solar_terms.table_digest() if digest is None else digest))
+        for hour in range(HOURS_PER_DAY):
+            f.write(RECORD.pack(*calculator.calculate_chart(1990, 5, 15, hour).pillars))
+    return str(path)
+
+
+def test_lookup_matches_computed(tmp_path):
+    table = chart_table.ChartTable(_write_table(tmp_path / 'table.bin'))
+    calculator = BaziCalculator(table=None, cache=ChartCache(maxsize=1))
+    try:
+        for hour in range(HOURS_PER_DAY):
+            assert table.lookup(1990, 5, 15, hour) == \
+                calculator.calculate_chart(1990, 5, 15, hour).pillars
+        assert table.lookup(1990, 5, 16, 0) is None
+    finally:
+        table.close()
+
+
+@pytest.mark.parametrize('kwargs', [{'digest': b'\0' * 32}, {'magic': b'XXXX'},
+                                    {'version': TABLE_VERSION - 1}],
+                         ids=['stale-solar-terms', 'magic', 'version'])
+def test_mismatched_header_is_rejected(tmp_path, monkeypatch, kwargs):
+    path = _write_table(tmp_path / 'table.bin', **kwargs)
+    with pytest.raises(ValueError):
+        chart_table.ChartTable(path)
+    monkeypatch.setattr(chart_table, 'DEFAULT_PATH', path)
+    with pytest.warns(RuntimeWarning):
+        assert chart_table.open_default() is None
+
+
+def test_missing_table_is_silent(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_table, 'DEFAULT_PATH', str(tmp_path / 'missing.bin'))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert chart_table.open_default() is None
+
+
+@pytest.mark.skipif(not os.path.exists(chart_table.DEFAULT_PATH),
+                    reason='未生成预计算表（tools/build_chart_table.py）')
+def test_default_table_matches_computed():
+    table = chart_table.open_default()
+    assert table is not None
+    calculator = BaziCalculator(table=None, cache=ChartCache(maxsize=1))
+    rng = random.Random(6)
+    try:
+        for _ in range(2000):
+            birth = (rng.randint(1900, 2100), rng.randint(1, 12), rng.randint(1, 28),
+                     rng.randrange(HOURS_PER_DAY))
+            assert table.lookup(*birth) == calculator.calculate_chart(*birth).pillars
+    finally:
+        table.close()
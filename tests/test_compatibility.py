@@ -0,0 +1,113 @@
+"""合婚查表与排名
+
+- 六十甲子两两的关系位标志按字面书写的合冲刑害口诀逐一核对
+- 单对、一对多分数一致；argpartition 分块取前 k 名与完整排序一致（含同分与 k > n）
+"""
+
+import numpy as np
+import pytest
+
+from modules import compatibility
+from modules.compatibility import (BRANCH_CLASH, BRANCH_COMBINE, BRANCH_HARM, BRANCH_PUNISH,
+                                   BRANCH_TRINE, PILLAR_FLAGS, RELATION_SCORES, STEM_CLASH,
+                                   STEM_COMBINE)
+from modules.ganzhi import DIZHI, GANZHI, TIANGAN
+
+
+def _pairs(*groups) -> set:
+    """口诀中每组内两两成对（不分先后）"""
+    return {frozenset((a, b)) for group in groups for a in group for b in group if a != b}
+
+
+STEM_RULES = {
+    STEM_COMBINE: _pairs('甲己', '乙庚', '丙辛', '丁壬', '戊癸'),
+    STEM_CLASH: _pairs('甲庚', '乙辛', '丙壬', '丁癸'),
+}
+BRANCH_RULES = {
+    BRANCH_COMBINE: _pairs('子丑', '寅亥', '卯戌', '辰酉', '巳申', '午未'),
+    BRANCH_TRINE: _pairs('申子辰', '亥卯未', '寅午戌', '巳酉丑'),
+    BRANCH_CLASH: _pairs('子午', '丑未', '寅申', '卯酉', '辰戌', '巳亥'),
+    BRANCH_PUNISH: _pairs('寅巳', '巳申', '申寅', '丑戌', '戌未', '未丑', '子卯'),
+    BRANCH_HARM: _pairs('子未', '丑午', '寅巳', '卯辰', '申亥', '酉戌'),
+}
+SELF_PUNISH = set('辰午酉亥')
+
+
+def _expected_flags(a: str, b: str) -> int:
+    flags = 0
+    for flag, pairs in STEM_RULES.items():
+        if frozenset((a[0], b[0])) in pairs:
+            flags |= flag
+    for flag, pairs in BRANCH_RULES.items():
+        if frozenset((a[1], b[1])) in pairs:
+            flags |= flag
+    if a[1] == b[1] and a[1] in SELF_PUNISH:
+        flags |= BRANCH_PUNISH
+    return flags
+
+
+def test_pillar_flags_follow_rules():
+    for i, a in enumerate(GANZHI):
+        for j, b in enumerate(GANZHI):
+            assert PILLAR_FLAGS[i][j] == _expected_flags(a, b), (a, b)
+
+
+def test_stem_and_branch_tables_follow_rules():
+    for i, a in enumerate(TIANGAN):
+        for j, b in enumerate(TIANGAN):
+            expected = sum(flag for flag, pairs in STEM_RULES.items()
+                           if frozenset((a, b)) in pairs)
+            assert compatibility.STEM_RELATION[i][j] == expected, (a, b)
+    for i, a in enumerate(DIZHI):
+        for j, b in enumerate(DIZHI):
+            assert compatibility.BRANCH_RELATION[i][j] == \
+                _expected_flags('甲' + a, '甲' + b), (a, b)
+
+
+def test_score_sums_weighted_relations():
+    a, b = (GANZHI.index('甲子'), GANZHI.index('丙寅'), GANZHI.index('甲子'), 0), \
+           (GANZHI.index('己丑'), GANZHI.index('壬申'), GANZHI.index('己丑'), 0)
+    # 年、日柱：甲己五合 + 子丑六合；月柱：丙壬相冲 + 寅申六冲兼相刑；时柱甲子伏吟，无合冲刑害
+    combine = RELATION_SCORES[STEM_COMBINE] + RELATION_SCORES[BRANCH_COMBINE]
+    clash = (RELATION_SCORES[STEM_CLASH] + RELATION_SCORES[BRANCH_CLASH]
+             + RELATION_SCORES[BRANCH_PUNISH])
+    assert compatibility.score(a, b) == combine + clash + 3 * combine
+    assert compatibility.explain(a, b) == ['年柱 甲子-己丑 天干五合 地支六合',
+                                           '月柱 丙寅-壬申 天干相冲 地支六冲 地支相刑',
+                                           '日柱 甲子-己丑 天干五合 地支六合']
+
+
+@pytest.fixture(scope='module')
+def population():
+    rng = np.random.default_rng(23)
+    return rng.integers(0, 60, size=(500, 4))
+
+
+def _full_sort(scores, k):
+    order = sorted(range(len(scores)), key=lambda i: (-scores[i], i))[:k]
+    return order, [scores[i] for i in order]
+
+
+def test_score_many_matches_score(population):
+    chart = tuple(population[0])
+    scores = compatibility.score_many(chart, population)
+    assert list(scores) == [compatibility.score(chart, tuple(row)) for row in population]
+
+
+@pytest.mark.parametrize('k', [0, 1, 10, 499, 500, 800])
+def test_top_k_matches_full_sort(population, k):
+    chart = tuple(population[0])
+    scores = [int(s) for s in compatibility.score_many(chart, population)]
+    assert len(set(scores)) < len(scores)       # 同分必然存在，须按序号小者在前
+    indices, top = compatibility.top_k(chart, population, k)
+    assert (list(indices), list(top)) == _full_sort(scores, k)
+
+
+@pytest.mark.parametrize('k, block_rows', [(5, 3), (500, 7), (900, None)])
+def test_top_k_many_matches_full_sort(population, k, block_rows):
+    charts, candidates = population[:20], population[20:]
+    indices, top = compatibility.top_k_many(charts, candidates, k, block_rows)
+    for row, chart in enumerate(charts):
+        scores = [int(s) for s in compatibility.score_many(tuple(chart), candidates)]
+        expected = _full_sort(scores, k)
+        assert (list(indices[row]), list(top[row])) == expected
@@ -0,0 +1,87 @@
+"""連線池：重用的連線被伺服器關閉時，只重試冪等請求，POST 不重送"""
+
+import asyncio
+
+import pytest
+
+from modules.http_client import AsyncHTTPClient
+
+
+async def _serve(handle_second):
+    """每條連線正常回應第一個請求；第二個請求讀完後由 handle_second 決定如何處理"""
+    received = []
+
+    async def handle(reader, writer):
+        served = 0
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(next(line.split(b':')[1] for line in head.split(b'\r\n')
+                                  if line.lower().startswith(b'content-length')))
+                await reader.readexactly(length)
+                received.append(head.split(b' ')[0].decode())
+                served += 1
+                if served > 1 and await handle_second(writer):
+                    return
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n'
+                             b'Connection: keep-alive\r\n\r\nok')
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    url = f'http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1/chat/completions'
+    return server, url, received
+
+
+async def _close_without_response(writer):
+    # 伺服器已收到並處理請求後連線中斷（例如閒置逾時與請求同時發生）
+    writer.close()
+    return True
+
+
+@pytest.mark.parametrize('method', ['POST', 'GET'])
+def test_dropped_reused_connection(method):
+    async def run():
+        server, url, received = await _serve(_close_without_response)
+        client = AsyncHTTPClient(max_connections=1, timeout=5)
+        try:
+            first = await client.request(method, url, body=b'{}')
+            try:
+                second = await client.request(method, url, body=b'{}')
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                second = e
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+        return first, second, received, client.connections_opened
+
+    first, second, received, opened = asyncio.run(run())
+    assert first.status == 200
+    if method == 'POST':
+        # 已寫出的 POST 不重送：伺服器只收到一次，錯誤交給呼叫端
+        assert isinstance(second, (ConnectionError, asyncio.IncompleteReadError))
+        assert received == ['POST', 'POST'] and opened == 1
+    else:
+        assert second.status == 200 and second.body == b'ok'
+        assert received == ['GET', 'GET', 'GET'] and opened == 2
+
+
+def test_reused_connection_serves_post():
+    async def keep_serving(writer):
+        return False
+
+    async def run():
+        server, url, received = await _serve(keep_serving)
+        async with AsyncHTTPClient(max_connections=1, timeout=5) as client:
+            responses = [await client.post_json(url, {'n': i}) for i in range(3)]
+        server.close()
+        await server.wait_closed()
+        return responses, received, client.connections_opened
+
+    responses, received, opened = asyncio.run(run())
+    assert [r.status for r in responses] == [200] * 3
+    assert received == ['POST'] * 3 and opened == 1
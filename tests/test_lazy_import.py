@@ -0,0 +1,55 @@
+"""`import modules` 不加载 numpy、Streamlit 与 AI 集成，首次访问对应属性时才导入
+
+每个用例在全新的解释器中运行，避免受本进程已导入模块的影响。
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+HEAVY = ('numpy', 'pandas', 'streamlit', 'modules.ai_integration', 'modules.http_client',
+         'modules.bazi_calculator', 'modules.ziwei_calculator', 'modules.yijing_calculator')
+
+_SCRIPT = """
+import json, sys
+import modules
+before = [name for name in {heavy!r} if name in sys.modules]
+{statement}
+print(json.dumps([before, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def _loaded(statement: str) -> tuple:
+    """返回 (import modules 之后, 执行语句之后) 已加载的重模块"""
+    out = subprocess.run([sys.executable, '-c', _SCRIPT.format(heavy=HEAVY, statement=statement)],
+                         env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True,
+                         text=True, check=True)
+    before, after = json.loads(out.stdout)
+    return set(before), set(after)
+
+
+def test_import_modules_loads_nothing_heavy():
+    before, after = _loaded('')
+    assert before == after == set()
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ('modules.bazi_calculator.bazi.calculate(1990, 5, 15, 14)', {'modules.bazi_calculator'}),
+    ('modules.ziwei_calculator.ZiweiCalculator().calculate(1990, 5, 15, 14)',
+     {'modules.ziwei_calculator'}),
+    ('modules.yijing_calculator.YijingCalculator(seed=1).cast_hexagram()',
+     {'modules.yijing_calculator'}),
+    ('modules.ai_integration.AIIntegration()',
+     {'modules.ai_integration', 'modules.http_client'}),
+    ('modules.bazi_calculator.bazi.calculate_many([1990], [5], [15], [14])',
+     {'modules.bazi_calculator', 'numpy'}),
+])
+def test_attribute_access_imports_on_demand(statement, expected):
+    before, after = _loaded(statement)
+    assert before == set()
+    assert after == expected
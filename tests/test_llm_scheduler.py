@@ -0,0 +1,221 @@
+"""LLM 請求排程器：額度、故障轉移、優先級與背壓，AIIntegration 預設經排程器，
+以及 API 伺服器經行程共用排程器故障轉移
+
+供應商以本機模擬 LLM 伺服器（tools/fake_llm_server.py）或記錄呼叫順序的協程扮演。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from fake_llm_server import ANSWER, FakeLLMServer  # noqa: E402
+from modules import llm_scheduler, metrics  # noqa: E402
+from modules.ai_integration import (PROVIDERS, SECTIONS, AIIntegration,  # noqa: E402
+                                    AIProviderError)
+from modules.api_server import APIServer  # noqa: E402
+from modules.llm_scheduler import (BATCH, INTERACTIVE, Backend, LLMScheduler,  # noqa: E402
+                                   SchedulerOverloaded, shared_scheduler)
+from modules.response_cache import ResponseCache  # noqa: E402
+
+
+class RateLimitedServer(FakeLLMServer):
+    """每個請求都回應 429 的模擬供應商"""
+
+    def respond(self, method, path, body):
+        return 429, {'error': {'message': 'rate limit exceeded'}}
+
+
+@pytest.fixture(scope='module')
+def groq():
+    with FakeLLMServer(latency=0.01) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def deepseek():
+    with FakeLLMServer(latency=0.01) as server:
+        yield server
+
+
+@pytest.fixture(scope='module')
+def limited():
+    with RateLimitedServer(latency=0.01) as server:
+        yield server
+
+
+def backend(name, server, **limits):
+    ai = AIIntegration(base_url=server.url, max_connections=16, scheduler=False)
+    return Backend(name, ai._call_ai_async, stream=ai._stream_ai_async, **limits)
+
+
+def test_quota_spills_to_next_provider(groq, deepseek):
+    async def run():
+        scheduler = LLMScheduler([backend('groq', groq, requests_per_minute=10),
+                                  backend('deepseek', deepseek)])
+        ai = AIIntegration(scheduler=scheduler, cache=ResponseCache())
+        before = groq.stats['requests']
+        await asyncio.gather(*(ai.analyze_async({'type': 'bazi'}, f'問題{i}')
+                               for i in range(30)))
+        await scheduler.close()
+        return scheduler.stats(), groq.stats['requests'] - before
+
+    stats, groq_requests = asyncio.run(run())
+    assert stats['providers']['groq']['requests'] == groq_requests == 10
+    assert stats['providers']['deepseek']['requests'] == 20
+    assert stats['completed'] == 30 and stats['failovers'] == 0
+
+
+def test_throttled_provider_cools_down(limited, deepseek):
+    async def run():
+        scheduler = LLMScheduler([backend('groq', limited), backend('deepseek', deepseek)],
+                                 cooldown=30)
+        results = await asyncio.gather(*(scheduler.submit(f'問題{i}') for i in range(10)))
+        await scheduler.close()
+        return results, scheduler.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [ANSWER] * 10 and stats['completed'] == 10
+    assert stats['providers']['groq']['throttled'] == stats['failovers'] >= 1
+    assert stats['providers']['groq']['cooling_down'] > 0
+
+
+def test_priority_and_backpressure():
+    now = [0.0]
+    started = []
+
+    async def call(prompt, timeout):
+        started.append(prompt)
+        return prompt
+
+    async def run():
+        clock = lambda: now[0]  # noqa: E731
+        scheduler = LLMScheduler([Backend('groq', call, requests_per_minute=1, clock=clock)],
+                                 max_queue=6, clock=clock)
+        await scheduler.submit('預熱')       # 用完額度，之後的請求在佇列中等待
+        results = {}
+
+        async def tracked(label, priority):
+            try:
+                results[label] = await scheduler.submit(label, priority)
+            except SchedulerOverloaded:
+                results[label] = '擠出'
+
+        batch = [asyncio.ensure_future(tracked(f'批次{i}', BATCH)) for i in range(6)]
+        await asyncio.sleep(0)
+        depth = scheduler.queue_depth()
+        with pytest.raises(SchedulerOverloaded):
+            await scheduler.submit('批次6', BATCH)
+        interactive = asyncio.ensure_future(tracked('互動', INTERACTIVE))
+        await asyncio.sleep(0)
+        for _ in range(6):
+            now[0] += 60
+            scheduler._wake.set()
+            await asyncio.sleep(0.01)
+        await asyncio.gather(interactive, *batch)
+        await scheduler.close()
+        return depth, results, scheduler.stats()
+
+    depth, results, stats = asyncio.run(run())
+    assert depth == {'interactive': 0, 'batch': 6}
+    assert results['批次5'] == '擠出' and results['互動'] == '互動'
+    assert started == ['預熱', '互動'] + [f'批次{i}' for i in range(5)]
+    assert stats['shed'] == 2 and stats['wait']['max'] >= 60
+
+
+def test_default_scheduler_covers_stream_path(groq):
+    ai = AIIntegration(base_url=groq.url, cache=ResponseCache())
+    assert ai.scheduler is not None and ai.scheduler.name == 'groq'
+    try:
+        events = list(ai.analyze_stream({'type': 'bazi'}, '串流'))
+        assert ai.analyze({'type': 'bazi'}, '非串流') == ANSWER
+    finally:
+        ai.close()
+    assert list(dict.fromkeys(section for section, _ in events)) == list(SECTIONS)
+    stats = ai.scheduler.stats()
+    assert stats['submitted'] == stats['completed'] == 2
+    assert stats['providers']['groq']['requests'] == 2
+
+    # 直接呼叫供應商的實例不經排程器
+    assert AIIntegration(scheduler=False).scheduler is None
+
+
+def test_stream_fails_over_before_first_chunk(limited, deepseek):
+    async def run():
+        scheduler = LLMScheduler([backend('groq', limited), backend('deepseek', deepseek)])
+        ai = AIIntegration(scheduler=scheduler, cache=ResponseCache())
+        events = [event async for event in ai.analyze_stream_async({'type': 'bazi'}, '串流')]
+        await scheduler.close()
+        return events, scheduler.stats()
+
+    events, stats = asyncio.run(run())
+    assert list(dict.fromkeys(section for section, _ in events)) == list(SECTIONS)
+    assert stats['failovers'] == 1 and stats['completed'] == 1
+    assert stats['providers']['groq']['throttled'] == 1
+
+
+def test_stream_raises_when_all_providers_fail(limited):
+    async def run():
+        scheduler = LLMScheduler([backend('groq', limited)])
+        with pytest.raises(AIProviderError):
+            async for _ in scheduler.stream('串流'):
+                pass
+        await scheduler.close()
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats['failed'] == 1 and stats['completed'] == 0
+
+
+def test_stats_exported_to_prometheus():
+    async def call(prompt, timeout):
+        return prompt
+
+    scheduler = LLMScheduler([Backend('prom-test', call)])
+    asyncio.run(scheduler.submit('問題'))
+    text = metrics.render_prometheus()
+    assert 'divination_llm_queue_depth{scheduler="prom-test",priority="interactive"} 0' in text
+    assert ('divination_llm_scheduler_requests_total'
+            '{scheduler="prom-test",outcome="completed"} 1') in text
+    assert 'divination_llm_queue_wait_seconds{scheduler="prom-test",quantile="0.95"}' in text
+    assert ('divination_llm_provider_requests_total'
+            '{scheduler="prom-test",provider="prom-test"} 1') in text
+    assert text.count('# TYPE divination_llm_queue_depth gauge') == 1
+
+
+@pytest.fixture
+def keyed_providers(monkeypatch, limited, deepseek):
+    """groq（一律 429）與 deepseek 設定金鑰並指向模擬伺服器，gemini 未設定；重設共用排程器"""
+    monkeypatch.setattr(llm_scheduler, '_shared', None)
+    monkeypatch.setitem(PROVIDERS['groq'], 'url', limited.url)
+    monkeypatch.setitem(PROVIDERS['deepseek'], 'url', deepseek.url)
+    monkeypatch.setenv('GROQ_API_KEY', 'test')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'test')
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+
+
+def test_shared_scheduler_uses_keyed_providers(keyed_providers):
+    scheduler = shared_scheduler()
+    assert scheduler.name == 'groq>deepseek'
+    assert shared_scheduler() is scheduler
+
+
+def test_api_server_fails_over_through_shared_scheduler(keyed_providers):
+    with APIServer(port=0, workers=1) as server:
+        request = urllib.request.Request(
+            server.url + '/analyze',
+            data=json.dumps({'type': 'bazi', 'data': {'type': 'bazi'},
+                             'question': '共用排程器'}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            body = json.loads(response.read())
+        assert server.ai.scheduler is shared_scheduler()
+    assert body['analysis'] == ANSWER
+    stats = shared_scheduler().stats()
+    assert stats['failovers'] == 1 and stats['providers']['groq']['throttled'] == 1
+    assert stats['providers']['deepseek']['requests'] == 1
@@ -0,0 +1,92 @@
+"""公历农历互换
+
+- 已知闰月年份（2020 闰四月、2023 闰二月）的月首日期
+- 支持范围内逐日往返换算，单条与 *_many() 结果一致
+- 范围外（如 1900-01-30 属农历 1899 年）与不存在的农历日期抛出 ValueError
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from modules.lunar_calendar import (FIRST_YEAR, LAST_YEAR, leap_month, lunar_to_solar,
+                                    lunar_to_solar_many, month_days, solar_to_lunar,
+                                    solar_to_lunar_many)
+
+FIRST_DAY = date(1900, 1, 31)           # 农历 1900 年正月初一
+LAST_DAY = date(2101, 1, 28)            # 农历 2100 年腊月最后一天
+
+
+@pytest.mark.parametrize('solar, lunar', [
+    (date(2020, 1, 25), (2020, 1, 1, False)),
+    (date(2020, 4, 23), (2020, 4, 1, False)),
+    (date(2020, 5, 23), (2020, 4, 1, True)),
+    (date(2020, 6, 21), (2020, 5, 1, False)),
+    (date(2023, 1, 22), (2023, 1, 1, False)),
+    (date(2023, 2, 20), (2023, 2, 1, False)),
+    (date(2023, 3, 22), (2023, 2, 1, True)),
+    (date(2023, 4, 20), (2023, 3, 1, False)),
+    (FIRST_DAY, (1900, 1, 1, False)),
+], ids=str)
+def test_known_dates(solar, lunar):
+    assert solar_to_lunar(solar.year, solar.month, solar.day) == lunar
+    assert lunar_to_solar(*lunar) == solar
+
+
+def test_leap_months():
+    assert leap_month(2020) == 4
+    assert leap_month(2023) == 2
+    assert leap_month(2021) == 0
+    assert month_days(2020, 4, True) == (date(2020, 6, 21) - date(2020, 5, 23)).days
+    with pytest.raises(ValueError):
+        lunar_to_solar(2021, 4, 1, True)        # 2021 年无闰月
+    with pytest.raises(ValueError):
+        lunar_to_solar(2023, 4, 1, True)        # 2023 年闰的是二月
+
+
+@pytest.fixture(scope='module')
+def all_days():
+    return [FIRST_DAY + timedelta(days=n) for n in range((LAST_DAY - FIRST_DAY).days + 1)]
+
+
+def test_round_trip_full_range(all_days):
+    previous = None
+    for day in all_days:
+        lunar = solar_to_lunar(day.year, day.month, day.day)
+        assert lunar_to_solar(*lunar) == day
+        if previous is not None:
+            # 逐日递增：同月加一天，或换到下个月（含闰月）的初一
+            assert lunar[2] == previous[2] + 1 or lunar[2] == 1
+        previous = lunar
+    assert previous[:2] == (LAST_YEAR, 12)
+    assert previous[2] == month_days(LAST_YEAR, 12)
+
+
+def test_many_matches_scalar(all_days):
+    years, months, days = (np.array(c) for c in zip(*((d.year, d.month, d.day)
+                                                       for d in all_days)))
+    lunar = solar_to_lunar_many(years, months, days)
+    expected = [solar_to_lunar(d.year, d.month, d.day) for d in all_days]
+    assert [tuple(int(c[i]) for c in lunar[:3]) + (bool(lunar[3][i]),)
+            for i in range(len(all_days))] == expected
+    solar = lunar_to_solar_many(*lunar)
+    assert list(solar) == list(np.array(all_days, dtype='datetime64[D]'))
+
+
+@pytest.mark.parametrize('solar', [FIRST_DAY - timedelta(days=1), LAST_DAY + timedelta(days=1),
+                                   date(1899, 6, 1), date(2101, 6, 1)], ids=str)
+def test_out_of_range_solar(solar):
+    with pytest.raises(ValueError):
+        solar_to_lunar(solar.year, solar.month, solar.day)
+    with pytest.raises(ValueError):
+        solar_to_lunar_many([2000, solar.year], [1, solar.month], [1, solar.day])
+
+
+@pytest.mark.parametrize('lunar', [(FIRST_YEAR - 1, 12, 1), (LAST_YEAR + 1, 1, 1),
+                                   (2000, 13, 1), (2000, 1, 0), (2000, 1, 31)], ids=str)
+def test_missing_lunar_dates(lunar):
+    with pytest.raises(ValueError):
+        lunar_to_solar(*lunar)
+    with pytest.raises(ValueError):
+        lunar_to_solar_many([2000, lunar[0]], [1, lunar[1]], [1, lunar[2]])
@@ -0,0 +1,76 @@
+"""精簡提示詞的 token 預算
+
+每種命盤（八字、紫微、易經）各自核對：
+    - 預算足夠時保留全部命盤行，總 token 數不超出預算
+    - 預算遞減時從最後（最不重要）的行開始捨去，保留的一定是開頭連續的行
+    - 預算不足時仍保留命盤核心行與問題，過長的問題被截短
+"""
+
+import pytest
+
+from modules.bazi_calculator import bazi
+from modules.prompt_builder import (SYSTEM_PREAMBLE, build_messages, encode_chart,
+                                    estimate_tokens)
+from modules.yijing_calculator import YijingCalculator
+from modules.ziwei_calculator import ZiweiCalculator
+
+QUESTION = '今年事業運勢如何？'
+
+
+def _charts():
+    return {
+        'bazi': bazi.calculate(1990, 5, 15, 14, '女'),
+        'ziwei': ZiweiCalculator().calculate(1990, 5, 15, 14, '男'),
+        'yijing': YijingCalculator(seed=17).cast_hexagram(question='事業').to_dict(),
+    }
+
+
+@pytest.fixture(scope='module', params=['bazi', 'ziwei', 'yijing'])
+def chart(request):
+    return {'type': request.param, 'data': _charts()[request.param]}
+
+
+def _chart_lines(messages) -> list:
+    system, user = messages
+    assert system == {'role': 'system', 'content': SYSTEM_PREAMBLE}
+    *lines, question = user['content'].split('\n')
+    assert question.startswith('問題：')
+    return lines
+
+
+def _minimum_budget(lines) -> int:
+    """系統前言、命盤核心行與問題所需的 token 數"""
+    return estimate_tokens([{'role': 'system', 'content': SYSTEM_PREAMBLE},
+                            {'role': 'user', 'content': f"{lines[0]}\n問題：{QUESTION}"}])
+
+
+def test_generous_budget_keeps_every_line(chart):
+    lines = encode_chart(chart)
+    assert len(lines) > 2
+    messages = build_messages(chart, QUESTION, budget=10_000)
+    assert _chart_lines(messages) == lines
+    assert messages[1]['content'].endswith(f"問題：{QUESTION}")
+
+
+def test_budget_drops_lowest_priority_lines_first(chart):
+    lines = encode_chart(chart)
+    full = estimate_tokens(build_messages(chart, QUESTION, budget=10_000))
+    kept_before = len(lines)
+    for budget in range(full, _minimum_budget(lines) - 1, -1):
+        messages = build_messages(chart, QUESTION, budget=budget)
+        kept = _chart_lines(messages)
+        assert estimate_tokens(messages) <= budget
+        assert kept == lines[:len(kept)]            # 只捨去末尾的行
+        assert 1 <= len(kept) <= kept_before        # 預算越少保留越少
+        kept_before = len(kept)
+    assert kept_before == 1
+
+
+def test_tiny_budget_keeps_core_line_and_truncates_question(chart):
+    lines = encode_chart(chart)
+    question = '請詳細說明' * 100
+    messages = build_messages(chart, question, budget=_minimum_budget(lines))
+    assert _chart_lines(messages) == lines[:1]
+    asked = messages[1]['content'].split('\n')[-1]
+    assert asked.endswith('…') and question.startswith(asked[len('問題：'):-1])
+    assert estimate_tokens(messages) <= _minimum_budget(lines)
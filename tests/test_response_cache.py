@@ -0,0 +1,125 @@
+"""LLM 回應快取：鍵正規化、記憶體層與磁碟層、單飛去重與領頭取消後的接手"""
+
+import asyncio
+
+import pytest
+
+from modules.response_cache import ResponseCache, response_key
+
+
+def counting(answer='解讀', delay=0.0):
+    """回傳 (compute, 呼叫次數)；compute 每次呼叫都計數"""
+    calls = []
+
+    async def compute():
+        calls.append(None)
+        await asyncio.sleep(delay)
+        return answer
+
+    return compute, calls
+
+
+def test_key_ignores_order_and_timestamp():
+    a = response_key({'type': 'yijing', 'timestamp': 1, 'lines': [7, 8]}, '問', 'v1', 'groq', 'm')
+    b = response_key({'lines': [7, 8], 'timestamp': 2, 'type': 'yijing'}, '問', 'v1', 'groq', 'm')
+    assert a == b
+    assert a != response_key({'type': 'yijing', 'lines': [7, 8]}, '問', 'v2', 'groq', 'm')
+    assert a != response_key({'type': 'yijing', 'lines': [7, 8]}, '問', 'v1', 'deepseek', 'm')
+
+
+def test_miss_then_hit():
+    cache = ResponseCache()
+    compute, calls = counting()
+    assert asyncio.run(cache.get_or_compute('k', compute)) == '解讀'
+    assert asyncio.run(cache.get_or_compute('k', compute)) == '解讀'
+    assert len(calls) == cache.upstream_calls == 1
+    assert cache.stats()['hits'] >= 1
+
+
+def test_failure_is_not_cached():
+    cache = ResponseCache()
+
+    async def broken():
+        raise RuntimeError('上游錯誤')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute('k', broken))
+    assert cache.get('k') is None
+    compute, calls = counting()
+    assert asyncio.run(cache.get_or_compute('k', compute)) == '解讀' and len(calls) == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    ResponseCache(disk_dir=str(tmp_path)).put('ab12', '解讀')
+    fresh = ResponseCache(disk_dir=str(tmp_path))
+    assert fresh.get('ab12') == '解讀' and fresh.disk_hits == 1
+    assert fresh.get('ab12') == '解讀' and fresh.disk_hits == 1     # 已回填記憶體層
+    assert ResponseCache().get('ab12') is None
+
+
+def test_disk_tier_honours_ttl(tmp_path, monkeypatch):
+    ResponseCache(ttl=60, disk_dir=str(tmp_path)).put('ab12', '解讀')
+    monkeypatch.setattr('modules.response_cache.time.time', lambda: 2e10)
+    assert ResponseCache(ttl=60, disk_dir=str(tmp_path)).get('ab12') is None
+
+
+def test_concurrent_misses_coalesce_to_one_call():
+    cache = ResponseCache()
+    compute, calls = counting(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute('k', compute) for _ in range(20)))
+
+    assert asyncio.run(run()) == ['解讀'] * 20
+    assert len(calls) == cache.upstream_calls == 1
+    assert cache.coalesced == 19
+
+
+def test_followers_take_over_when_leader_cancelled():
+    cache = ResponseCache()
+    compute, calls = counting(delay=0.01)
+
+    async def run():
+        leader = asyncio.ensure_future(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(cache.get_or_compute('k', compute))
+                     for _ in range(5)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == ['解讀'] * 5
+    assert len(calls) == 2                  # 被取消的一次加上接手的一次
+    assert cache.get('k') == '解讀'
+
+
+def test_leader_timeout_does_not_fail_followers():
+    cache = ResponseCache()
+    compute, calls = counting(delay=0.05)
+
+    async def run():
+        impatient = asyncio.ensure_future(
+            asyncio.wait_for(cache.get_or_compute('k', compute), timeout=0.01))
+        await asyncio.sleep(0.001)          # 讓逾時的呼叫先成為領頭
+        patient = cache.get_or_compute('k', compute)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(run())
+    assert isinstance(impatient, asyncio.TimeoutError) and patient == '解讀'
+
+
+def test_cancelled_follower_leaves_leader_running():
+    cache = ResponseCache()
+    compute, calls = counting(delay=0.01)
+
+    async def run():
+        leader = asyncio.ensure_future(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute('k', compute))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(run()) == '解讀' and len(calls) == 1
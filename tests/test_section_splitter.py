@@ -0,0 +1,71 @@
+"""串流回應的段落切分
+
+- 不論在哪裡切塊（含標題被切成兩半、逐字輸入），各段落文字與整段輸入相同
+- 標題本身及其後的冒號、空白不輸出，非標題的方括號照常輸出
+- 串流結束時 flush() 輸出暫留在尾端、未能確認為標題的文字
+"""
+
+import pytest
+
+from modules.ai_integration import SectionSplitter
+
+RESPONSE = ('前言 [註] 說明\n[古籍分析]：日主庚金[甲]生於巳月\n'
+            '[现代解读] 個性剛毅\n[行動建議]:\n多接觸水[火]')
+EXPECTED = [(None, '前言 [註] 說明\n'), ('古籍分析', '日主庚金[甲]生於巳月\n'),
+            ('現代解讀', '個性剛毅\n'), ('行動建議', '\n多接觸水[火]')]
+
+
+def _run(chunks) -> list:
+    splitter = SectionSplitter()
+    events = [event for chunk in chunks for event in splitter.feed(chunk)]
+    return events + splitter.flush()
+
+
+def _merged(events) -> list:
+    """相鄰同段落的事件合併"""
+    merged = []
+    for section, text in events:
+        if merged and merged[-1][0] == section:
+            merged[-1] = (section, merged[-1][1] + text)
+        else:
+            merged.append((section, text))
+    return merged
+
+
+def test_whole_response():
+    assert _merged(_run([RESPONSE])) == EXPECTED
+
+
+@pytest.mark.parametrize('cut', range(1, len(RESPONSE)))
+def test_any_single_cut(cut):
+    assert _merged(_run([RESPONSE[:cut], RESPONSE[cut:]])) == EXPECTED
+
+
+def test_one_character_at_a_time():
+    events = _run(list(RESPONSE))
+    assert _merged(events) == EXPECTED
+    assert all(text for _, text in events)
+
+
+def test_heading_split_across_chunks():
+    splitter = SectionSplitter()
+    assert splitter.feed('開場[古') == [(None, '開場')]        # '[古' 暫留
+    assert splitter.feed('籍分') == []
+    assert splitter.feed('析]') == []
+    assert splitter.section == '古籍分析'
+    assert splitter.feed('： ') == []                          # 標題後的冒號、空白跨塊去除
+    assert splitter.feed(' 內容') == [('古籍分析', '內容')]
+    assert splitter.flush() == []
+
+
+@pytest.mark.parametrize('tail', ['[', '[行動', '[行動建議'])
+def test_flush_emits_pending_tail(tail):
+    splitter = SectionSplitter()
+    assert splitter.feed('[現代解讀]內容' + tail) == [('現代解讀', '內容')]
+    assert splitter.flush() == [('現代解讀', tail)]
+    assert splitter.flush() == []
+
+
+def test_long_bracket_is_not_held_back():
+    splitter = SectionSplitter()
+    assert splitter.feed('[這不是段落標題') == [(None, '[這不是段落標題')]
@@ -0,0 +1,96 @@
+"""神煞、纳音、空亡核对
+
+按口诀独立推算天乙贵人、驿马、桃花、空亡与纳音，对六十甲子全部序号与
+shensha / ganzhi 的查表结果逐一比对；单盘与批量掩码同时核对。
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from modules import shensha
+from modules.ganzhi import DIZHI, GANZHI, NAYIN
+
+# 口诀，干支均以字面书写，与 shensha.RULES 的对照表互为核对
+# 甲戊庚牛羊，乙己鼠猴乡，丙丁猪鸡位，壬癸兔蛇藏，六辛逢马虎
+TIANYI = {'甲': '丑未', '戊': '丑未', '庚': '丑未', '乙': '子申', '己': '子申',
+          '丙': '亥酉', '丁': '亥酉', '壬': '卯巳', '癸': '卯巳', '辛': '寅午'}
+# 申子辰马在寅，寅午戌马在申，巳酉丑马在亥，亥卯未马在巳
+YIMA = {**dict.fromkeys('申子辰', '寅'), **dict.fromkeys('寅午戌', '申'),
+        **dict.fromkeys('巳酉丑', '亥'), **dict.fromkeys('亥卯未', '巳')}
+# 申子辰在酉，寅午戌在卯，巳酉丑在午，亥卯未在子
+TAOHUA = {**dict.fromkeys('申子辰', '酉'), **dict.fromkeys('寅午戌', '卯'),
+          **dict.fromkeys('巳酉丑', '午'), **dict.fromkeys('亥卯未', '子')}
+# 甲子旬中戌亥空……甲寅旬中子丑空
+XUN_VOID = {'甲子': '戌亥', '甲戌': '申酉', '甲申': '午未',
+            '甲午': '辰巳', '甲辰': '寅卯', '甲寅': '子丑'}
+# 六十甲子纳音歌
+NAYIN_SONG = (
+    '甲子乙丑海中金', '丙寅丁卯炉中火', '戊辰己巳大林木', '庚午辛未路旁土', '壬申癸酉剑锋金',
+    '甲戌乙亥山头火', '丙子丁丑涧下水', '戊寅己卯城头土', '庚辰辛巳白蜡金', '壬午癸未杨柳木',
+    '甲申乙酉泉中水', '丙戌丁亥屋上土', '戊子己丑霹雳火', '庚寅辛卯松柏木', '壬辰癸巳长流水',
+    '甲午乙未砂中金', '丙申丁酉山下火', '戊戌己亥平地木', '庚子辛丑壁上土', '壬寅癸卯金箔金',
+    '甲辰乙巳覆灯火', '丙午丁未天河水', '戊申己酉大驿土', '庚戌辛亥钗钏金', '壬子癸丑桑柘木',
+    '甲寅乙卯大溪水', '丙辰丁巳沙中土', '戊午己未天上火', '庚申辛酉石榴木', '壬戌癸亥大海水',
+)
+
+
+def _expected(chart) -> dict:
+    """四柱干支名称 (年, 月, 日, 时) -> 各神煞是否出现
+
+    天乙以年干、日干查四柱地支；驿马、桃花以年支、日支查其余三柱地支。
+    """
+    names = [GANZHI[i] for i in chart]
+    branches = [name[1] for name in names]
+    rest = {0: branches[1:], 2: branches[:2] + branches[3:]}
+    return {
+        '天乙贵人': any(b in TIANYI[names[k][0]] for k in (0, 2) for b in branches),
+        '驿马': any(YIMA[names[k][1]] in rest[k] for k in (0, 2)),
+        '桃花': any(TAOHUA[names[k][1]] in rest[k] for k in (0, 2)),
+    }
+
+
+def _charts():
+    """年柱×日柱、月柱×时柱各取遍 60×60，其余两柱随机"""
+    rng = random.Random(25)
+    for a in range(60):
+        for b in range(60):
+            x, y = rng.randrange(60), rng.randrange(60)
+            yield a, x, b, y
+            yield x, a, y, b
+
+
+@pytest.fixture(scope='module')
+def charts():
+    return list(_charts())
+
+
+def test_natal_stars_follow_rules(charts):
+    for chart in charts:
+        names = shensha.natal_stars(chart)
+        found = {star: star in names for star in ('天乙贵人', '驿马', '桃花')}
+        assert found == _expected(chart), [GANZHI[i] for i in chart]
+
+
+def test_batch_mask_matches_scalar(charts):
+    columns = np.array(charts).T
+    masks = shensha.star_mask_many(*columns)
+    assert list(masks) == [shensha.star_mask(chart) for chart in charts]
+
+
+@pytest.mark.parametrize('index', range(60), ids=lambda i: GANZHI[i])
+def test_void_follows_xun(index):
+    head = index
+    while GANZHI[head][0] != '甲':
+        head -= 1
+    assert ''.join(shensha.VOID_NAMES[index]) == XUN_VOID[GANZHI[head]]
+    assert tuple(DIZHI[b] for b in shensha.VOID[index]) == shensha.VOID_NAMES[index]
+
+
+def test_nayin_follows_song():
+    expected = {}
+    for line in NAYIN_SONG:
+        expected[line[:2]] = expected[line[2:4]] = line[4:]
+    assert len(expected) == 60
+    assert all(NAYIN[i] == expected[GANZHI[i]] for i in range(60))
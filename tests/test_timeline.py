@@ -0,0 +1,84 @@
+"""大运流年时间轴：顺逆、起运岁数、各层边界，以及排盘结果中的大运概览
+
+参考命盘：1990-05-15 14:00，庚午年（阳年）辛巳月。
+1990 年立夏 05-06 02:36、芒种 06-06 06:46（北京时间），三日折一岁：
+    女命逆排，距立夏 9 日 11 时 24 分，约 3.2 岁起运，首步庚辰
+    男命顺排，距芒种 21 日 16 时 46 分，约 7.2 岁起运，首步壬午
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from modules import ganzhi
+from modules.bazi_calculator import BaziCalculator
+from modules.cache import ChartCache
+
+BIRTH = datetime(1990, 5, 15, 14)
+LIXIA = datetime(1990, 5, 6, 2, 36)
+MANGZHONG = datetime(1990, 6, 6, 6, 46)
+
+
+@pytest.fixture(scope='module')
+def calculator():
+    return BaziCalculator(cache=ChartCache(maxsize=16))
+
+
+def _age(distance: timedelta) -> float:
+    return round(distance / timedelta(days=3), 1)
+
+
+@pytest.mark.parametrize('gender, forward, distance, first', [
+    ('女', False, BIRTH - LIXIA, '庚辰'),
+    ('男', True, MANGZHONG - BIRTH, '壬午'),
+])
+def test_direction_and_start_age(calculator, gender, forward, distance, first):
+    timeline = calculator.timeline(1990, 5, 15, 14, gender)
+    assert timeline.forward is forward
+    assert round(timeline.start_age, 1) == _age(distance)
+
+    fortune = timeline.major_fortune()
+    assert len(fortune) == 8 and fortune[0]['ganzhi'] == first
+    step = 1 if forward else -1
+    month = ganzhi.GANZHI.index('辛巳')
+    assert [s['ganzhi'] for s in fortune] == [ganzhi.GANZHI[(month + step * n) % 60]
+                                              for n in range(1, 9)]
+    assert [s['start_age'] for s in fortune] == [_age(distance) + 10 * n for n in range(8)]
+    assert fortune[1]['start_year'] - fortune[0]['start_year'] == 10
+
+
+def test_chart_dict_carries_major_fortune(calculator):
+    expected = calculator.timeline(1990, 5, 15, 14, '女').major_fortune()
+    assert calculator.calculate(1990, 5, 15, 14, '女')['major_fortune'] == expected
+    chart = calculator.calculate_chart(1990, 5, 15, 14, '女')
+    assert chart.to_dict()['major_fortune'] == expected
+    assert calculator.calculate(1990, 5, 15, 14, '男')['major_fortune'][0]['ganzhi'] == '壬午'
+
+
+def test_luck_pillars_are_contiguous(calculator):
+    timeline = calculator.timeline(1990, 5, 15, 14, '女')
+    pillars = list(timeline.luck_pillars())
+    assert pillars[0].start == timeline.luck_start
+    assert all(a.end == b.start for a, b in zip(pillars, pillars[1:]))
+    middle = pillars[3].start + timedelta(days=400)
+    assert timeline.luck_pillar_at(middle).index == pillars[3].index
+    assert timeline.luck_pillar_at(BIRTH) is None
+
+
+def test_years_start_at_lichun(calculator):
+    timeline = calculator.timeline(1990, 5, 15, 14, '女')
+    luck, years = timeline.decade(0)
+    years = list(years)
+    assert len(years) in (10, 11)
+    assert all(pillar.start.month == 2 and 3 <= pillar.start.day <= 5 for pillar in years)
+    assert [p.ganzhi for p in timeline.years(date(2024, 1, 1), date(2025, 1, 1))] == ['癸卯', '甲辰']
+
+
+def test_months_and_days(calculator):
+    timeline = calculator.timeline(1990, 5, 15, 14, '女')
+    months = list(timeline.months(end=datetime(1990, 7, 1)))
+    assert [p.ganzhi for p in months] == ['辛巳', '壬午']
+    assert months[0].start == LIXIA and months[0].end == MANGZHONG
+    days = list(timeline.days(end=datetime(1990, 5, 17)))
+    pillars = [calculator.calculate(1990, 5, d, 12)['day_pillar'] for d in (15, 16)]
+    assert [p.ganzhi for p in days] == [p['stem'] + p['branch'] for p in pillars]
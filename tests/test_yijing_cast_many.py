@@ -0,0 +1,25 @@
+"""批量起卦的隨機來源：seed 與 rng 只能指定其一"""
+
+import numpy as np
+import pytest
+
+from modules.yijing_calculator import YijingCalculator, session_generators
+
+
+def test_seed_and_rng_together_rejected():
+    with pytest.raises(ValueError):
+        YijingCalculator().cast_many(4, seed=1, rng=np.random.default_rng(2))
+
+
+def test_seed_reproducible():
+    calc = YijingCalculator()
+    a, b = calc.cast_many(16, seed=7), calc.cast_many(16, seed=7)
+    assert all((a[key] == b[key]).all() for key in a)
+
+
+def test_rng_stream_used():
+    stream, = session_generators(1, seed=3)
+    same, = session_generators(1, seed=3)
+    a = YijingCalculator().cast_many(16, rng=stream)
+    b = YijingCalculator().cast_many(16, rng=same)
+    assert all((a[key] == b[key]).all() for key in a)
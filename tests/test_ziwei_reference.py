@@ -0,0 +1,99 @@
+"""紫微斗数星曜位置核对
+
+- tools/fixtures/ziwei_reference_charts.json 中的参考命盘与安紫微表逐条比对
+- 随机命盘按安星诀（局数除日安紫微、紫微天府两系、年干年支月时诸星）独立推算后比对
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from check_ziwei_reference import DEFAULT_FIXTURES, check_chart  # noqa: E402
+from modules import ganzhi  # noqa: E402
+from modules.cache import ChartCache  # noqa: E402
+from modules.ziwei_calculator import ZIWEI_POSITION, ZiweiCalculator  # noqa: E402
+
+with open(DEFAULT_FIXTURES, encoding='utf-8') as f:
+    FIXTURES = json.load(f)
+
+BRANCHES = ganzhi.DIZHI
+
+# 安星诀，地支均以字面书写，与 ziwei_calculator 的数值表互为核对
+LUCUN = dict(zip('甲乙丙丁戊己庚辛壬癸', '寅卯巳午巳午申酉亥子'))
+KUI_YUE = {'甲': '丑未', '戊': '丑未', '庚': '丑未', '乙': '子申', '己': '子申',
+           '丙': '亥酉', '丁': '亥酉', '辛': '午寅', '壬': '卯巳', '癸': '卯巳'}
+TIANMA = {**dict.fromkeys('寅午戌', '申'), **dict.fromkeys('申子辰', '寅'),
+          **dict.fromkeys('巳酉丑', '亥'), **dict.fromkeys('亥卯未', '巳')}
+BUREAU = {'水二局': 2, '木三局': 3, '金四局': 4, '土五局': 5, '火六局': 6}
+
+
+@pytest.fixture(scope='module')
+def calculator():
+    return ZiweiCalculator(cache=ChartCache(maxsize=16))
+
+
+@pytest.mark.parametrize('case', FIXTURES['charts'], ids=lambda case: case['source'])
+def test_reference_chart(calculator, case):
+    assert check_chart(calculator, case) == []
+
+
+@pytest.mark.parametrize('spot', FIXTURES['ziwei_position'],
+                         ids=lambda spot: f"{spot['bureau']}局{spot['day']}日")
+def test_reference_ziwei_position(spot):
+    assert BRANCHES[ZIWEI_POSITION[spot['bureau']][spot['day']]] == spot['branch']
+
+
+def _ziwei_branch(bureau: int, day: int) -> int:
+    """局数除日：补足 x 使日数整除局数，商从寅宫起数，补数奇逆偶顺"""
+    x = -day % bureau
+    position = 2 + (day + x) // bureau - 1
+    return (position - x if x % 2 else position + x) % 12
+
+
+def _expected_positions(chart: dict) -> dict:
+    info = chart['birth_info']
+    stem, branch = info['year_ganzhi']
+    # 闰月后半月按下月，23 时按次日子时（日数已在 lunar_day 中顺延）
+    month = info['lunar_month'] + (info['is_leap_month'] and info['lunar_day'] > 15)
+    month = (month - 1) % 12 + 1
+    hour = (info['hour'] + 1) // 2 % 12
+
+    ziwei = _ziwei_branch(BUREAU[chart['five_elements']], info['lunar_day'])
+    tianfu = (4 - ziwei) % 12
+    positions = {star: BRANCHES[(ziwei + offset) % 12] for star, offset in
+                 zip(('紫微', '天机', '太阳', '武曲', '天同', '廉贞'), (0, -1, -3, -4, -5, 4))}
+    positions.update({star: BRANCHES[(tianfu + offset) % 12] for star, offset in
+                      zip(('天府', '太阴', '贪狼', '巨门', '天相', '天梁', '七杀', '破军'),
+                          (0, 1, 2, 3, 4, 5, 6, 10))})
+    lucun = BRANCHES.index(LUCUN[stem])
+    positions.update({
+        '禄存': LUCUN[stem], '擎羊': BRANCHES[(lucun + 1) % 12],
+        '陀罗': BRANCHES[(lucun - 1) % 12],
+        '天魁': KUI_YUE[stem][0], '天钺': KUI_YUE[stem][1], '天马': TIANMA[branch],
+        '文昌': BRANCHES[(10 - hour) % 12], '文曲': BRANCHES[(4 + hour) % 12],   # 戌逆、辰顺
+        '左辅': BRANCHES[(4 + month - 1) % 12], '右弼': BRANCHES[(10 - month + 1) % 12],
+        '地空': BRANCHES[(11 - hour) % 12], '地劫': BRANCHES[(11 + hour) % 12],  # 亥起
+    })
+    return positions
+
+
+def _births(n, seed=2024):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield (rng.randint(1930, 2040), rng.randint(1, 12), rng.randint(1, 28),
+               rng.randint(0, 23), rng.choice('男女'))
+
+
+@pytest.mark.parametrize('birth', list(_births(200)), ids=str)
+def test_star_positions_follow_rules(calculator, birth):
+    chart = calculator.calculate(*birth, 'solar')
+    assert 'error' not in chart
+    actual = {star: palace['earthly_branch'] for palace in chart['palaces']
+              for star in palace['major_stars'] + palace['minor_stars']}
+    expected = _expected_positions(chart)
+    assert {star: actual.get(star) for star in expected} == expected
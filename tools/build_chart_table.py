@@ -0,0 +1,52 @@
+"""生成八字预计算表 modules/data/bazi_chart_table.bin
+
+用法: python tools/build_chart_table.py [输出路径]
+
+逐年调用 BaziCalculator.calculate_many() 计算1900-2100年每天24个整点的命盘，
+按 modules/chart_table.py 中的定长记录格式顺序写出，文件头记录当前节气表的 SHA-256。
+"""
+
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np  # noqa: E402
+
+from modules import solar_terms  # noqa: E402
+from modules.bazi_calculator import BaziCalculator  # noqa: E402
+from modules.chart_table import (  # noqa: E402
+    DEFAULT_PATH, FIRST_DATE, HEADER, HOURS_PER_DAY, LAST_DATE, RECORD_DTYPE,
+    TABLE_MAGIC, TABLE_VERSION, ChartTable,
+)
+
+
+def build(path=DEFAULT_PATH):
+    calculator = BaziCalculator(table=None)
+    days = (LAST_DATE - FIRST_DATE).days + 1
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(TABLE_MAGIC, TABLE_VERSION, HOURS_PER_DAY,
+                            FIRST_DATE.toordinal(), days, solar_terms.table_digest()))
+        for year in range(FIRST_DATE.year, LAST_DATE.year + 1):
+            dates = [FIRST_DATE.replace(year=year) + timedelta(days=i) for i in range(366)]
+            dates = [d for d in dates if d.year == year]
+            ymd = np.repeat(np.array([(d.year, d.month, d.day) for d in dates]), HOURS_PER_DAY, axis=0)
+            hours = np.tile(np.arange(HOURS_PER_DAY), len(dates))
+            batch = calculator.calculate_many(ymd[:, 0], ymd[:, 1], ymd[:, 2], hours)
+
+            records = np.zeros(len(hours), dtype=RECORD_DTYPE)
+            for i, pillar in enumerate(('year', 'month', 'day', 'hour')):
+                stems = batch[f'{pillar}_stem'].astype(np.int64)
+                branches = batch[f'{pillar}_branch'].astype(np.int64)
+                records['pillars'][:, i] = (6 * stems - 5 * branches) % 60
+            f.write(records.tobytes())
+    os.replace(tmp_path, path)
+    table = ChartTable(path)
+    print(f"已写入 {os.path.normpath(path)}: {table.days} 天 x {HOURS_PER_DAY} 时")
+    table.close()
+
+
+if __name__ == '__main__':
+    build(*sys.argv[1:2])
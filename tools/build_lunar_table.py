@@ -0,0 +1,98 @@
+"""生成农历表 modules/data/lunar_table.bin
+
+用法: python tools/build_lunar_table.py
+
+按现行农历规则（GB/T 33661）推算1900-2100年的农历月：
+    - 以北京时间朔日为每月初一
+    - 含冬至的月份为十一月
+    - 两个冬至之间有13个朔望月时，其中第一个不含中气的月份为闰月
+朔日由 astronomy.new_moon() 计算，中气取自节气表。
+每个农历年压缩为一个uint32，格式见 modules/lunar_calendar.py。
+"""
+
+import math
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules import astronomy, solar_terms  # noqa: E402
+from modules.lunar_calendar import (  # noqa: E402
+    FIRST_YEAR, LAST_YEAR, TABLE_MAGIC, TABLE_PATH, pack_year,
+)
+
+_EPOCH = date(1970, 1, 1)
+
+
+def lunar_months():
+    """推算1899年冬月至2101年冬月之间的全部农历月
+
+    Returns:
+        tuple: (各月初一自1970-01-01起的天数（多一项作为末月的结束）,
+                对应的 (农历年, 月, 是否闰月) 列表)
+    """
+    table = solar_terms.load_table()
+    first_term_year = solar_terms.FIRST_YEAR
+    zhongqi_days = [t // 1440 for t in table[1::2]]
+
+    k_first = math.floor((first_term_year + 0.8 - 2000) * 12.3685)
+    k_last = math.ceil((solar_terms.LAST_YEAR + 1 - 2000) * 12.3685)
+    starts = [astronomy.jd_to_unix_minutes(astronomy.new_moon(k)) // 1440
+              for k in range(k_first, k_last + 1)]
+
+    month_starts, month_info = [], []
+    for year in range(first_term_year, solar_terms.LAST_YEAR):
+        solstice = table[(year - first_term_year) * 24 + 23] // 1440
+        next_solstice = table[(year + 1 - first_term_year) * 24 + 23] // 1440
+        first = bisect_right(starts, solstice) - 1
+        last = bisect_right(starts, next_solstice) - 1
+
+        # 岁中有13个月时，冬月之后第一个不含中气的月份为闰月
+        leap = None
+        if last - first == 13:
+            for i in range(first + 1, last):
+                j = bisect_right(zhongqi_days, starts[i] - 1)
+                if j >= len(zhongqi_days) or zhongqi_days[j] >= starts[i + 1]:
+                    leap = i
+                    break
+
+        lunar_year, month = year, 11
+        for i in range(first, last):
+            if i == leap:
+                month_info.append((lunar_year, month, True))
+            else:
+                if i > first:
+                    month = month % 12 + 1
+                    if month == 1:
+                        lunar_year = year + 1
+                month_info.append((lunar_year, month, False))
+            month_starts.append(starts[i])
+    month_starts.append(starts[last])
+    return month_starts, month_info
+
+
+def build():
+    starts, info = lunar_months()
+    table = array('I')
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        rows = [i for i, (y, _, _) in enumerate(info) if y == year]
+        lengths = [starts[i + 1] - starts[i] for i in rows]
+        leap = next((info[i][1] for i in rows if info[i][2]), 0)
+        new_year = _EPOCH + timedelta(days=starts[rows[0]])
+        if new_year.year != year or any(n not in (29, 30) for n in lengths):
+            raise RuntimeError(f"农历{year}年推算结果异常")
+        table.append(pack_year(lengths, leap, new_year.timetuple().tm_yday - 1))
+    if sys.byteorder != 'little':
+        table.byteswap()
+    with open(TABLE_PATH, 'wb') as f:
+        f.write(struct.pack('<4sHH', TABLE_MAGIC, FIRST_YEAR, LAST_YEAR - FIRST_YEAR + 1))
+        f.write(table.tobytes())
+    print(f"已写入 {os.path.normpath(TABLE_PATH)}: {len(table)} 个农历年")
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,38 @@
+"""生成节气时刻表 modules/data/solar_terms.bin
+
+用法: python tools/build_solar_terms.py
+
+表内每年24个节气（自小寒起），时刻为北京时间自1970-01-01 00:00起的
+分钟数，以小端int32连续存放。年份范围比1900-2100各多留一年，保证
+1900年初与2100年末的出生时间都能找到前后节气。
+"""
+
+import os
+import struct
+import sys
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.astronomy import solar_longitude_time, jd_to_unix_minutes  # noqa: E402
+from modules.solar_terms import FIRST_YEAR, LAST_YEAR, TABLE_MAGIC, TABLE_PATH  # noqa: E402
+
+
+def build():
+    table = array('i')
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        for k in range(24):
+            longitude = (285 + 15 * k) % 360
+            table.append(jd_to_unix_minutes(solar_longitude_time(year, longitude)))
+    if any(b <= a for a, b in zip(table, table[1:])):
+        raise RuntimeError("节气时刻未严格递增")
+    if sys.byteorder != 'little':
+        table.byteswap()
+    with open(TABLE_PATH, 'wb') as f:
+        f.write(struct.pack('<4sHH', TABLE_MAGIC, FIRST_YEAR, LAST_YEAR - FIRST_YEAR + 1))
+        f.write(table.tobytes())
+    print(f"已写入 {os.path.normpath(TABLE_PATH)}: {len(table)} 个节气")
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,90 @@
+"""紫微斗数排盘交叉核对
+
+用法: python tools/check_ziwei_reference.py [参考数据路径]
+
+逐条比对 tools/fixtures/ziwei_reference_charts.json 中的参考命盘与安紫微表，
+只核对参考数据中列出的字段。全部一致时退出码为0，否则列出差异并返回1。
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules import ganzhi  # noqa: E402
+from modules.cache import ChartCache  # noqa: E402
+from modules.ziwei_calculator import ZIWEI_POSITION, ZiweiCalculator  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures',
+                                'ziwei_reference_charts.json')
+
+
+def _star_branches(result: dict) -> dict:
+    branches = {}
+    for palace in result['palaces']:
+        for star in palace['major_stars'] + palace['minor_stars']:
+            branches[star] = palace['earthly_branch']
+    return branches
+
+
+def check_chart(calculator: ZiweiCalculator, case: dict) -> list:
+    """返回一条参考命盘的全部差异描述"""
+    args = case['input']
+    result = calculator.calculate(args['year'], args['month'], args['day'], args['hour'],
+                                  args['gender'], args['calendar'],
+                                  args.get('is_leap_month', False))
+    if 'error' in result:
+        return [f"计算失败: {result['error']}"]
+
+    expected = case['expected']
+    diffs = []
+    for key, value in expected.items():
+        if key == 'star_branches':
+            actual = _star_branches(result)
+            diffs += [f"{star}: {actual.get(star)} != {branch}"
+                      for star, branch in value.items() if actual.get(star) != branch]
+        elif key == 'palace_stems':
+            actual = {p['name']: p['heavenly_stem'] for p in result['palaces']}
+            diffs += [f"{name}宫干: {actual.get(name)} != {stem}"
+                      for name, stem in value.items() if actual.get(name) != stem]
+        elif key == 'decadal_fortune':
+            for want, got in zip(value, result['decadal_fortune']):
+                mismatch = {k: got.get(k) for k, v in want.items() if got.get(k) != v}
+                if mismatch:
+                    diffs.append(f"大限 {mismatch} != {want}")
+        elif isinstance(value, dict):
+            actual = result.get(key, {})
+            diffs += [f"{key}.{k}: {actual.get(k)} != {v}"
+                      for k, v in value.items() if actual.get(k) != v]
+        elif result.get(key) != value:
+            diffs.append(f"{key}: {result.get(key)} != {value}")
+    return diffs
+
+
+def main(path=DEFAULT_FIXTURES) -> int:
+    with open(path, encoding='utf-8') as f:
+        fixtures = json.load(f)
+
+    calculator = ZiweiCalculator(cache=ChartCache(maxsize=16))
+    failures = 0
+    for case in fixtures['charts']:
+        diffs = check_chart(calculator, case)
+        print(f"{'FAIL' if diffs else 'ok  '} {case['source']}")
+        for diff in diffs:
+            print(f"     {diff}")
+        failures += bool(diffs)
+
+    for spot in fixtures['ziwei_position']:
+        actual = ganzhi.DIZHI[ZIWEI_POSITION[spot['bureau']][spot['day']]]
+        if actual != spot['branch']:
+            print(f"FAIL 安紫微 {spot['bureau']}局 {spot['day']}日: {actual} != {spot['branch']}")
+            failures += 1
+    print(f"安紫微表核对 {len(fixtures['ziwei_position'])} 项")
+
+    print(f"{len(fixtures['charts'])} 个参考命盘，{failures} 项不一致")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:2]))
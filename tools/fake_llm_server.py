@@ -0,0 +1,201 @@
+"""本機模擬 LLM 伺服器
+
+用法: python tools/fake_llm_server.py [--port 8765] [--latency 0.5]
+
+實作 OpenAI 相容的 POST /v1/chat/completions，固定延遲後回傳三段式模擬分析，
+支援 HTTP/1.1 keep-alive；請求帶 "stream": true 時以 chunked SSE 逐塊回傳，
+每塊間隔 chunk_delay 秒（模擬逐字生成；非串流請求則等全部生成完才回傳）。供離線量測 AIIntegration 的延遲與連線重用：
+
+    with FakeLLMServer(latency=0.2) as server:
+        ai = AIIntegration(base_url=server.url)
+        ai.compare_systems(...)
+        server.stats  # 請求數、連線數、同時處理中的最大請求數
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+
+ANSWER = "[古籍分析] 模擬古籍分析。\n[現代解讀] 模擬現代解讀。\n[行動建議] 模擬行動建議。"
+
+
+class FakeLLMServer:
+    """在背景執行緒中運行的模擬 LLM 伺服器"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.2,
+                 chunk_delay: float = 0.0, chunk_size: int = 4):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.stats = {'requests': 0, 'connections': 0, 'in_flight': 0, 'max_in_flight': 0}
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/v1/chat/completions'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='fake-llm-server', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _handle(self, reader, writer):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                self.stats['requests'] += 1
+                self.stats['in_flight'] += 1
+                self.stats['max_in_flight'] = max(self.stats['max_in_flight'],
+                                                  self.stats['in_flight'])
+                try:
+                    await asyncio.sleep(self.latency)
+                    status, body = self.respond(*request)
+                    if status == 200 and _wants_stream(request[2]):
+                        await self._stream(writer, body)
+                    else:
+                        if status == 200:
+                            await asyncio.sleep(self._generation_time(body))
+                        _write_response(writer, status, body)
+                        await writer.drain()
+                finally:
+                    self.stats['in_flight'] -= 1
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # 關閉伺服器時取消的連線直接結束，不向 asyncio 回報例外
+            pass
+        finally:
+            writer.close()
+
+    def _generation_time(self, completion) -> float:
+        content = completion['choices'][0]['message']['content']
+        return max(0, -(-len(content) // self.chunk_size) - 1) * self.chunk_delay
+
+    async def _stream(self, writer, completion):
+        """將完整回答切塊，以 chat.completion.chunk 事件逐塊送出"""
+        writer.write(b'HTTP/1.1 200 OK\r\n'
+                     b'Content-Type: text/event-stream\r\n'
+                     b'Transfer-Encoding: chunked\r\n'
+                     b'Connection: keep-alive\r\n\r\n')
+        content = completion['choices'][0]['message']['content']
+        for i in range(0, len(content), self.chunk_size):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            event = {'object': 'chat.completion.chunk', 'model': completion.get('model'),
+                     'choices': [{'index': 0, 'delta': {'content': content[i:i + self.chunk_size]}}]}
+            _write_chunk(writer, f'data: {json.dumps(event, ensure_ascii=False)}\n\n')
+            await writer.drain()
+        _write_chunk(writer, 'data: [DONE]\n\n')
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def respond(self, method: str, path: str, body: bytes):
+        """返回 (狀態碼, JSON 本文)；子類別可覆寫以模擬錯誤"""
+        if method != 'POST' or not path.endswith('/chat/completions'):
+            return 404, {'error': {'message': 'not found'}}
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': {'message': 'invalid json'}}
+        return 200, {
+            'object': 'chat.completion',
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': ANSWER}}],
+        }
+
+
+async def _read_request(reader):
+    """讀取一個請求，連線關閉時返回 None"""
+    try:
+        request_line = await reader.readuntil(b'\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path, body
+
+
+def _write_response(writer, status: int, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                 'Content-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 'Connection: keep-alive\r\n\r\n'.encode('latin-1') + body)
+
+
+def _wants_stream(body: bytes) -> bool:
+    try:
+        return json.loads(body or b'{}').get('stream') is True
+    except (ValueError, AttributeError):
+        return False
+
+
+def _write_chunk(writer, text: str):
+    data = text.encode('utf-8')
+    writer.write(f'{len(data):x}\r\n'.encode('latin-1') + data + b'\r\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='每個請求的延遲秒數')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='串流回應每塊的間隔秒數')
+    args = parser.parse_args()
+    server = FakeLLMServer(args.host, args.port, args.latency, args.chunk_delay)
+    server.start()
+    print(f"模擬 LLM 伺服器: {server.url}（Ctrl+C 結束）")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()